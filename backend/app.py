@@ -1,6 +1,4 @@
-import os
-import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from werkzeug.security import check_password_hash, generate_password_hash
 from classes.mongodb_handler import MongoDBHandler
@@ -8,37 +6,27 @@ from classes.user import User
 from classes.habit import Habit
 from classes.utils import Utils
 from classes.habit_tracker import HabitTracker
-from data_simulator import DataSimulator
-
-# BACKEND PORT
-backend_port = os.environ.get('BACKEND_PORT', '5000')
-
-# Admin account details
-admin_username = os.environ.get('ADMIN_USERNAME', 'admin')
-admin_password = os.environ.get('ADMIN_PASSWORD', 'admin1234')
+from classes.habit_catalog import HabitCatalog
+from classes.completion_rollups import CompletionRollups
+from classes.admin_analytics import AdminAnalytics
+from classes.token_manager import TokenManager
+from classes.request_context import RequestContext
+from classes.json_provider import JSONProvider
+from settings import (backend_port, admin_username, admin_password, session_secret_key, session_token_expiration,
+                      mongo_uri, mongo_db_name, users_batch_size, complete_batch_max_items, habits_cache_max_age, habits_version_check_interval,
+                      admin_analytics_cache_ttl)
+
+# Admin password hash
 admin_password_hash = generate_password_hash(admin_password, method='pbkdf2:sha256')
 
-# Database configuration
-mongo_auth_enabled = os.environ.get('MONGO_AUTH_ENABLED', 'false').lower() == 'true'
-mongo_username = os.environ.get('MONGO_USERNAME', 'admin')
-mongo_password = os.environ.get('MONGO_PASSWORD', 'admin1234')
-mongo_host = os.environ.get('MONGO_HOST', 'localhost')
-mongo_port = os.environ.get('MONGO_PORT', '27017')
-mongo_db_name = os.environ.get('DB_NAME', 'healthhub')
-mongo_uri = f"mongodb://{mongo_username}:{mongo_password}@{mongo_host}:{mongo_port}/{mongo_db_name}?authSource=admin" if mongo_auth_enabled else f"mongodb://{mongo_host}:{mongo_port}/{mongo_db_name}"
-
-# Simulation settings
-config_file = os.environ.get('SIMULATION_CONFIG_FILE', 'data/test_data_config.json')
-success_probability = float(os.environ.get('SIMULATION_SUCCESS_PROBABILITY', '0.8'))
-interactions_path = os.environ.get('SIMULATION_INTERACTIONS_PATH', 'data/interactions.json')
-
 # Utility function
 def is_admin_authenticated(request):
     """
     Check if the admin credentials provided in the request are valid.
 
-    This function extracts the username and password from the authorization header of the HTTP request.
-    It then compares these credentials against predefined admin credentials.
+    A signed admin bearer token (issued by `/admin/validate`) is verified first, statelessly.
+    Otherwise this function extracts the username and password from the authorization header of the HTTP request
+    and compares these credentials against predefined admin credentials.
 
     Args:
         request (Request): The Flask request object, containing the authorization header.
@@ -47,14 +35,44 @@ def is_admin_authenticated(request):
         bool: True if the provided credentials match the admin credentials, False otherwise.
 
     Note:
-        It expects the credentials to be provided in the standard HTTP Basic Auth format.
+        It expects either a 'Bearer' token or credentials in the standard HTTP Basic Auth format.
     """
+    token = Utils.get_bearer_token(request)
+    if token:
+        return token_manager.verify_token(token, role='admin') == admin_username
+
     admin_user = request.authorization.username if request.authorization else ''
     admin_pass = request.authorization.password if request.authorization else ''
     return admin_user == admin_username and check_password_hash(admin_password_hash, admin_pass)
 
+# Conditional response of a listing computed from the user's habits
+def versioned_response(etag, build_result):
+    """
+    Respond with the result of a listing, tagged with the ETag of the user's version.
+
+    A GET request whose If-None-Match matches is answered 304 without building the result,
+    so polling an unchanged user costs a single read of its version.
+
+    Args:
+        etag (str): The ETag of the request context (RequestContext.etag), None if it could not be built.
+        build_result (callable): Builds the result dict when the client needs it.
+
+    Returns:
+        Response: The JSON response, or an empty 304.
+    """
+    if etag and request.method == 'GET' and request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build_result())
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 # Flask app initialization and CORS setup
 app = Flask(__name__)
+# dates are stored as datetimes, clients receive them as 'YYYY-MM-DD HH:MM'
+app.json = JSONProvider(app)
 
 # TODO: This should allow only the correct origin
 CORS(app, resources={r"/*": {"origins": "*"}})
@@ -62,6 +80,15 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 # create instance of mongodb handler
 db_handler = MongoDBHandler(mongo_uri, mongo_db_name)
 
+# create instance of the pre setted habits catalog cache
+habit_catalog = HabitCatalog(db_handler, serialize=app.json.dumps, max_age=habits_cache_max_age, check_interval=habits_version_check_interval)
+
+# create instance of the admin analytics, cached for the whole process
+admin_analytics = AdminAnalytics(db_handler, ttl=admin_analytics_cache_ttl)
+
+# create instance of session token manager
+token_manager = TokenManager(session_secret_key, expires_in=session_token_expiration)
+
 ###############
 # ADMIN methods
 ###############
@@ -80,16 +107,18 @@ def validate_admin():
     Returns:
         JSONResponse: A JSON response indicating the result of the validation. The response contains:
                       - 'success' (bool): True if credentials are valid, False if invalid.
+                      - 'data' (dict, optional): The admin session 'token' and its 'expires_in' (seconds).
                       - 'error' (str, optional): Error message if access is unauthorized.
 
     Note:
         This endpoint is protected and requires HTTP Basic Auth credentials for access.
         Credentials must be those of an administrator. Responses include HTTP status code 401 (Unauthorized)
-        for invalid credentials.
+        for invalid credentials. The returned token can be sent as 'Authorization: Bearer <token>' to the
+        other admin endpoints until it expires.
     """
     if not is_admin_authenticated(request):
         return jsonify({"success": False, "error": "Unauthorized access"}), 401
-    return jsonify({"success": True})
+    return jsonify({"success": True, "data": token_manager.issue_token(admin_username, role='admin')})
 
 # API Delete User
 @app.route('/user/delete', methods=['DELETE'])
@@ -103,9 +132,85 @@ def delete_user():
 # API Users List
 @app.route('/users', methods=['GET'])
 def list_users():
+    """
+    List users (admin only).
+
+    Query parameters:
+        counts (bool, optional): Add 'habit_count' and 'completion_count' to every user.
+        after (str, optional) / limit (int, optional): Keyset pagination on '_id', the response has 'next_after'.
+        stream (bool, optional): Stream every user as NDJSON (one JSON document per line) as they are read.
+
+    Without 'after', 'limit' or 'stream' the whole list is returned in one JSON document.
+    """
     if not is_admin_authenticated(request):
         return jsonify({"success": False, "error": "Unauthorized access"}), 401
-    return jsonify(User().list_all(db_handler))
+    with_counts = request.args.get('counts', '').lower() in ('1', 'true')
+
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        def generate():
+            for user in User.iterate_all(db_handler, with_counts=with_counts, batch_size=users_batch_size):
+                yield app.json.dumps(user) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    if 'after' in request.args or 'limit' in request.args:
+        limit = min(max(request.args.get('limit', 100, type=int), 1), users_batch_size)
+        result = User.list_page(db_handler, after=request.args.get('after'), limit=limit, with_counts=with_counts)
+        return jsonify(result), 200 if result['success'] else 400
+
+    return jsonify(User().list_all(db_handler, with_counts=with_counts))
+
+# Completion rate of all the users
+@app.route('/admin/completion_series', methods=['GET'])
+def admin_completion_series():
+    """
+    Completion rate of all the users per day or per week (admin only).
+
+    Query parameters:
+        start (str, optional) / end (str, optional): The days of the series ('YYYY-MM-DD'), the last year by default.
+        interval (str, optional): 'day' (default) or 'week'.
+        type (str, optional) / category (str, optional): Only count habits of this type or category.
+    """
+    if not is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    args = request.args
+    result = CompletionRollups(db_handler).series(None, args.get('start'), args.get('end'), args.get('interval', 'day'), args.get('type'), args.get('category'))
+    return jsonify(result), 200 if result['success'] else 400
+
+# Active users per day
+@app.route('/admin/analytics/activity', methods=['GET'])
+def admin_analytics_activity():
+    """
+    Active users, completions and completion rate of every day (admin only).
+
+    Query parameters:
+        days (int, optional): Number of days, today included (30 by default, at most CompletionRollups.MAX_DAYS).
+
+    The report is aggregated by MongoDB and cached for ADMIN_ANALYTICS_CACHE_TTL seconds.
+    """
+    if not is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    days = min(max(request.args.get('days', 30, type=int), 1), CompletionRollups.MAX_DAYS)
+    result = admin_analytics.activity(days)
+    return jsonify(result), 200 if result['success'] else 500
+
+# Completion rate by predefined habit and abandonment by category
+@app.route('/admin/analytics/habits', methods=['GET'])
+def admin_analytics_habits():
+    """
+    Streaks of every predefined habit and abandonment of every category (admin only).
+
+    Query parameters:
+        abandoned_after (int, optional): Days after the end of its period a habit not completed is abandoned (14 by default).
+        limit (int, optional): Largest number of habits and of categories, the most assigned first (100 by default).
+
+    The report is aggregated by MongoDB and cached for ADMIN_ANALYTICS_CACHE_TTL seconds.
+    """
+    if not is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    abandoned_after = min(max(request.args.get('abandoned_after', 14, type=int), 0), CompletionRollups.MAX_DAYS)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    result = admin_analytics.habits(abandoned_after, limit)
+    return jsonify(result), 200 if result['success'] else 500
 
 # API Add Habit
 @app.route('/habit/add', methods=['POST'])
@@ -114,7 +219,10 @@ def add_habit():
         return jsonify({"success": False, "error": "Unauthorized access"}), 401
     data = Utils.normalize_auth_credentials(request)
     habit = Habit()
-    return jsonify(habit.add_habit(db_handler, data))
+    result = habit.add_habit(db_handler, data)
+    if result['success']:
+        habit_catalog.invalidate()
+    return jsonify(result)
 
 # API Remove Habit
 @app.route('/habit/remove', methods=['DELETE'])
@@ -123,7 +231,10 @@ def remove_habit():
         return jsonify({"success": False, "error": "Unauthorized access"}), 401
     data = Utils.normalize_auth_credentials(request)
     habit_id = data.get('_id')
-    return jsonify(Habit().remove(db_handler, habit_id))
+    result = Habit().remove(db_handler, habit_id)
+    if result['success']:
+        habit_catalog.invalidate()
+    return jsonify(result)
 
 ##############
 # User Methods
@@ -146,46 +257,80 @@ def register_user():
 def login_user():
     data = Utils.normalize_auth_credentials(request)
     user = User(username=data.get('username'), password=data.get('password'))
-    return jsonify(user.login(db_handler))
+    result = user.login(db_handler)
+    # Issue a session token, so the next requests are verified without hashing the password again
+    if result.get('success'):
+        result['data'].update(token_manager.issue_token(result['data']['username']))
+    return jsonify(result)
 
 # API List pre setted habits (no auth required)
 @app.route('/habits', methods=['GET'])
 def list_habits():
-    habit_type = request.args.get('type')
-    if habit_type:
-        return jsonify(Habit.list_all(db_handler, type=habit_type))
+    """
+    List the pre setted habits, optionally filtered by 'type'.
+
+    The serialized catalog is cached in the process and sent with a strong ETag and Cache-Control,
+    a request whose If-None-Match matches gets a 304 without a body.
+    """
+    entry, error = habit_catalog.get(request.args.get('type'))
+    if error:
+        return jsonify(error)
+
+    if request.if_none_match.contains(entry['etag']):
+        response = Response(status=304)
     else:
-        return jsonify(Habit.list_all(db_handler))
+        response = Response(entry['body'], mimetype='application/json')
+    response.set_etag(entry['etag'])
+    response.headers['Cache-Control'] = habit_catalog.cache_control
+    return response
 
 ##########################################
 # User Engine Methods (habitTracker Class)
 ##########################################
 
 # List habits assigned to User
-@app.route('/user/habits', methods=['POST'])
+@app.route('/user/habits', methods=['GET', 'POST'])
 def list_habits_from_user():
     try:
-        username, error = Utils.authenticate_user(request, db_handler)
+        ctx = RequestContext(request, db_handler, token_manager)
+        username, error = ctx.authenticate()
         if error:
             return jsonify({"success": False, "error": error}), 401
 
         habit_tracker = HabitTracker(db_handler)
 
-        data = Utils.normalize_auth_credentials(request)
+        data = ctx.data
         type = data.get('type')
-        return jsonify(habit_tracker.list_user_habits(username,type))
+        return versioned_response(ctx.etag(), lambda: habit_tracker.list_user_habits(username, type, user=ctx.user))
     except Exception as e:
         return jsonify({"success": False, 'error': 'An error occurred', 'details': str(e)}), 500
 
+# List completion history of a User's Habit
+@app.route('/user/habit_history', methods=['GET', 'POST'])
+def habit_history_from_user():
+    """List the completion history of a user's habit."""
+    ctx = RequestContext(request, db_handler, token_manager)
+    username, error = ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    habit_id = ctx.data.get('habit_id')
+    if not habit_id:
+        return jsonify({"success": False, 'error': 'habit_id is required'}), 400
+
+    habit_tracker = HabitTracker(db_handler)
+    return versioned_response(ctx.etag(), lambda: habit_tracker.list_habit_history(username, habit_id, user=ctx.user))
+
 # Assign Habit (pre setted habit) to User Endpoint
 @app.route('/user/assign_habit', methods=['POST'])
 def assign_habit_to_user():
     """ Assign a pre setted habit to a user. """
-    username, error = Utils.authenticate_user(request, db_handler)
+    ctx = RequestContext(request, db_handler, token_manager)
+    username, error = ctx.authenticate()
     if error:
         return jsonify({"success": False, "error": error}), 401
 
-    data = Utils.normalize_auth_credentials(request)
+    data = ctx.data
     habit_id = data.get('habit_id')
     start_range = data.get('start_range')
     end_range = data.get('end_range')
@@ -194,17 +339,18 @@ def assign_habit_to_user():
         return jsonify({"success": False, 'error': 'Missing required fields (username, habit_id, start_range, end_range)'}), 400
 
     habit_tracker = HabitTracker(db_handler)
-    return jsonify(habit_tracker.assign_habit(username, habit_id, start_range, end_range))
+    return jsonify(habit_tracker.assign_habit(username, habit_id, start_range, end_range, user=ctx.user))
 
 # Assign Custom Habit to User Endpoint
 @app.route('/user/assign_custom_habit', methods=['POST'])
 def assign__custom_habit_to_user():
     """Assign a custom habit to a user."""
-    username, error = Utils.authenticate_user(request, db_handler)
+    ctx = RequestContext(request, db_handler, token_manager)
+    username, error = ctx.authenticate()
     if error:
         return jsonify({"success": False, "error": error}), 401
     
-    data = Utils.normalize_auth_credentials(request)
+    data = ctx.data
 
     # Habit content
     name = data.get('name') # required
@@ -219,18 +365,19 @@ def assign__custom_habit_to_user():
         return jsonify({"success": False, 'error': 'Missing required fields (username, name, type, start_range, end_range)'}), 400
 
     habit_tracker = HabitTracker(db_handler)
-    result = habit_tracker.assign_custom_habit(username, name, type, start_range, end_range, category, subcategory, description)
+    result = habit_tracker.assign_custom_habit(username, name, type, start_range, end_range, category, subcategory, description, user=ctx.user)
     return jsonify(result)
 
 # Remove Habit from User Endpoint
 @app.route('/user/remove_habit', methods=['POST'])
 def remove_habit_from_user():
     """Remove a habit from a user."""
-    username, error = Utils.authenticate_user(request, db_handler)
+    ctx = RequestContext(request, db_handler, token_manager)
+    username, error = ctx.authenticate()
     if error:
         return jsonify({"success": False, "error": error}), 401
 
-    data = Utils.normalize_auth_credentials(request)
+    data = ctx.data
 
     habit_id = data.get('habit_id')
 
@@ -238,7 +385,7 @@ def remove_habit_from_user():
         return jsonify({"success": False, 'error': 'Username and habit_id are required'}), 400
 
     habit_tracker = HabitTracker(db_handler)
-    result = habit_tracker.remove_habit(username, habit_id)
+    result = habit_tracker.remove_habit(username, habit_id, user=ctx.user)
 
     return jsonify(result)
 
@@ -251,11 +398,12 @@ def remove_habit_from_user():
 @app.route('/user/update_daily_habit', methods=['POST'])
 def update_daily_habit_from_user():
     """Update the a user's habit."""
-    username, error = Utils.authenticate_user(request, db_handler)
+    ctx = RequestContext(request, db_handler, token_manager)
+    username, error = ctx.authenticate()
     if error:
         return jsonify({"success": False, "error": error}), 401
 
-    data = Utils.normalize_auth_credentials(request)
+    data = ctx.data
     habit_id = data.get('habit_id') # required
     completion_date = data.get('completion_date') # required
     continue_habit = data.get('continue_habit', True) # optional
@@ -263,27 +411,28 @@ def update_daily_habit_from_user():
     if not all([username, habit_id, completion_date]):
         return jsonify({"success": False, 'error': 'Username, habit_id, and completion_date are required'}), 400
 
-    # Validate date
+    # Validate date (parsed once, the tracker receives a datetime)
     try:
-        datetime.datetime.strptime(completion_date, '%Y-%m-%d %H:%M')
+        completion_date = Utils.parse_datetime(completion_date)
     except ValueError:
         return {'success': False, 'error': 'Invalid date format. Date should be in YYYY-MM-DD HH:MM format.'}
     except TypeError:
         return {'success': False, 'error': 'Missing completion_date.'}
 
     habit_tracker = HabitTracker(db_handler)
-    result = habit_tracker.update_daily_habit(username, habit_id, completion_date, continue_habit)
+    result = habit_tracker.update_daily_habit(username, habit_id, completion_date, continue_habit, user=ctx.user)
 
     return jsonify(result)
 # Complete weekly Habit Endpoint
 @app.route('/user/update_weekly_habit', methods=['POST'])
 def update_weekly_habit_from_user():
     """Update the a user's habit."""
-    username, error = Utils.authenticate_user(request, db_handler)
+    ctx = RequestContext(request, db_handler, token_manager)
+    username, error = ctx.authenticate()
     if error:
         return jsonify({"success": False, "error": error}), 401
 
-    data = Utils.normalize_auth_credentials(request)
+    data = ctx.data
     habit_id = data.get('habit_id') # required
     completion_date = data.get('completion_date') # required
     continue_habit = data.get('continue_habit', False) # optional
@@ -291,16 +440,61 @@ def update_weekly_habit_from_user():
     if not all([username, habit_id, completion_date]):
         return jsonify({"success": False, 'error': 'Username, habit_id, and completion_date are required'}), 400
 
-    # Validate date
+    # Validate date (parsed once, the tracker receives a datetime)
     try:
-        datetime.datetime.strptime(completion_date, '%Y-%m-%d %H:%M')
+        completion_date = Utils.parse_datetime(completion_date)
     except ValueError:
         return {'success': False, 'error': 'Invalid date format. Date should be in YYYY-MM-DD HH:MM format.'}
     except TypeError:
         return {'success': False, 'error': 'Missing completion_date.'}
 
     habit_tracker = HabitTracker(db_handler)
-    result = habit_tracker.update_weekly_habit(username, habit_id, completion_date, continue_habit)
+    result = habit_tracker.update_weekly_habit(username, habit_id, completion_date, continue_habit, user=ctx.user)
+
+    return jsonify(result)
+# Complete many Habits Endpoint
+@app.route('/user/complete_batch', methods=['POST'])
+def complete_batch_from_user():
+    """Apply a list of habit completions in order."""
+    ctx = RequestContext(request, db_handler, token_manager)
+    username, error = ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    data = ctx.data
+    items = data.get('items') # required, [{habit_id, completion_date, continue_habit}]
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"success": False, 'error': 'items must be a non-empty list'}), 400
+    if len(items) > complete_batch_max_items:
+        return jsonify({"success": False, 'error': f'At most {complete_batch_max_items} items are allowed'}), 400
+
+    habit_tracker = HabitTracker(db_handler)
+    result = habit_tracker.complete_batch(username, items, user=ctx.user)
+
+    return jsonify(result)
+# Catch up Habits Endpoint
+@app.route('/user/catch_up', methods=['POST'])
+def catch_up_from_user():
+    """Move the user's habits past the periods missed while away."""
+    ctx = RequestContext(request, db_handler, token_manager)
+    username, error = ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    data = ctx.data
+    habit_id = data.get('habit_id') # optional, all habits by default
+    date = data.get('date') # optional, current time by default
+
+    # Validate date
+    if date:
+        try:
+            date = Utils.parse_datetime(date)
+        except (ValueError, TypeError):
+            return jsonify({'success': False, 'error': 'Invalid date format. Date should be in YYYY-MM-DD HH:MM format.'}), 400
+
+    habit_tracker = HabitTracker(db_handler)
+    result = habit_tracker.catch_up_habits(username, habit_id=habit_id, now=date, user=ctx.user)
 
     return jsonify(result)
 
@@ -308,52 +502,51 @@ def update_weekly_habit_from_user():
 # User Analytics Methods
 #
 
+# Completion rate of the user per day or per week
+@app.route('/user/completion_series', methods=['GET', 'POST'])
+def completion_series():
+    """Completion rate of the user's habits per day or per week, read from the daily rollups."""
+    ctx = RequestContext(request, db_handler, token_manager)
+    username, error = ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    data = ctx.data
+    habit_tracker = HabitTracker(db_handler)
+    result = habit_tracker.completion_series(username, data.get('start'), data.get('end'), data.get('interval', 'day'), data.get('type'), data.get('category'))
+    return jsonify(result), 200 if result['success'] else 400
+
 # Get Habit with Longest Streak
-@app.route('/user/longest_streak', methods=['POST'])
+@app.route('/user/longest_streak', methods=['GET', 'POST'])
 def longest_streak():
     try:
-        username, error = Utils.authenticate_user(request, db_handler)
+        ctx = RequestContext(request, db_handler, token_manager)
+        username, error = ctx.authenticate()
         if error:
             return jsonify({"success": False, "error": error}), 401
 
         habit_tracker = HabitTracker(db_handler)
 
-        data = Utils.normalize_auth_credentials(request)
+        data = ctx.data
         type = data.get('type')
-        return jsonify(habit_tracker.longest_streak_habit(username,type))
+        return versioned_response(ctx.etag(load_user=False), lambda: habit_tracker.longest_streak_habit(username, type))
     except Exception as e:
         return jsonify({"success": False, 'error': 'An error occurred', 'details': str(e)}), 500
 # Get most Struggle Habit
-@app.route('/user/strugglest_habit', methods=['POST'])
+@app.route('/user/strugglest_habit', methods=['GET', 'POST'])
 def strugglest_habit():
     try:
-        username, error = Utils.authenticate_user(request, db_handler)
+        ctx = RequestContext(request, db_handler, token_manager)
+        username, error = ctx.authenticate()
         if error:
             return jsonify({"success": False, "error": error}), 401
 
         habit_tracker = HabitTracker(db_handler)
 
-        data = Utils.normalize_auth_credentials(request)
+        data = ctx.data
         type = data.get('type')
-        return jsonify(habit_tracker.strugglest_habit(username,type))
+        return versioned_response(ctx.etag(load_user=False), lambda: habit_tracker.strugglest_habit(username, type))
     except Exception as e:
         return jsonify({"success": False, 'error': 'An error occurred', 'details': str(e)}), 500
-# Execute data simulation
-def run_data_simulation():
-    # Create and run the data simulator using global variables for MongoDB settings
-    simulator = DataSimulator(mongo_uri=mongo_uri,
-                              mongo_db_name=mongo_db_name,
-                              config_file=config_file,
-                              success_probability=success_probability,
-                              interactions_path=interactions_path)
-    success = simulator.run_simulation()
-    if success:
-        print("Data simulation completed successfully.")
-    else:
-        print("Data simulation encountered errors.")
-
-# Run the data simulation before starting the Flask app
-run_data_simulation()
-
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=backend_port, debug=True)
\ No newline at end of file
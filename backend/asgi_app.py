@@ -0,0 +1,478 @@
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
+from werkzeug.security import check_password_hash, generate_password_hash
+from classes.async_mongodb_handler import AsyncMongoDBHandler
+from classes.async_user import AsyncUser
+from classes.async_habit import AsyncHabit
+from classes.async_habit_tracker import AsyncHabitTracker
+from classes.async_habit_catalog import AsyncHabitCatalog
+from classes.async_completion_rollups import AsyncCompletionRollups
+from classes.async_admin_analytics import AsyncAdminAnalytics
+from classes.async_request_context import AsyncRequestContext
+from classes.utils import Utils
+from classes.token_manager import TokenManager
+from classes.json_provider import JSONProvider
+from settings import (backend_port, admin_username, admin_password, session_secret_key, session_token_expiration,
+                      mongo_uri, mongo_db_name, users_batch_size, complete_batch_max_items, habits_cache_max_age, habits_version_check_interval,
+                      admin_analytics_cache_ttl)
+
+# asyncio build of the API: same routes, arguments and responses as app.py, served by an ASGI server, e.g.
+#   hypercorn asgi_app:app --bind 0.0.0.0:5000
+# MongoDB is accessed with motor and PBKDF2 runs in a thread pool, so a single process keeps serving
+# other requests while one waits for the database or hashes a password.
+
+# Admin password hash
+admin_password_hash = generate_password_hash(admin_password, method='pbkdf2:sha256')
+
+# Utility function
+async def is_admin_authenticated(request):
+    """
+    Check if the admin credentials provided in the request are valid.
+
+    See app.is_admin_authenticated, the password hash is checked in the thread pool.
+
+    Args:
+        request (Request): The Quart request object, containing the authorization header.
+
+    Returns:
+        bool: True if the provided credentials match the admin credentials, False otherwise.
+    """
+    token = Utils.get_bearer_token(request)
+    if token:
+        return token_manager.verify_token(token, role='admin') == admin_username
+
+    admin_user = request.authorization.username if request.authorization else ''
+    admin_pass = request.authorization.password if request.authorization else ''
+    return admin_user == admin_username and await Utils.run_in_executor(check_password_hash, admin_password_hash, admin_pass)
+
+# Conditional response of a listing computed from the user's habits
+async def versioned_response(etag, build_result):
+    """
+    Respond with the result of a listing, tagged with the ETag of the user's version.
+
+    See app.versioned_response.
+
+    Args:
+        etag (str): The ETag of the request context (AsyncRequestContext.etag), None if it could not be built.
+        build_result (callable): Coroutine function building the result dict when the client needs it.
+
+    Returns:
+        Response: The JSON response, or an empty 304.
+    """
+    if etag and request.method == 'GET' and request.if_none_match.contains(etag):
+        response = Response('', status=304)
+    else:
+        response = jsonify(await build_result())
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Quart app initialization and CORS setup
+app = Quart(__name__)
+# dates are stored as datetimes, clients receive them as 'YYYY-MM-DD HH:MM'
+app.json = JSONProvider(app)
+
+# TODO: This should allow only the correct origin
+app = cors(app, allow_origin='*')
+
+# create instance of the asyncio mongodb handler
+db_handler = AsyncMongoDBHandler(mongo_uri, mongo_db_name)
+
+# create instance of the pre setted habits catalog cache
+habit_catalog = AsyncHabitCatalog(db_handler, serialize=app.json.dumps, max_age=habits_cache_max_age, check_interval=habits_version_check_interval)
+
+# create instance of the admin analytics, cached for the whole process
+admin_analytics = AsyncAdminAnalytics(db_handler, ttl=admin_analytics_cache_ttl)
+
+# create instance of session token manager
+token_manager = TokenManager(session_secret_key, expires_in=session_token_expiration)
+
+###############
+# ADMIN methods
+###############
+
+# Verifies ADMIN
+@app.route('/admin/validate', methods=['POST'])
+async def validate_admin():
+    """Validate admin access and issue an admin session token."""
+    if not await is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    return jsonify({"success": True, "data": token_manager.issue_token(admin_username, role='admin')})
+
+# API Delete User
+@app.route('/user/delete', methods=['DELETE'])
+async def delete_user():
+    if not await is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    ctx = await AsyncRequestContext.create(request, db_handler)
+    user_id = ctx.data.get('_id')
+    return jsonify(await AsyncUser().delete(db_handler, user_id))
+
+# API Users List
+@app.route('/users', methods=['GET'])
+async def list_users():
+    """List users (admin only), with the query parameters of app.list_users."""
+    if not await is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    with_counts = request.args.get('counts', '').lower() in ('1', 'true')
+
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        async def generate():
+            async for user in AsyncUser.iterate_all(db_handler, with_counts=with_counts, batch_size=users_batch_size):
+                yield app.json.dumps(user) + '\n'
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    if 'after' in request.args or 'limit' in request.args:
+        limit = min(max(request.args.get('limit', 100, type=int), 1), users_batch_size)
+        result = await AsyncUser.list_page(db_handler, after=request.args.get('after'), limit=limit, with_counts=with_counts)
+        return jsonify(result), 200 if result['success'] else 400
+
+    return jsonify(await AsyncUser.list_all(db_handler, with_counts=with_counts))
+
+# Completion rate of all the users
+@app.route('/admin/completion_series', methods=['GET'])
+async def admin_completion_series():
+    """Completion rate of all the users per day or per week (admin only), with the query parameters of app.admin_completion_series."""
+    if not await is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    args = request.args
+    result = await AsyncCompletionRollups(db_handler).series(None, args.get('start'), args.get('end'), args.get('interval', 'day'), args.get('type'), args.get('category'))
+    return jsonify(result), 200 if result['success'] else 400
+
+# Active users per day
+@app.route('/admin/analytics/activity', methods=['GET'])
+async def admin_analytics_activity():
+    """Active users, completions and completion rate of every day (admin only), with the query parameters of app.admin_analytics_activity."""
+    if not await is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    days = min(max(request.args.get('days', 30, type=int), 1), AsyncCompletionRollups.MAX_DAYS)
+    result = await admin_analytics.activity(days)
+    return jsonify(result), 200 if result['success'] else 500
+
+# Completion rate by predefined habit and abandonment by category
+@app.route('/admin/analytics/habits', methods=['GET'])
+async def admin_analytics_habits():
+    """Streaks of every predefined habit and abandonment of every category (admin only), with the query parameters of app.admin_analytics_habits."""
+    if not await is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    abandoned_after = min(max(request.args.get('abandoned_after', 14, type=int), 0), AsyncCompletionRollups.MAX_DAYS)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    result = await admin_analytics.habits(abandoned_after, limit)
+    return jsonify(result), 200 if result['success'] else 500
+
+# API Add Habit
+@app.route('/habit/add', methods=['POST'])
+async def add_habit():
+    if not await is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    ctx = await AsyncRequestContext.create(request, db_handler)
+    result = await AsyncHabit().add_habit(db_handler, ctx.data)
+    if result['success']:
+        await habit_catalog.invalidate()
+    return jsonify(result)
+
+# API Remove Habit
+@app.route('/habit/remove', methods=['DELETE'])
+async def remove_habit():
+    if not await is_admin_authenticated(request):
+        return jsonify({"success": False, "error": "Unauthorized access"}), 401
+    ctx = await AsyncRequestContext.create(request, db_handler)
+    habit_id = ctx.data.get('_id')
+    result = await AsyncHabit().remove(db_handler, habit_id)
+    if result['success']:
+        await habit_catalog.invalidate()
+    return jsonify(result)
+
+##############
+# User Methods
+##############
+
+# API Register
+@app.route('/register', methods=['POST'])
+async def register_user():
+    data = (await AsyncRequestContext.create(request, db_handler)).data
+    # Check if email and name are present
+    if not data.get('email') or not data.get('name'):
+        return jsonify({"success": False, "error": "Missing email or name"}), 400 # Bad Request error
+
+    new_user = AsyncUser(username=data.get('username'), password=data.get('password'), email=data.get('email'), name=data.get('name'))
+    return jsonify(await new_user.register(db_handler))
+
+# API Login
+@app.route('/login', methods=['POST'])
+async def login_user():
+    data = (await AsyncRequestContext.create(request, db_handler)).data
+    user = AsyncUser(username=data.get('username'), password=data.get('password'))
+    result = await user.login(db_handler)
+    # Issue a session token, so the next requests are verified without hashing the password again
+    if result.get('success'):
+        result['data'].update(token_manager.issue_token(result['data']['username']))
+    return jsonify(result)
+
+# API List pre setted habits (no auth required)
+@app.route('/habits', methods=['GET'])
+async def list_habits():
+    """
+    List the pre setted habits, optionally filtered by 'type'.
+
+    The serialized catalog is cached in the process and sent with a strong ETag and Cache-Control,
+    a request whose If-None-Match matches gets a 304 without a body.
+    """
+    entry, error = await habit_catalog.get(request.args.get('type'))
+    if error:
+        return jsonify(error)
+
+    if request.if_none_match.contains(entry['etag']):
+        response = Response(status=304)
+    else:
+        response = Response(entry['body'], mimetype='application/json')
+    response.set_etag(entry['etag'])
+    response.headers['Cache-Control'] = habit_catalog.cache_control
+    return response
+
+##########################################
+# User Engine Methods (habitTracker Class)
+##########################################
+
+# List habits assigned to User
+@app.route('/user/habits', methods=['GET', 'POST'])
+async def list_habits_from_user():
+    try:
+        ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+        username, error = await ctx.authenticate()
+        if error:
+            return jsonify({"success": False, "error": error}), 401
+
+        habit_tracker = AsyncHabitTracker(db_handler)
+
+        type = ctx.data.get('type')
+        async def build_result():
+            return await habit_tracker.list_user_habits(username, type, user=await ctx.get_user())
+        return await versioned_response(await ctx.etag(), build_result)
+    except Exception as e:
+        return jsonify({"success": False, 'error': 'An error occurred', 'details': str(e)}), 500
+
+# List completion history of a User's Habit
+@app.route('/user/habit_history', methods=['GET', 'POST'])
+async def habit_history_from_user():
+    """List the completion history of a user's habit."""
+    ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+    username, error = await ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    habit_id = ctx.data.get('habit_id')
+    if not habit_id:
+        return jsonify({"success": False, 'error': 'habit_id is required'}), 400
+
+    habit_tracker = AsyncHabitTracker(db_handler)
+    async def build_result():
+        return await habit_tracker.list_habit_history(username, habit_id, user=await ctx.get_user())
+    return await versioned_response(await ctx.etag(), build_result)
+
+# Assign Habit (pre setted habit) to User Endpoint
+@app.route('/user/assign_habit', methods=['POST'])
+async def assign_habit_to_user():
+    """ Assign a pre setted habit to a user. """
+    ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+    username, error = await ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    data = ctx.data
+    habit_id = data.get('habit_id')
+    start_range = data.get('start_range')
+    end_range = data.get('end_range')
+
+    if not all([username, habit_id, start_range, end_range]):
+        return jsonify({"success": False, 'error': 'Missing required fields (username, habit_id, start_range, end_range)'}), 400
+
+    habit_tracker = AsyncHabitTracker(db_handler)
+    return jsonify(await habit_tracker.assign_habit(username, habit_id, start_range, end_range, user=await ctx.get_user()))
+
+# Assign Custom Habit to User Endpoint
+@app.route('/user/assign_custom_habit', methods=['POST'])
+async def assign__custom_habit_to_user():
+    """Assign a custom habit to a user."""
+    ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+    username, error = await ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    data = ctx.data
+
+    # Habit content
+    name = data.get('name') # required
+    type = data.get('type') # required (verify habit_tracker.py)
+    start_range = data.get('start_range')
+    end_range = data.get('end_range')
+    category = data.get('category', '') # optional
+    subcategory = data.get('subcategory', '') # optional
+    description = data.get('description', '') # optional
+
+    if not all([username, name, type, start_range, end_range]):
+        return jsonify({"success": False, 'error': 'Missing required fields (username, name, type, start_range, end_range)'}), 400
+
+    habit_tracker = AsyncHabitTracker(db_handler)
+    result = await habit_tracker.assign_custom_habit(username, name, type, start_range, end_range, category, subcategory, description, user=await ctx.get_user())
+    return jsonify(result)
+
+# Remove Habit from User Endpoint
+@app.route('/user/remove_habit', methods=['POST'])
+async def remove_habit_from_user():
+    """Remove a habit from a user."""
+    ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+    username, error = await ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    habit_id = ctx.data.get('habit_id')
+
+    if not username or not habit_id:
+        return jsonify({"success": False, 'error': 'Username and habit_id are required'}), 400
+
+    habit_tracker = AsyncHabitTracker(db_handler)
+    return jsonify(await habit_tracker.remove_habit(username, habit_id, user=await ctx.get_user()))
+
+#
+# Habit Complete Methods
+#
+
+# shared by the daily and weekly completion endpoints
+async def complete_habit_from_user(habit_type, continue_default):
+    """
+    Validate a completion request and apply it to a daily or weekly habit.
+
+    Args:
+        habit_type (str): 'daily' or 'weekly'.
+        continue_default (bool): The value of 'continue_habit' when the request does not send it.
+
+    Returns:
+        The Quart response, as returned by the matching app.py endpoint.
+    """
+    ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+    username, error = await ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    data = ctx.data
+    habit_id = data.get('habit_id') # required
+    completion_date = data.get('completion_date') # required
+    continue_habit = data.get('continue_habit', continue_default) # optional
+
+    if not all([username, habit_id, completion_date]):
+        return jsonify({"success": False, 'error': 'Username, habit_id, and completion_date are required'}), 400
+
+    # Validate date (parsed once, the tracker receives a datetime)
+    try:
+        completion_date = Utils.parse_datetime(completion_date)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid date format. Date should be in YYYY-MM-DD HH:MM format.'})
+    except TypeError:
+        return jsonify({'success': False, 'error': 'Missing completion_date.'})
+
+    habit_tracker = AsyncHabitTracker(db_handler)
+    complete = habit_tracker.update_daily_habit if habit_type == 'daily' else habit_tracker.update_weekly_habit
+    return jsonify(await complete(username, habit_id, completion_date, continue_habit, user=await ctx.get_user()))
+
+# Complete daily Habit Endpoint
+@app.route('/user/update_daily_habit', methods=['POST'])
+async def update_daily_habit_from_user():
+    """Update the a user's habit."""
+    return await complete_habit_from_user('daily', True)
+
+# Complete weekly Habit Endpoint
+@app.route('/user/update_weekly_habit', methods=['POST'])
+async def update_weekly_habit_from_user():
+    """Update the a user's habit."""
+    return await complete_habit_from_user('weekly', False)
+
+# Complete many Habits Endpoint
+@app.route('/user/complete_batch', methods=['POST'])
+async def complete_batch_from_user():
+    """Apply a list of habit completions in order."""
+    ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+    username, error = await ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    items = ctx.data.get('items') # required, [{habit_id, completion_date, continue_habit}]
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"success": False, 'error': 'items must be a non-empty list'}), 400
+    if len(items) > complete_batch_max_items:
+        return jsonify({"success": False, 'error': f'At most {complete_batch_max_items} items are allowed'}), 400
+
+    habit_tracker = AsyncHabitTracker(db_handler)
+    return jsonify(await habit_tracker.complete_batch(username, items, user=await ctx.get_user()))
+
+# Catch up Habits Endpoint
+@app.route('/user/catch_up', methods=['POST'])
+async def catch_up_from_user():
+    """Move the user's habits past the periods missed while away."""
+    ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+    username, error = await ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    habit_id = ctx.data.get('habit_id') # optional, all habits by default
+    date = ctx.data.get('date') # optional, current time by default
+
+    # Validate date
+    if date:
+        try:
+            date = Utils.parse_datetime(date)
+        except (ValueError, TypeError):
+            return jsonify({'success': False, 'error': 'Invalid date format. Date should be in YYYY-MM-DD HH:MM format.'}), 400
+
+    habit_tracker = AsyncHabitTracker(db_handler)
+    return jsonify(await habit_tracker.catch_up_habits(username, habit_id=habit_id, now=date, user=await ctx.get_user()))
+
+#
+# User Analytics Methods
+#
+
+# Completion rate of the user per day or per week
+@app.route('/user/completion_series', methods=['GET', 'POST'])
+async def completion_series():
+    """Completion rate of the user's habits per day or per week, read from the daily rollups."""
+    ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+    username, error = await ctx.authenticate()
+    if error:
+        return jsonify({"success": False, "error": error}), 401
+
+    data = ctx.data
+    habit_tracker = AsyncHabitTracker(db_handler)
+    result = await habit_tracker.completion_series(username, data.get('start'), data.get('end'), data.get('interval', 'day'), data.get('type'), data.get('category'))
+    return jsonify(result), 200 if result['success'] else 400
+
+# Get Habit with Longest Streak
+@app.route('/user/longest_streak', methods=['GET', 'POST'])
+async def longest_streak():
+    try:
+        ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+        username, error = await ctx.authenticate()
+        if error:
+            return jsonify({"success": False, "error": error}), 401
+
+        habit_tracker = AsyncHabitTracker(db_handler)
+        return await versioned_response(await ctx.etag(load_user=False), lambda: habit_tracker.longest_streak_habit(username, ctx.data.get('type')))
+    except Exception as e:
+        return jsonify({"success": False, 'error': 'An error occurred', 'details': str(e)}), 500
+# Get most Struggle Habit
+@app.route('/user/strugglest_habit', methods=['GET', 'POST'])
+async def strugglest_habit():
+    try:
+        ctx = await AsyncRequestContext.create(request, db_handler, token_manager)
+        username, error = await ctx.authenticate()
+        if error:
+            return jsonify({"success": False, "error": error}), 401
+
+        habit_tracker = AsyncHabitTracker(db_handler)
+        return await versioned_response(await ctx.etag(load_user=False), lambda: habit_tracker.strugglest_habit(username, ctx.data.get('type')))
+    except Exception as e:
+        return jsonify({"success": False, 'error': 'An error occurred', 'details': str(e)}), 500
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=backend_port)
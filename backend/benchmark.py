@@ -0,0 +1,185 @@
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pymongo import monitoring
+
+from classes.completion_rollups import CompletionRollups
+from classes.habit_tracker import HabitTracker
+from classes.utils import Utils
+from data_simulator import DataSimulator
+
+# Latency, database round trips and peak memory of the habit engine and of the Flask routes, on synthetic users
+# of growing size, e.g. `python benchmark.py --habits 10 100 --completions 1000 10000 --output results.json`.
+# Every run writes to its own database (--db-name), emptied before each scenario.
+
+class RoundTrips(monitoring.CommandListener):
+    # Counts the commands sent to MongoDB by every client of the process (find, update, getMore...)
+    def __init__(self):
+        self.count = 0
+    def started(self, event):
+        self.count += 1
+    def succeeded(self, event):
+        pass
+    def failed(self, event):
+        pass
+
+# Registered before any MongoClient is opened, clients only pick up the listeners known at creation
+round_trips = RoundTrips()
+monitoring.register(round_trips)
+
+def scenario_days(templates, habits, completions):
+    # Days of history giving about 'completions' entries to a user of 'habits' habits (weekly habits complete every 7th day)
+    daily = sum(1 for index in range(habits) if templates[index % len(templates)]['type'] == 'daily')
+    return max(1, math.ceil(completions / (daily + (habits - daily) / 7)))
+
+def latency_summary(samples):
+    # Milliseconds; nearest-rank percentiles
+    ordered = sorted(samples)
+    values = {'min': ordered[0], 'p50': Utils.percentile(ordered, 50), 'p95': Utils.percentile(ordered, 95),
+              'max': ordered[-1], 'mean': statistics.fmean(ordered)}
+    return {name: round(value * 1000, 3) for name, value in values.items()}
+
+def succeeded(result):
+    # Engine calls return a result dict, routes a test client response
+    if hasattr(result, 'status_code'):
+        return result.status_code < 400 and (result.get_json(silent=True) or {}).get('success', True)
+    return bool(result.get('success'))
+
+def measure(call, iterations, warmup):
+    for _ in range(warmup):
+        call()
+    samples, errors = [], 0
+    round_trips.count = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = call()
+        samples.append(time.perf_counter() - started)
+        errors += not succeeded(result)
+    commands = round_trips.count
+    # One more call under tracemalloc, kept out of the timed ones because tracing slows every allocation
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'iterations': iterations, 'errors': errors, 'latency_ms': latency_summary(samples),
+            'round_trips': round(commands / iterations, 2), 'peak_memory_kb': round(peak / 1024, 1)}
+
+def operations(web, username, habit_id, next_check_in, token):
+    tracker = HabitTracker(web.db_handler)
+    client = web.app.test_client()
+    headers = {'Authorization': f"Bearer {token}"}
+    return [
+        ('engine', 'check_in', lambda: tracker.update_daily_habit(username, habit_id, next_check_in(), True)),
+        ('engine', 'list_habits', lambda: tracker.list_user_habits(username)),
+        ('engine', 'habit_history', lambda: tracker.list_habit_history(username, habit_id)),
+        ('engine', 'longest_streak', lambda: tracker.longest_streak_habit(username, 'daily')),
+        ('engine', 'strugglest_habit', lambda: tracker.strugglest_habit(username, 'daily')),
+        ('engine', 'completion_series', lambda: tracker.completion_series(username)),
+        ('http', 'POST /user/update_daily_habit', lambda: client.post('/user/update_daily_habit', headers=headers, json={
+            'habit_id': habit_id, 'completion_date': Utils.format_datetime(next_check_in())})),
+        ('http', 'GET /user/habits', lambda: client.get('/user/habits', headers=headers)),
+        ('http', 'GET /user/habit_history', lambda: client.get('/user/habit_history', headers=headers, query_string={'habit_id': habit_id})),
+        ('http', 'GET /user/longest_streak', lambda: client.get('/user/longest_streak', headers=headers, query_string={'type': 'daily'})),
+        ('http', 'GET /user/strugglest_habit', lambda: client.get('/user/strugglest_habit', headers=headers, query_string={'type': 'daily'})),
+        ('http', 'GET /user/completion_series', lambda: client.get('/user/completion_series', headers=headers)),
+    ]
+
+def run_scenario(web, simulator, config, habits, completions, args):
+    db_handler = web.db_handler
+    for collection in ('users', 'completions', CompletionRollups.COLLECTION):
+        db_handler.delete_documents(collection, {})
+
+    days = scenario_days(simulator.scale_habit_templates(config), habits, completions)
+    today = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    started = time.perf_counter()
+    written = simulator.simulate_scale_users(db_handler, config, 0, args.users, habits, days, today - datetime.timedelta(days=days),
+                                             None, random.Random(args.seed), args.chunk_size)
+    build_seconds = time.perf_counter() - started
+
+    # The first simulated user is measured, the others only add volume to the collections
+    username = f"{DataSimulator.scale_username_prefix}{0:07d}"
+    user = db_handler.find_document('users', {'username': username})
+    habit = next(habit for habit in user['habits'] if habit['type'] == 'daily')
+    # Each check-in is one day later, inside the period the previous one opened
+    check_ins = iter(range(1, sys.maxsize))
+    first_check_in = Utils.parse_datetime(habit['start_range']) + datetime.timedelta(minutes=1)
+    def next_check_in():
+        return first_check_in + datetime.timedelta(days=next(check_ins) - 1)
+    login = web.app.test_client().post('/login', json={'username': username, 'password': DataSimulator.scale_password}).get_json()
+
+    results = []
+    for layer, name, call in operations(web, username, habit['_id'], next_check_in, login['data']['token']):
+        result = {'layer': layer, 'operation': name, **measure(call, args.iterations, args.warmup)}
+        results.append(result)
+        print(f"  {layer:<6} {name:<32} p50 {result['latency_ms']['p50']:>9.3f} ms  p95 {result['latency_ms']['p95']:>9.3f} ms  "
+              f"{result['round_trips']:>6} round trips  {result['peak_memory_kb']:>9.1f} KiB" + (f"  {result['errors']} errors" if result['errors'] else ''))
+    return {'habits': habits, 'completions': completions, 'users': args.users, 'days': days,
+            'completions_per_user': round(written / args.users), 'build_seconds': round(build_seconds, 2), 'operations': results}
+
+def compare(results, baseline):
+    # p50 latency of each operation against the same scenario and operation of a previous run
+    def keyed(run):
+        return {(scenario['habits'], scenario['completions'], operation['layer'], operation['operation']): operation['latency_ms']['p50']
+                for scenario in run['scenarios'] for operation in scenario['operations']}
+    previous = keyed(baseline)
+    rows = []
+    for key, p50 in keyed(results).items():
+        if previous.get(key):
+            rows.append((*key, previous[key], p50, round(p50 / previous[key], 2)))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the habit engine and the Flask routes on synthetic users.')
+    parser.add_argument('--habits', type=int, nargs='+', default=[10, 100, 1000], help='Habits per user of each scenario (default: 10 100 1000).')
+    parser.add_argument('--completions', type=int, nargs='+', default=[1000, 10000, 100000], help='Completions per user of each scenario (default: 1000 10000 100000).')
+    parser.add_argument('--users', type=int, default=1, help='Users of each scenario, the first one is measured (default: 1).')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed calls of each operation (default: 20).')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed calls of each operation before timing (default: 2).')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Documents per insert while building a scenario (default: 1000).')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the synthetic history (default: 0).')
+    parser.add_argument('--db-name', default='healthhub_benchmark', help='Database used and emptied by the benchmark (default: healthhub_benchmark).')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', help='Results JSON of a previous run to compare the p50 latencies with.')
+    args = parser.parse_args()
+
+    if args.db_name == os.environ.get('DB_NAME', 'healthhub'):
+        parser.error('--db-name must not be the application database, the benchmark deletes its users and history.')
+    # Settings are read when the app is imported, so the app and its handler use the benchmark database
+    os.environ['DB_NAME'] = args.db_name
+    import app as web
+    from settings import config_file, success_probability
+
+    simulator = DataSimulator(web.mongo_uri, args.db_name, config_file=config_file, success_probability=success_probability)
+    config = simulator.load_test_data_config(config_file)
+    if not config or not simulator.create_predefined_habits(web.db_handler, config['habits']):
+        return 1
+
+    results = {'generated_at': Utils.format_datetime(datetime.datetime.now()), 'python': platform.python_version(),
+               'mongodb': web.db_handler.client.server_info()['version'], 'iterations': args.iterations, 'scenarios': []}
+    for habits in args.habits:
+        for completions in args.completions:
+            print(f"Scenario: {habits} habits, {completions} completions per user, {args.users} users")
+            results['scenarios'].append(run_scenario(web, simulator, config, habits, completions, args))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"Results saved to {args.output}.")
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        print("p50 against the baseline (habits, completions, operation: before -> after ms, ratio):")
+        for habits, completions, layer, name, before, after, ratio in compare(results, baseline):
+            print(f"  {habits:>5} {completions:>7} {layer:<6} {name:<32} {before:>9.3f} -> {after:>9.3f}  x{ratio}")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,319 @@
+import datetime
+import time
+from classes.completion_rollups import CompletionRollups
+from classes.utils import Utils
+
+class AdminAnalytics:
+    # habit fields read by the habits report, the rest of the user documents never leaves the database
+    HABIT_FIELDS = ['habit_id', 'name', 'category', 'status', 'streak', 'longest_streak', 'completion_count', 'status_counts', 'end_range']
+    # most reports kept in the cache of a process, one per report and parameters
+    CACHE_SIZE = 32
+
+    def __init__(self, db_handler, ttl=300):
+        """
+        Initialize the fleet-wide admin reports with a MongoDBHandler instance.
+
+        Args:
+            db_handler (MongoDBHandler): An instance of MongoDBHandler to interact with the database.
+            ttl (float): Seconds a report is served from the cache of this process before it is computed again.
+
+        Note:
+            Each report is a single aggregation run with allowDiskUse: MongoDB groups the documents and only
+            the aggregated rows are returned, whatever the number of users.
+        """
+        self.db_handler = db_handler
+        self.ttl = ttl
+        self._cache = {}
+    # cached report
+    def _cached(self, key):
+        """
+        Return a report of the cache while it is not older than 'ttl'.
+
+        Args:
+            key (tuple): The report name and its parameters.
+
+        Returns:
+            dict: The report, or None if it is not cached or expired.
+        """
+        entry = self._cache.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+    # cache a report
+    def _store(self, key, result):
+        """
+        Keep a successful report in the cache, dropping the expired ones and the oldest beyond CACHE_SIZE.
+
+        Args:
+            key (tuple): The report name and its parameters.
+            result (dict): The report.
+
+        Returns:
+            dict: The report.
+        """
+        if result['success'] and self.ttl > 0:
+            now = time.monotonic()
+            # Reports are stored in the order they were computed, the first one is the oldest
+            self._cache = {cached: entry for cached, entry in self._cache.items() if cached != key and now - entry[0] < self.ttl}
+            while len(self._cache) >= self.CACHE_SIZE:
+                del self._cache[next(iter(self._cache))]
+            self._cache[key] = (now, result)
+        return result
+    # cached or aggregated report
+    def _report(self, key, collection_name, pipeline, build):
+        """
+        Return a report from the cache, or run its aggregation and cache the built report.
+
+        Args:
+            key (tuple): The report name and its parameters.
+            collection_name (str): The collection aggregated.
+            pipeline (list): The aggregation stages, returning one document.
+            build (callable): Takes the document returned by the aggregation and returns the report.
+
+        Returns:
+            dict: The report, or an error.
+        """
+        result = self._cached(key)
+        if result:
+            return result
+
+        try:
+            documents = self.db_handler.aggregate(collection_name, pipeline, allowDiskUse=True)
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+        return self._store(key, build(documents[0] if documents else {}))
+    # days of the activity report (no database access)
+    @staticmethod
+    def _activity_range(days, now=None):
+        """
+        Return the days covered by the activity report.
+
+        Args:
+            days (int): Number of days, today included.
+            now (datetime.datetime, optional): The reference date, the current time by default.
+
+        Returns:
+            Tuple: (first day, day after today).
+        """
+        end_day = Utils.parse_date(now or datetime.datetime.now()) + datetime.timedelta(days=1)
+        return end_day - datetime.timedelta(days=days), end_day
+    # aggregation of the daily activity (no database access)
+    @staticmethod
+    def _activity_pipeline(first_day, end_day):
+        """
+        Build the aggregation of the activity report on the daily rollups.
+
+        Args:
+            first_day (datetime.datetime): The first day.
+            end_day (datetime.datetime): The day after the last one.
+
+        Returns:
+            list: The aggregation stages, returning one document with the 'days' and 'totals' facets.
+
+        Note:
+            A rollup document is one active user on one day, so counting the documents of a day counts its
+            active users; rollups left at zero by a removed habit are not counted.
+        """
+        counters = list(CompletionRollups.STATUS_FIELDS.values())
+        return [
+            {'$match': {'day': {'$gte': first_day, '$lt': end_day}, '$or': [{field: {'$gt': 0}} for field in counters]}},
+            {'$facet': {
+                'days': [
+                    {'$group': {'_id': '$day', 'active_users': {'$sum': 1}, **{field: {'$sum': f'${field}'} for field in counters}}},
+                    {'$sort': {'_id': 1}},
+                    {'$project': {'_id': 0, 'day': '$_id', 'active_users': 1, **dict.fromkeys(counters, 1)}}
+                ],
+                'totals': [
+                    {'$group': {'_id': '$user_id'}},
+                    {'$count': 'active_users'}
+                ]
+            }}
+        ]
+    # activity report of the aggregation output (no database access)
+    @staticmethod
+    def _activity_result(facets, first_day, end_day):
+        """
+        Build the activity report, with every day of the range.
+
+        Args:
+            facets (dict): The document returned by the _activity_pipeline aggregation.
+            first_day (datetime.datetime): The first day.
+            end_day (datetime.datetime): The day after the last one.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), 'generated_at', 'start', 'end', 'active_users' (distinct users
+                  of the range) and 'days' (list of 'date', 'active_users', the counters and 'completion_rate').
+        """
+        counters = list(CompletionRollups.STATUS_FIELDS.values())
+        rows = {Utils.parse_datetime(row['day']): row for row in facets.get('days', [])}
+        days = []
+        day = first_day
+        while day < end_day:
+            row = rows.get(day, {})
+            point = {'date': day.strftime(Utils.DATE_FORMAT), 'active_users': row.get('active_users', 0), **{field: row.get(field) or 0 for field in counters}}
+            total = sum(point[field] for field in counters)
+            point['completion_rate'] = round((point['completed'] + point['in_progress']) / total, 4) if total else None
+            days.append(point)
+            day += datetime.timedelta(days=1)
+
+        totals = facets.get('totals') or [{}]
+        return {
+            'success': True,
+            'generated_at': datetime.datetime.now(),
+            'start': first_day.strftime(Utils.DATE_FORMAT),
+            'end': (end_day - datetime.timedelta(days=1)).strftime(Utils.DATE_FORMAT),
+            'active_users': totals[0].get('active_users', 0),
+            'days': days
+        }
+    # active users and completions per day
+    def activity(self, days=30, now=None):
+        """
+        Report the active users and the completion rate of every day of the last 'days' days.
+
+        Args:
+            days (int): Number of days, today included.
+            now (datetime.datetime, optional): The reference date, the current time by default.
+
+        Returns:
+            dict: The report built by _activity_result, or an error.
+        """
+        return self._report(*self._activity_report(days, now))
+    # aggregation of the activity report (no database access)
+    @classmethod
+    def _activity_report(cls, days, now=None):
+        """
+        Build the arguments of _report for the activity report.
+
+        Args:
+            days (int): Number of days, today included.
+            now (datetime.datetime, optional): The reference date, the current time by default.
+
+        Returns:
+            Tuple: (cache key, collection, pipeline, builder of the report).
+        """
+        first_day, end_day = cls._activity_range(days, now)
+        return (('activity', first_day, end_day), CompletionRollups.COLLECTION, cls._activity_pipeline(first_day, end_day),
+                lambda facets: cls._activity_result(facets, first_day, end_day))
+    # aggregation of the habits of all the users (no database access)
+    @classmethod
+    def _habits_pipeline(cls, abandoned_before, limit):
+        """
+        Build the aggregation of the habits report on the users.
+
+        Args:
+            abandoned_before (datetime.datetime): A habit whose period ended before this date without being
+                                                  completed is counted as abandoned.
+            limit (int): Largest number of rows of the 'predefined_habits' and 'categories' facets.
+
+        Returns:
+            list: The aggregation stages, returning one document with the 'totals', 'predefined_habits'
+                  and 'categories' facets.
+        """
+        habit = {'$ifNull': ['$habits', []]}
+        # A missing or null end_range sorts before any date, only stored dates are compared
+        abandoned = {'$and': [{'$ne': ['$habits.status', 'completed']}, {'$eq': [{'$type': '$habits.end_range'}, 'date']},
+                              {'$lt': ['$habits.end_range', abandoned_before]}]}
+        return [
+            {'$project': {'_id': 0, **{f'habits.{field}': 1 for field in cls.HABIT_FIELDS}}},
+            {'$facet': {
+                'totals': [
+                    {'$group': {'_id': None, 'users': {'$sum': 1}, 'habits': {'$sum': {'$size': habit}}}}
+                ],
+                'predefined_habits': [
+                    {'$unwind': '$habits'},
+                    {'$match': {'habits.habit_id': {'$exists': True}}},
+                    {'$group': {
+                        '_id': '$habits.habit_id',
+                        'name': {'$first': '$habits.name'},
+                        'assigned': {'$sum': 1},
+                        'completions': {'$sum': {'$ifNull': ['$habits.completion_count', 0]}},
+                        'on_streak': {'$sum': {'$cond': [{'$gt': ['$habits.streak', 0]}, 1, 0]}},
+                        'failed': {'$sum': {'$cond': [{'$eq': ['$habits.status', 'failed']}, 1, 0]}},
+                        'average_longest_streak': {'$avg': {'$ifNull': ['$habits.longest_streak', 0]}},
+                        # History entries of all its assignments by status, kept on each habit as it is written
+                        **{f'{status}_entries': {'$sum': {'$ifNull': [f'$habits.status_counts.{status}', 0]}}
+                           for status in CompletionRollups.STATUS_FIELDS.values()}
+                    }},
+                    {'$sort': {'assigned': -1, '_id': 1}},
+                    {'$limit': limit}
+                ],
+                'categories': [
+                    {'$unwind': '$habits'},
+                    {'$group': {
+                        '_id': {'$ifNull': ['$habits.category', '']},
+                        'habits': {'$sum': 1},
+                        'abandoned': {'$sum': {'$cond': [abandoned, 1, 0]}}
+                    }},
+                    {'$sort': {'habits': -1, '_id': 1}},
+                    {'$limit': limit}
+                ]
+            }}
+        ]
+    # habits report of the aggregation output (no database access)
+    @staticmethod
+    def _habits_result(facets):
+        """
+        Build the habits report, with the rates of every row.
+
+        Args:
+            facets (dict): The document returned by the _habits_pipeline aggregation.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), 'generated_at', 'users' and 'habits' (totals),
+                  'predefined_habits' (list, with 'completion_rate', the share of its history entries completed in range,
+                  or None without history, and 'on_streak_rate', the share of its assignments currently on a streak) and
+                  'categories' (list, with 'abandonment_rate').
+        """
+        totals = (facets.get('totals') or [{}])[0]
+        def completion_rate(row):
+            done = row.get('completed_entries', 0) + row.get('in_progress_entries', 0)
+            total = done + row.get('failed_entries', 0)
+            return round(done / total, 4) if total else None
+        predefined_habits = [{
+            'habit_id': row['_id'],
+            'name': row.get('name'),
+            'assigned': row['assigned'],
+            'completions': row['completions'],
+            'failed': row['failed'],
+            'completion_rate': completion_rate(row),
+            'on_streak_rate': round(row['on_streak'] / row['assigned'], 4),
+            'average_longest_streak': round(row.get('average_longest_streak') or 0, 2)
+        } for row in facets.get('predefined_habits', [])]
+        categories = [{
+            'category': row['_id'],
+            'habits': row['habits'],
+            'abandoned': row['abandoned'],
+            'abandonment_rate': round(row['abandoned'] / row['habits'], 4)
+        } for row in facets.get('categories', [])]
+        return {'success': True, 'generated_at': datetime.datetime.now(), 'users': totals.get('users', 0), 'habits': totals.get('habits', 0),
+                'predefined_habits': predefined_habits, 'categories': categories}
+    # streaks by predefined habit and abandonment by category
+    def habits(self, abandoned_after=14, limit=100, now=None):
+        """
+        Report the assignments, completions and streaks of every predefined habit and the abandonment of every category.
+
+        Args:
+            abandoned_after (int): Days after the end of its period a habit not completed is abandoned.
+            limit (int): Largest number of predefined habits and of categories, the most assigned first.
+            now (datetime.datetime, optional): The reference date, the current time by default.
+
+        Returns:
+            dict: The report built by _habits_result, or an error.
+        """
+        return self._report(*self._habits_report(abandoned_after, limit, now))
+    # aggregation of the habits report (no database access)
+    @classmethod
+    def _habits_report(cls, abandoned_after, limit, now=None):
+        """
+        Build the arguments of _report for the habits report.
+
+        Args:
+            abandoned_after (int): Days after the end of its period a habit not completed is abandoned.
+            limit (int): Largest number of predefined habits and of categories.
+            now (datetime.datetime, optional): The reference date, the current time by default.
+
+        Returns:
+            Tuple: (cache key, collection, pipeline, builder of the report).
+        """
+        abandoned_before = (now or datetime.datetime.now()) - datetime.timedelta(days=abandoned_after)
+        return ('habits', abandoned_after, limit), 'users', cls._habits_pipeline(abandoned_before, limit), cls._habits_result
@@ -0,0 +1,44 @@
+from classes.admin_analytics import AdminAnalytics
+
+class AsyncAdminAnalytics(AdminAnalytics):
+    def __init__(self, db_handler, ttl=300):
+        """
+        Initialize the asyncio twin of AdminAnalytics with an AsyncMongoDBHandler instance.
+
+        Args:
+            db_handler (AsyncMongoDBHandler): An instance of AsyncMongoDBHandler to interact with the database.
+            ttl (float): Seconds a report is served from the cache of this process, as in AdminAnalytics.
+        """
+        super().__init__(db_handler, ttl)
+    # cached or aggregated report
+    async def _report(self, key, collection_name, pipeline, build):
+        """
+        Return a report from the cache, or run its aggregation and cache the built report.
+
+        See AdminAnalytics._report.
+        """
+        result = self._cached(key)
+        if result:
+            return result
+
+        try:
+            documents = await self.db_handler.aggregate(collection_name, pipeline, allowDiskUse=True)
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+        return self._store(key, build(documents[0] if documents else {}))
+    # active users and completions per day
+    async def activity(self, days=30, now=None):
+        """
+        Report the active users and the completion rate of every day of the last 'days' days.
+
+        See AdminAnalytics.activity.
+        """
+        return await self._report(*self._activity_report(days, now))
+    # streaks by predefined habit and abandonment by category
+    async def habits(self, abandoned_after=14, limit=100, now=None):
+        """
+        Report the assignments, completions and streaks of every predefined habit and the abandonment of every category.
+
+        See AdminAnalytics.habits.
+        """
+        return await self._report(*self._habits_report(abandoned_after, limit, now))
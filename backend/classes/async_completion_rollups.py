@@ -0,0 +1,38 @@
+from classes.completion_rollups import CompletionRollups
+
+class AsyncCompletionRollups(CompletionRollups):
+    def __init__(self, db_handler, periods=None):
+        """
+        Initialize the asyncio twin of CompletionRollups with an AsyncMongoDBHandler instance.
+
+        Args:
+            db_handler (AsyncMongoDBHandler): An instance of AsyncMongoDBHandler to interact with the database.
+            periods (dict, optional): Length of a period by habit type, as in CompletionRollups.
+        """
+        super().__init__(db_handler, periods)
+    # add or remove history entries from the counters
+    async def record(self, habits, documents, sign=1, operation=None):
+        """
+        Increment the counters of the days of 'completions' documents, in one round trip.
+
+        See CompletionRollups.record.
+        """
+        return await self.db_handler.increment_documents(self.COLLECTION, self.increment_requests(self.increments(habits, documents, sign)), operation=operation)
+    # completion rate time series
+    async def series(self, user_id=None, start=None, end=None, interval='day', type=None, category=None):
+        """
+        Read the completion rate per day or per week of a user, or of all the users.
+
+        See CompletionRollups.series.
+        """
+        if interval not in self.INTERVALS:
+            return {'success': False, 'error': 'Invalid interval. Interval must be either "day" or "week"'}
+        first_day, end_day, error = self._series_range(start, end)
+        if error:
+            return error
+
+        try:
+            rows = await self.db_handler.aggregate(self.COLLECTION, self._series_pipeline(user_id, first_day, end_day, type, category))
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+        return self._series_result(rows, first_day, end_day, interval)
@@ -0,0 +1,48 @@
+from classes.habit import Habit
+
+class AsyncHabit(Habit):
+    # add pre setted habit to habits (admin only)
+    async def add_habit(self, db_handler, habit_data):
+        """
+        Add a new habit to the database.
+
+        See Habit.add_habit.
+        """
+        error = self._validate(habit_data)
+        if error:
+            return error
+
+        try:
+            added_habit = await db_handler.add_document('habits', self._habit_document(habit_data))
+            return {'success': True, 'data': added_habit}
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+    # remove pre setted habit from habits (admin only)
+    async def remove(self, db_handler, habit_id):
+        """
+        Remove a habit from the database.
+
+        See Habit.remove.
+        """
+        try:
+            removal_result = await db_handler.delete_document('habits', habit_id)
+            if removal_result:
+                return {'success': True, 'message': 'Habit successfully removed'}
+            else:
+                return {'success': False, 'error': 'Habit not found'}
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+    #list all habits
+    @staticmethod
+    async def list_all(db_handler, type=None):
+        """
+        List all habits in the database.
+
+        See Habit.list_all.
+        """
+        try:
+            query = {'type': type} if type else None
+            habits = await db_handler.list_documents('habits', query, projection=AsyncHabit._projection())
+            return {'success': True, 'habits': habits}
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
@@ -0,0 +1,52 @@
+import time
+from classes.habit_catalog import HabitCatalog
+from classes.async_habit import AsyncHabit
+
+class AsyncHabitCatalog(HabitCatalog):
+    def __init__(self, db_handler, **options):
+        """
+        Initialize the asyncio twin of HabitCatalog with an AsyncMongoDBHandler instance.
+
+        Args:
+            db_handler (AsyncMongoDBHandler): An instance of AsyncMongoDBHandler to interact with the database.
+            **options: 'serialize', 'max_age' and 'check_interval', as in HabitCatalog.
+        """
+        super().__init__(db_handler, **options)
+    # current catalog version, read from the database at most once per interval
+    async def _current_version(self):
+        """
+        Return the catalog version, reading it again once the last read is older than 'check_interval'.
+
+        See HabitCatalog._current_version.
+        """
+        if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self._version
+        state = await self.db_handler.find_document('system', {'_id': self.VERSION_ID}, projection={'version': 1})
+        return self._remember_version(state)
+    # serialized catalog of a type filter
+    async def get(self, type=None):
+        """
+        Return the serialized catalog for a 'type' filter, from the cache while the catalog version did not change.
+
+        See HabitCatalog.get.
+        """
+        version = await self._current_version()
+        entry = self._entries.get(type or '')
+        if entry and entry['version'] == version:
+            return entry, None
+
+        result = await AsyncHabit.list_all(self.db_handler, type=type)
+        if not result['success']:
+            return None, result
+        return self._store(type or '', version, result), None
+    # the catalog changed
+    async def invalidate(self):
+        """
+        Increment the catalog version in the database and drop the cached entries of this process.
+
+        See HabitCatalog.invalidate.
+        """
+        state = await self.db_handler.find_and_modify_document('system', {'_id': self.VERSION_ID}, {'$inc': {'version': 1}},
+                                                               projection={'version': 1}, upsert=True)
+        self._entries = {}
+        return self._remember_version(state)
@@ -0,0 +1,280 @@
+import asyncio
+from classes.habit_tracker import HabitTracker
+from classes.async_completion_rollups import AsyncCompletionRollups
+from bson import ObjectId
+
+class AsyncHabitTracker(HabitTracker):
+    def __init__(self, db_handler):
+        """
+        Initialize the asyncio twin of HabitTracker with an AsyncMongoDBHandler instance.
+
+        Args:
+            db_handler (AsyncMongoDBHandler): An instance of AsyncMongoDBHandler to interact with the database.
+
+        Note:
+            The public methods have the same arguments and results as in HabitTracker, as coroutines.
+            Only the database access differs: validation, streak logic, catch-up and the built
+            updates and pipelines are the static helpers inherited from HabitTracker.
+        """
+        super().__init__(db_handler)
+        self.rollups = AsyncCompletionRollups(db_handler, self.PERIODS)
+    # load the user, unless the caller already did
+    async def _get_user(self, username, user=None):
+        """
+        Return the user document, loading it by username only if it was not provided.
+
+        Args:
+            username (str): The username of the user.
+            user (dict, optional): The already loaded user document.
+
+        Returns:
+            dict: The user document, or None if the user does not exist.
+        """
+        if user is not None:
+            return user
+        return await self.db_handler.find_document('users', {'username': username})
+    # list habits
+    async def list_user_habits(self, username, habit_type=None, status=None, user=None):
+        """
+        List all habits assigned to a user, with optional filtering by habit type and status.
+
+        See HabitTracker.list_user_habits.
+        """
+        user = await self._get_user(username, user)
+        if not user:
+            return {'success': False, 'habits': [], 'message': 'User not found'}
+
+        user_habits = self._filter_habits(user.get('habits', []), habit_type, status)
+
+        return {'success': True, 'habits': user_habits, 'message': 'Habits retrieved successfully'}
+    # list completion history of a habit
+    async def list_habit_history(self, username, habit_id, user=None):
+        """
+        List the completion history of one of the user's habits.
+
+        See HabitTracker.list_habit_history.
+        """
+        user = await self._get_user(username, user)
+        if not user:
+            return {'success': False, 'error': 'User not found'}
+
+        if not any(habit['_id'] == habit_id for habit in user.get('habits', [])):
+            return {'success': False, 'error': 'Habit not found'}
+
+        history = await self.db_handler.list_documents('completions', {'user_id': str(user['_id']), 'habit_id': habit_id})
+        return {'success': True, 'history': history}
+    # assign habit (from pre setted habits)
+    async def assign_habit(self, username, habit_id, start_range, end_range, user=None):
+        """
+        Assign a habit to a user.
+
+        See HabitTracker.assign_habit.
+        """
+        start_datetime, end_datetime, error = self._parse_range(start_range, end_range)
+        if error:
+            return error
+
+        user = await self._get_user(username, user)
+        if not user:
+            return {'success': False, 'error': 'User not found'}
+
+        habit = await self.db_handler.find_document('habits', {'_id': ObjectId(habit_id)})
+        if not habit:
+            return {'success': False, 'error': 'Habit not found'}
+
+        habit_data = self._new_habit(habit['name'], habit['type'], start_datetime, end_datetime, habit.get('category', ''),
+                                     habit.get('subcategory', ''), habit.get('description', ''), habit_id=habit_id)
+
+        if habit_data.get('type') not in self.PERIODS:
+            return {'success': False, 'error': 'Invalid habit type. Type must be either "daily" or "weekly"'}
+
+        return await self._write_plan(username, user, self._assign_plan(habit_data))
+    # assign custom habit
+    async def assign_custom_habit(self, username, name, type, start_range, end_range, category='', subcategory='', description='', user=None):
+        """
+        Assign a custom habit to a user by creating a new habit entry.
+
+        See HabitTracker.assign_custom_habit.
+        """
+        user = await self._get_user(username, user)
+        if not user:
+            return {'success': False, 'error': 'User not found'}
+
+        start_datetime, end_datetime, error = self._parse_range(start_range, end_range)
+        if error:
+            return error
+
+        if type not in self.PERIODS:
+            return {'success': False, 'error': 'Invalid habit type. Type must be either "daily" or "weekly"'}
+
+        habit_data = self._new_habit(name, type, start_datetime, end_datetime, category, subcategory, description)
+
+        return await self._write_plan(username, user, self._assign_plan(habit_data))
+    # dissociate/remove habit from habits list of user
+    async def remove_habit(self, username, habit_id, user=None):
+        """
+        Remove a habit from a user's list of habits.
+
+        See HabitTracker.remove_habit.
+        """
+        return await self._write_plan(username, user, self._remove_plan(habit_id))
+    # update daily habit and proceed with app logic
+    async def update_daily_habit(self, username, habit_id, completion_date, continue_enabled, user=None):
+        """
+        Update a daily habit for a user.
+
+        See HabitTracker.update_daily_habit.
+        """
+        return await self._complete_habit(username, habit_id, completion_date, continue_enabled, 'daily', self.PERIODS['daily'], user)
+    # update weekly habit and proceed with app logic
+    async def update_weekly_habit(self, username, habit_id, completion_date, continue_enabled, user=None):
+        """
+        Update a weekly habit for a user.
+
+        See HabitTracker.update_weekly_habit.
+        """
+        return await self._complete_habit(username, habit_id, completion_date, continue_enabled, 'weekly', self.PERIODS['weekly'], user)
+    # shared completion flow of daily and weekly habits
+    async def _complete_habit(self, username, habit_id, completion_date, continue_enabled, habit_type, period, user=None):
+        """
+        Apply a completion to a habit and persist only the changed fields.
+
+        See HabitTracker._complete_habit.
+        """
+        def build_plan(user):
+            plan, error = self._plan_completion(user, habit_id, completion_date, continue_enabled, habit_type, period)
+            return plan, error or {'success': True, 'message': 'Habit updated successfully'}
+
+        return await self._write_plan(username, user, build_plan)
+    # apply many completions in order and persist them together
+    async def complete_batch(self, username, items, user=None):
+        """
+        Apply a list of completions in order and persist them with one write per collection.
+
+        See HabitTracker.complete_batch.
+        """
+        def build_plan(user):
+            results, plan = self._plan_batch(user, items)
+            return plan, {'success': True, 'results': results}
+
+        return await self._write_plan(username, user, build_plan)
+    # move habits past missed periods in one step
+    async def catch_up_habits(self, username, habit_id=None, now=None, user=None):
+        """
+        Move the date range of habits whose periods ended without a completion up to the current period.
+
+        See HabitTracker.catch_up_habits.
+        """
+        def build_plan(user):
+            plan, error = self._plan_catch_up(user, habit_id, now)
+            return plan, error or self._catch_up_result(plan)
+
+        return await self._write_plan(username, user, build_plan)
+    # optimistic read-modify-write of the user's habits
+    async def _write_plan(self, username, user, build_plan):
+        """
+        Build the writes of a plan from the user document and persist them, retrying with a fresh document
+        when another request changed the user in between.
+
+        See HabitTracker._write_plan.
+        """
+        for attempt in range(self.WRITE_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(self._retry_delay(attempt))
+            user = await self._get_user(username, user)
+            plan, result = self._attempt_plan(user, build_plan)
+            if plan:
+                result = self._attempt_result(result, await self._persist_plan(user, plan))
+            if result:
+                return result
+            user = None
+        return self.CONFLICT_ERROR
+    # persist the state changes and history of completions
+    async def _persist_plan(self, user, plan):
+        """
+        Write the changed habits, the summary and the pending history writes in one update, then apply the history writes.
+
+        See HabitTracker._persist_plan.
+        """
+        update, conditions, array_filters, pending_writes = self._persist_update(user, plan)
+        try:
+            updated = await self.db_handler.modify_document('users', user['_id'], update, conditions=conditions, array_filters=array_filters)
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+        if not updated:
+            return None
+
+        await self._apply_pending_writes(user['_id'], pending_writes)
+        return {'success': True}
+    # apply the history writes recorded in the user document
+    async def _apply_pending_writes(self, user_id, pending_writes):
+        """
+        Insert the history entries of pending writes, count them in the rollups and delete the history of
+        removed habits on the server, then clear them from the user document.
+
+        See HabitTracker._apply_pending_writes.
+        """
+        applied = []
+        try:
+            for pending in pending_writes:
+                for operation, args, kwargs in self._pending_operations(user_id, pending):
+                    await operation(*args, **kwargs)
+                applied.append(pending['_id'])
+        except Exception as e:
+            print(f"ERROR: Could not apply the pending writes of user {user_id}: {e}")
+        if applied:
+            try:
+                await self.db_handler.modify_document('users', user_id, self._applied_update(applied))
+            except Exception as e:
+                print(f"ERROR: Could not clear the pending writes of user {user_id}: {e}")
+                return False
+        return len(applied) == len(pending_writes)
+    # completion rate time series
+    async def completion_series(self, username, start=None, end=None, interval='day', type=None, category=None):
+        """
+        Read the completion rate of a user per day or per week, from the daily rollups.
+
+        See HabitTracker.completion_series.
+        """
+        user = await self.db_handler.find_document('users', {'username': username}, projection={'_id': 1})
+        if not user:
+            return {'success': False, 'error': 'User not found'}
+        return await self.rollups.series(user['_id'], start, end, interval, type, category)
+    # get the longest streak habit
+    async def longest_streak_habit(self, username, type):
+        """
+        Find the habit with the longest streak for a given user.
+
+        See HabitTracker.longest_streak_habit.
+        """
+        return await self._summary_habit(username, type, 'best')
+    # get the worst habit
+    async def strugglest_habit(self, username, type):
+        """
+        Find the habit with the most recent failure for a given user.
+
+        See HabitTracker.strugglest_habit.
+        """
+        return await self._summary_habit(username, type, 'worst')
+    # select one habit of the user from its summary
+    async def _summary_habit(self, username, type, rank):
+        """
+        Select the best or worst habit of the user with two projected reads of its document.
+
+        See HabitTracker._summary_habit.
+        """
+        reads, document = self._summary_reads(type, rank), None
+        try:
+            while True:
+                document = await self.db_handler.find_document('users', {'username': username}, projection=reads.send(document))
+        except StopIteration as selected:
+            return selected.value or await self._select_habit(username, type, *self.SUMMARY_RANKS[rank])
+    # select one habit of the user with an aggregation
+    async def _select_habit(self, username, type, field, direction):
+        """
+        Select the user's habit with the highest or lowest value of a field.
+
+        See HabitTracker._select_habit.
+        """
+        result = await self.db_handler.aggregate('users', self._select_pipeline(username, type, field, direction))
+        return self._selected_habit(result)
@@ -0,0 +1,316 @@
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, OperationFailure
+from bson import ObjectId
+from classes.mongodb_handler import MongoDBHandler, MissingIndexError
+from classes.utils import Utils
+
+class AsyncMongoDBHandler:
+    # Same indexes as the synchronous handler
+    INDEXES = MongoDBHandler.INDEXES
+
+    def __init__(self, uri, db_name):
+        """
+        Initialize the asyncio MongoDB connection (motor).
+
+        Args:
+            uri (str): MongoDB URI.
+            db_name (str): Name of the database.
+
+        Note:
+            Every method mirrors MongoDBHandler and returns the same values, as a coroutine.
+        """
+        self.client = AsyncIOMotorClient(uri)
+        self.db = self.client[db_name]
+        self.indexes_ready = False
+        self.missing_unique_indexes = set()
+        self.pending_indexes = list(self.INDEXES)
+        self._index_retry_delay = 0
+        self._next_index_attempt = 0
+    # create the declared indexes (idempotent)
+    async def ensure_indexes(self):
+        """
+        Create the indexes declared in INDEXES that do not exist yet, once per handler.
+
+        See MongoDBHandler.ensure_indexes.
+        """
+        if self.indexes_ready:
+            return True
+
+        failed = []
+        for index in self.pending_indexes:
+            collection_name, keys, options = index
+            try:
+                await self.db[collection_name].create_index(keys, **options)
+            except OperationFailure as e:
+                print(f"ERROR: Could not create index {keys} on '{collection_name}': {e}")
+                failed.append(index)
+        self.pending_indexes = failed
+        self.missing_unique_indexes = MongoDBHandler._unique_collections(failed)
+        self.indexes_ready = not failed
+        self._index_retry_delay = MongoDBHandler._index_backoff(self._index_retry_delay) if failed else 0
+        self._next_index_attempt = time.monotonic() + self._index_retry_delay
+        return self.indexes_ready
+    # collection access, provisions the indexes on first use
+    async def _collection(self, collection_name):
+        """
+        Return a collection, creating the declared indexes on the first access and the failed ones once their
+        retry delay passed (see MongoDBHandler.ensure_indexes).
+
+        Args:
+            collection_name (str): The name of the collection.
+
+        Returns:
+            AsyncIOMotorCollection: The motor collection.
+
+        Raises:
+            MissingIndexError: If a unique index of the collection does not exist, see MongoDBHandler._collection.
+        """
+        if not self.indexes_ready:
+            if time.monotonic() >= self._next_index_attempt:
+                await self.ensure_indexes()
+            if collection_name in self.missing_unique_indexes:
+                raise MissingIndexError(f"A unique index of '{collection_name}' is missing, see the errors of ensure_indexes.")
+        return self.db[collection_name]
+    # add document (generic)
+    async def add_document(self, collection_name, document):
+        """
+        Add a document to a specified collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            document (dict): The document to add.
+
+        Returns:
+            dict: The added document with serialized '_id'.
+        """
+        collection = await self._collection(collection_name)
+        result = await collection.insert_one(document)
+        return Utils.serialize_document({**document, '_id': result.inserted_id})
+    # insert document (generic)
+    async def insert_document(self, collection_name, document):
+        """
+        Insert a document into a specified collection, in a single round trip.
+
+        Args:
+            collection_name (str): The name of the collection.
+            document (dict): The document to insert.
+
+        Returns:
+            str: The ID of the inserted document.
+        """
+        collection = await self._collection(collection_name)
+        result = await collection.insert_one(document)
+        return str(result.inserted_id)
+    # insert many documents (generic)
+    async def insert_documents(self, collection_name, documents, ignore_duplicates=False):
+        """
+        Insert several documents into a specified collection, in a single round trip.
+
+        Args:
+            collection_name (str): The name of the collection.
+            documents (list): The documents to insert.
+            ignore_duplicates (bool): Skip the documents whose '_id' already exists instead of failing.
+
+        Returns:
+            list: The IDs (str) of the inserted documents, in order.
+        """
+        if not documents:
+            return []
+        collection = await self._collection(collection_name)
+        try:
+            result = await collection.insert_many(documents, ordered=not ignore_duplicates)
+        except BulkWriteError as e:
+            if not ignore_duplicates or not MongoDBHandler._duplicates_only(e):
+                raise
+            return MongoDBHandler._inserted_ids(documents, e)
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+    # increment counters of several documents, creating the missing ones (generic)
+    async def increment_documents(self, collection_name, increments, operation=None):
+        """
+        Apply $inc upserts to several documents in a single round trip.
+
+        Args:
+            collection_name (str): The name of the collection.
+            increments (list): (query, counters) pairs; a document matching no query is created from the
+                               equality fields of its query, with the counters as initial values.
+            operation (str, optional): ID of the write the counters belong to; a document that already
+                                       applied it is left unchanged, see MongoDBHandler.increment_documents.
+
+        Returns:
+            int: The number of documents updated or created.
+        """
+        if not increments:
+            return 0
+        collection = await self._collection(collection_name)
+        try:
+            result = await collection.bulk_write(MongoDBHandler._increment_updates(increments, operation), ordered=False)
+        except BulkWriteError as e:
+            if not operation or not MongoDBHandler._duplicates_only(e):
+                raise
+            return e.details.get('nMatched', 0) + e.details.get('nUpserted', 0)
+        return result.matched_count + result.upserted_count
+    # delete document (generic)
+    async def delete_document(self, collection_name, document_id):
+        """
+        Delete a document from a specified collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            document_id (str): The ID of the document to delete.
+
+        Returns:
+            bool: True if deletion was successful, False otherwise.
+        """
+        collection = await self._collection(collection_name)
+        result = await collection.delete_one({"_id": ObjectId(document_id)})
+        return result.deleted_count > 0
+    # delete documents matching a query (generic)
+    async def delete_documents(self, collection_name, query):
+        """
+        Delete all documents matching a query from a specified collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            query (dict): The query of the documents to delete.
+
+        Returns:
+            int: The number of deleted documents.
+        """
+        collection = await self._collection(collection_name)
+        result = await collection.delete_many(query)
+        return result.deleted_count
+    # finds document (generic)
+    async def find_document(self, collection_name, query, projection=None, sort=None):
+        """
+        Find a document in a specified collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            query (dict): The query to find the document.
+            projection (dict, optional): The fields to return, all fields by default.
+            sort (list, optional): (field, direction) pairs deciding which document is returned first.
+
+        Returns:
+            dict: The found document, or None if not found.
+        """
+        collection = await self._collection(collection_name)
+        document = await collection.find_one(query, projection=projection, sort=sort)
+        return Utils.serialize_document(document) if document else None
+    # modify document with update operators (generic)
+    async def modify_document(self, collection_name, document_id, update, conditions=None, array_filters=None):
+        """
+        Apply update operators ($set, $push, $pull, ...) to a document, without reading it back.
+
+        Args:
+            collection_name (str): The name of the collection.
+            document_id (str): The ID of the document to update.
+            update (dict): The update operators to apply.
+            conditions (dict, optional): Extra conditions the document must match to be updated.
+            array_filters (list, optional): Filters for the '$[<identifier>]' positional operators.
+
+        Returns:
+            bool: True if a document matched (and was updated), False otherwise.
+        """
+        collection = await self._collection(collection_name)
+        query = {'_id': ObjectId(document_id), **(conditions or {})}
+        result = await collection.update_one(query, update, array_filters=array_filters)
+        return result.matched_count > 0
+    # modify document and return its post-image (generic)
+    async def find_and_modify_document(self, collection_name, query, update, projection=None, array_filters=None, upsert=False):
+        """
+        Apply update operators to the first document matching a query and return it as updated, in a single round trip.
+
+        Args:
+            collection_name (str): The name of the collection.
+            query (dict): The query to find the document.
+            update (dict): The update operators to apply.
+            projection (dict, optional): The fields to return.
+            array_filters (list, optional): Filters for the '$[<identifier>]' positional operators.
+            upsert (bool): Insert the document if no document matches.
+
+        Returns:
+            dict: The updated document with serialized '_id', or None if no document matched.
+        """
+        collection = await self._collection(collection_name)
+        document = await collection.find_one_and_update(query, update, projection=projection, array_filters=array_filters,
+                                                        upsert=upsert, return_document=ReturnDocument.AFTER)
+        return Utils.serialize_document(document) if document else None
+    # list documents (generic)
+    async def list_documents(self, collection_name, query=None, projection=None, sort=None):
+        """
+        List all documents in a specified collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            query (dict, optional): The query to filter the documents.
+            projection (dict, optional): The fields to return, all fields by default.
+            sort (list, optional): (field, direction) pairs to order the documents.
+
+        Returns:
+            list: A list of all documents in the collection.
+        """
+        collection = await self._collection(collection_name)
+        documents = await collection.find(query or {}, projection=projection, sort=sort).to_list(length=None)
+        return [Utils.serialize_document(doc) for doc in documents]
+    # iterate documents (generic)
+    async def iterate_documents(self, collection_name, query=None, projection=None, sort=None, limit=0, batch_size=500):
+        """
+        Iterate over the documents of a specified collection without loading them all in memory.
+
+        Args:
+            collection_name (str): The name of the collection.
+            query (dict, optional): The query to filter the documents.
+            projection (dict, optional): The fields to return, all fields by default.
+            sort (list, optional): (field, direction) pairs to order the documents.
+            limit (int): Maximum number of documents, 0 for no limit.
+            batch_size (int): Number of documents fetched from the server per round trip.
+
+        Yields:
+            dict: The documents with serialized '_id', one at a time, as they come off the cursor.
+        """
+        collection = await self._collection(collection_name)
+        cursor = collection.find(query or {}, projection=projection, sort=sort, limit=limit, batch_size=batch_size)
+        try:
+            async for document in cursor:
+                yield Utils.serialize_document(document)
+        finally:
+            await cursor.close()
+    # aggregation pipeline (generic)
+    async def aggregate(self, collection_name, pipeline, **options):
+        """
+        Run an aggregation pipeline on a specified collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            pipeline (list): The aggregation stages.
+            **options: Extra aggregate options (e.g. allowDiskUse=True).
+
+        Returns:
+            list: The resulting documents with serialized '_id'.
+        """
+        collection = await self._collection(collection_name)
+        documents = await collection.aggregate(pipeline, **options).to_list(length=None)
+        return [Utils.serialize_document(doc) for doc in documents]
+    # iterate aggregation results (generic)
+    async def iterate_aggregate(self, collection_name, pipeline, batch_size=500, **options):
+        """
+        Run an aggregation pipeline and iterate over the results without loading them all in memory.
+
+        Args:
+            collection_name (str): The name of the collection.
+            pipeline (list): The aggregation stages.
+            batch_size (int): Number of documents fetched from the server per round trip.
+            **options: Extra aggregate options (e.g. allowDiskUse=True).
+
+        Yields:
+            dict: The resulting documents with serialized '_id', one at a time.
+        """
+        collection = await self._collection(collection_name)
+        cursor = collection.aggregate(pipeline, batchSize=batch_size, **options)
+        try:
+            async for document in cursor:
+                yield Utils.serialize_document(document)
+        finally:
+            await cursor.close()
@@ -0,0 +1,112 @@
+from classes.async_user import AsyncUser
+from classes.request_context import RequestContext
+from classes.utils import Utils
+
+class AsyncRequestContext:
+    def __init__(self, request, db_handler, token_manager=None, data=None):
+        """
+        Initialize the per-request context of the asyncio application.
+
+        Use `await AsyncRequestContext.create(...)`, the request body is read asynchronously.
+
+        Args:
+            request (Request): The Quart request object.
+            db_handler (AsyncMongoDBHandler): The database handler for interacting with the database.
+            token_manager (TokenManager, optional): Verifier for signed session tokens.
+            data (dict, optional): The request data merged with the Basic Auth credentials.
+        """
+        self.request = request
+        self.db_handler = db_handler
+        self.token_manager = token_manager
+        self.data = data or {}
+        self.username = None
+        self._auth_result = None
+        self._user = None
+    # build the context, reading the body once
+    @classmethod
+    async def create(cls, request, db_handler, token_manager=None):
+        """
+        Read and normalize the request body, then build the context.
+
+        Args:
+            request (Request): The Quart request object.
+            db_handler (AsyncMongoDBHandler): The database handler for interacting with the database.
+            token_manager (TokenManager, optional): Verifier for signed session tokens.
+
+        Returns:
+            AsyncRequestContext: The context of the request.
+        """
+        # GET requests carry their parameters in the query string
+        body = request.args.to_dict() if request.method == 'GET' else await request.get_json(silent=True)
+        data = Utils.merge_basic_auth(dict(body) if isinstance(body, dict) else {}, request.headers.get('Authorization'))
+        return cls(request, db_handler, token_manager, data)
+    # authenticate the request once
+    async def authenticate(self):
+        """
+        Authenticate the request, using the session token first and Basic Auth as a fallback.
+
+        See RequestContext.authenticate.
+
+        Returns:
+            Tuple: (username, error message)
+        """
+        if self._auth_result:
+            return self._auth_result
+
+        token = Utils.get_bearer_token(self.request) if self.token_manager else None
+        if token:
+            self.username = self.token_manager.verify_token(token)
+            self._auth_result = (self.username, None) if self.username else (None, 'Invalid or expired token')
+            return self._auth_result
+
+        username = self.data.get('username')
+        password = self.data.get('password')
+        if not username or not password:
+            self._auth_result = (None, 'Username and password are required')
+            return self._auth_result
+
+        user = await AsyncUser(username=username, password=password).authenticate(self.db_handler)
+        if not user:
+            self._auth_result = (None, 'Invalid credentials')
+            return self._auth_result
+
+        self.username = username
+        self._user = user
+        self._auth_result = (username, None)
+        return self._auth_result
+    # authenticated user document (loaded at most once)
+    async def get_user(self):
+        """
+        The document of the authenticated user.
+
+        See RequestContext.user.
+
+        Returns:
+            dict: The user document, or None if the request is not authenticated or the user does not exist.
+        """
+        if self._user is None and self.username:
+            self._user = await self.db_handler.find_document('users', {'username': self.username})
+        return self._user
+    # ETag of the authenticated user's data, read from the version only when the client can be answered 304
+    async def etag(self, load_user=True):
+        """
+        Build the strong ETag of a response computed from the authenticated user's habits and history.
+
+        See RequestContext.etag.
+
+        Args:
+            load_user (bool): The response is built from the user document, load it unless If-None-Match was sent.
+
+        Returns:
+            str: The ETag value, or None if the request is not authenticated or the user does not exist.
+        """
+        if not self.username:
+            return None
+        if self._user is None and (self.request.if_none_match or not load_user):
+            state = await self.db_handler.find_document('users', {'username': self.username}, projection=RequestContext.ETAG_PROJECTION)
+        else:
+            state = await self.get_user()
+        if not state:
+            return None
+        params = {key: value for key, value in self.data.items() if key not in ('username', 'password')}
+        return Utils.user_etag(state['_id'], state.get('version', 0), self.request.path, params, pending=bool(state.get('pending_writes')))
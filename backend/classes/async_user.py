@@ -0,0 +1,111 @@
+from werkzeug.security import check_password_hash, generate_password_hash
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+from bson.errors import InvalidId
+from classes.user import User
+from classes.utils import Utils
+
+class AsyncUser(User):
+    # register User
+    async def register(self, db_handler):
+        """
+        Register a new user in the database.
+
+        See User.register. The PBKDF2 hashing runs in the thread pool, not on the event loop.
+        """
+        if not all([self.username, self.email, self.name, self.password]):
+            return {'success': False, 'error': 'All fields (username, email, name, password) are required'}
+
+        hashed_password = await Utils.run_in_executor(generate_password_hash, self.password, 'pbkdf2:sha256')
+
+        try:
+            user_id = await db_handler.insert_document('users', self._user_document(hashed_password))
+            return self._registration_result(user_id)
+        except DuplicateKeyError as e:
+            return self._duplicate_key_error(e)
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred during registration: {str(e)}'}
+    # log-in User
+    async def login(self, db_handler):
+        """
+        Login a user.
+
+        See User.login.
+        """
+        return self._login_result(await self.authenticate(db_handler))
+    # check credentials and return the stored user
+    async def authenticate(self, db_handler):
+        """
+        Check the user's credentials against the database.
+
+        See User.authenticate. The PBKDF2 verification runs in the thread pool, not on the event loop.
+        """
+        if not self.username or not self.password:
+            return None
+
+        user_data = await db_handler.find_document('users', {'username': self.username})
+        if not user_data or not await Utils.run_in_executor(check_password_hash, user_data['password'], self.password):
+            return None
+        return user_data
+    # delete user
+    async def delete(self, db_handler, user_id):
+        """
+        Delete a user from the database.
+
+        See User.delete.
+        """
+        try:
+            deletion_result = await db_handler.delete_document('users', user_id)
+            if deletion_result:
+                await db_handler.delete_documents('completions', {'user_id': str(user_id)})
+                await db_handler.delete_documents('daily_rollups', {'user_id': str(user_id)})
+                return {'success': True, 'message': 'User successfully deleted'}
+            else:
+                return {'success': False, 'error': 'User not found'}
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+    # list all users
+    @staticmethod
+    async def list_all(db_handler, with_counts=False):
+        """
+        List all users in the database.
+
+        See User.list_all.
+        """
+        try:
+            if with_counts:
+                users = await db_handler.aggregate('users', User._list_pipeline(sort={'username': 1}, with_counts=True))
+            else:
+                users = await db_handler.list_documents('users', projection=User.IDENTITY_FIELDS, sort=[('username', 1)])
+            return {'success': True, 'users': users}
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+    # list a page of users (keyset pagination)
+    @staticmethod
+    async def list_page(db_handler, after=None, limit=100, with_counts=False):
+        """
+        List one page of users, ordered by '_id'.
+
+        See User.list_page.
+        """
+        try:
+            query = {'_id': {'$gt': ObjectId(after)}} if after else {}
+            users = await db_handler.aggregate('users', User._list_pipeline(query, limit=limit, with_counts=with_counts))
+            next_after = users[-1]['_id'] if len(users) == limit else None
+            return {'success': True, 'users': users, 'next_after': next_after}
+        except (InvalidId, TypeError):
+            return {'success': False, 'error': 'Invalid value for after'}
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+    # iterate over all users
+    @staticmethod
+    def iterate_all(db_handler, with_counts=False, batch_size=500):
+        """
+        Iterate over all users, ordered by '_id', without loading them all in memory.
+
+        See User.iterate_all.
+
+        Returns:
+            async generator: The users (identity fields only), one at a time.
+        """
+        return db_handler.iterate_aggregate('users', User._list_pipeline(with_counts=with_counts), batch_size=batch_size)
@@ -0,0 +1,302 @@
+import datetime
+from classes.utils import Utils
+
+class CompletionRollups:
+    # per user and per day counters of the completion history
+    COLLECTION = 'daily_rollups'
+    # counter of each history entry status; 'completed' (continued) and 'in_progress' (not continued) were both done in range
+    STATUS_FIELDS = {'completed': 'completed', 'in progress': 'in_progress', 'failed': 'failed'}
+    # fields of a 'completions' document used by the counters
+    PROJECTION = {'user_id': 1, 'habit_id': 1, 'datetime': 1, 'status': 1, 'missed': 1, 'missed_since': 1}
+    INTERVALS = ('day', 'week')
+    # default and longest range of a series, in days
+    DEFAULT_DAYS = 365
+    MAX_DAYS = 731
+
+    def __init__(self, db_handler, periods=None):
+        """
+        Initialize the daily rollups with a MongoDBHandler instance.
+
+        Args:
+            db_handler (MongoDBHandler): An instance of MongoDBHandler to interact with the database.
+            periods (dict, optional): Length of a period by habit type (HabitTracker.PERIODS), used to spread
+                                      the missed periods of a catch-up over their days.
+
+        Note:
+            One 'daily_rollups' document per user and day holds the number of history entries of each status,
+            in total and by habit type ('types') and category ('categories'). They are incremented with every
+            completion, so a year of completion rates is read from at most 365 small documents.
+        """
+        self.db_handler = db_handler
+        self.periods = periods or {}
+    # midnight of a date (no database access)
+    @staticmethod
+    def _day(value):
+        """
+        Return the day of a stored or API date.
+
+        Args:
+            value (str or datetime.datetime): The date.
+
+        Returns:
+            datetime.datetime: The date at midnight.
+        """
+        return Utils.parse_datetime(value).replace(hour=0, minute=0, second=0, microsecond=0)
+    # counter key of a type or category (no database access)
+    @staticmethod
+    def _key(name):
+        """
+        Turn a habit type or category into a field name usable in an update path.
+
+        Args:
+            name (str): The type or category, may be empty.
+
+        Returns:
+            str: The name with '.' and '$' replaced by their full width forms, 'uncategorized' if empty.
+        """
+        if not name:
+            return 'uncategorized'
+        return str(name).replace('.', '\uff0e').replace('$', '\uff04')
+    # days a history entry counts for (no database access)
+    def _days(self, document, habit_type):
+        """
+        Return the days a 'completions' document is counted on.
+
+        Args:
+            document (dict): The history entry.
+            habit_type (str): The type of its habit, None if the habit is unknown.
+
+        Returns:
+            list: The days; one per missed period for a catch-up entry, the day of the entry otherwise.
+        """
+        period = self.periods.get(habit_type)
+        if document.get('missed') and document.get('missed_since') and period:
+            since = Utils.parse_datetime(document['missed_since'])
+            return [self._day(since + index * period) for index in range(document['missed'])]
+        return [self._day(document['datetime'])]
+    # counters of history entries (no database access)
+    def increments(self, habits, documents, sign=1):
+        """
+        Count 'completions' documents by user, day, status, habit type and category.
+
+        Args:
+            habits (dict): The habits of the documents, keyed by habit ID.
+            documents (list): The 'completions' documents.
+            sign (int): 1 to add the documents, -1 to remove them.
+
+        Returns:
+            dict: The counters ({update path: value}) keyed by (user ID, day).
+        """
+        result = {}
+        for document in documents:
+            status = self.STATUS_FIELDS.get(document.get('status'))
+            if not status:
+                continue
+            habit = habits.get(document['habit_id'])
+            paths = [status]
+            if habit:
+                paths.append(f"types.{self._key(habit.get('type'))}.{status}")
+                paths.append(f"categories.{self._key(habit.get('category'))}.{status}")
+
+            for day in self._days(document, habit.get('type') if habit else None):
+                counters = result.setdefault((str(document['user_id']), day), {})
+                for path in paths:
+                    counters[path] = counters.get(path, 0) + sign
+        return result
+    # counters of history entries by habit (no database access)
+    @classmethod
+    def habit_counts(cls, documents, counts=None):
+        """
+        Count 'completions' documents by habit and status, as kept in the 'status_counts' of each habit.
+
+        Args:
+            documents (iterable): The 'completions' documents.
+            counts (dict, optional): Counters to add the documents to, modified in place.
+
+        Returns:
+            dict: The counters ({status field: count}) keyed by habit ID; a catch-up entry counts once per missed period.
+        """
+        counts = {} if counts is None else counts
+        for document in documents:
+            status = cls.STATUS_FIELDS.get(document.get('status'))
+            if status:
+                habit = counts.setdefault(document['habit_id'], {})
+                habit[status] = habit.get(status, 0) + (document.get('missed') or 1)
+        return counts
+    # writes of the counters (no database access)
+    @staticmethod
+    def increment_requests(increments):
+        """
+        Build the (query, counters) pairs of MongoDBHandler.increment_documents.
+
+        Args:
+            increments (dict): The counters built by increments.
+
+        Returns:
+            list: One $inc upsert per user and day.
+        """
+        return [({'user_id': user_id, 'day': day}, counters) for (user_id, day), counters in increments.items()]
+    # add or remove history entries from the counters
+    def record(self, habits, documents, sign=1, operation=None):
+        """
+        Increment the counters of the days of 'completions' documents, in one round trip.
+
+        Args:
+            habits (dict): The habits of the documents, keyed by habit ID.
+            documents (list): The 'completions' documents.
+            sign (int): 1 for new documents, -1 for deleted ones.
+            operation (str, optional): ID of the write recording them; recording the same write again leaves
+                                       the counters of the days it already reached unchanged.
+
+        Returns:
+            int: The number of rollup documents written.
+        """
+        return self.db_handler.increment_documents(self.COLLECTION, self.increment_requests(self.increments(habits, documents, sign)), operation=operation)
+    # range of a series (no database access)
+    @classmethod
+    def _series_range(cls, start=None, end=None):
+        """
+        Parse and validate the days of a series.
+
+        Args:
+            start (str, optional): The first day ('YYYY-MM-DD'), DEFAULT_DAYS before 'end' by default.
+            end (str, optional): The last day, included ('YYYY-MM-DD'), today by default.
+
+        Returns:
+            Tuple: (first day, day after the last one, error result), the error result is None when the range is valid.
+        """
+        try:
+            last_day = Utils.parse_date(end) if end else Utils.parse_date(datetime.datetime.now())
+            first_day = Utils.parse_date(start) if start else last_day - datetime.timedelta(days=cls.DEFAULT_DAYS - 1)
+        except (ValueError, TypeError):
+            return None, None, {'success': False, 'error': 'Invalid date format. Dates should be in YYYY-MM-DD format.'}
+
+        if last_day < first_day:
+            return None, None, {'success': False, 'error': 'End date must not be earlier than start date.'}
+        if (last_day - first_day).days >= cls.MAX_DAYS:
+            return None, None, {'success': False, 'error': f'The range can not exceed {cls.MAX_DAYS} days.'}
+        return first_day, last_day + datetime.timedelta(days=1), None
+    # aggregation summing the counters of a range (no database access)
+    @classmethod
+    def _series_pipeline(cls, user_id, first_day, end_day, type=None, category=None):
+        """
+        Build the aggregation reading the daily counters of a range.
+
+        Args:
+            user_id (str): The ID of the user, None for all the users.
+            first_day (datetime.datetime): The first day.
+            end_day (datetime.datetime): The day after the last one.
+            type (str, optional): Only count habits of this type.
+            category (str, optional): Only count habits of this category.
+
+        Returns:
+            list: The aggregation stages, one document per day with activity, sorted by day.
+
+        Note:
+            The $match is a range on the ('user_id', 'day') or ('day') index; for a single user each
+            group holds one document.
+        """
+        query = {'day': {'$gte': first_day, '$lt': end_day}}
+        if user_id:
+            query['user_id'] = str(user_id)
+
+        prefix = ''
+        if type:
+            prefix = f'types.{cls._key(type)}.'
+        elif category:
+            prefix = f'categories.{cls._key(category)}.'
+
+        return [
+            {'$match': query},
+            {'$group': {'_id': '$day', **{field: {'$sum': f'${prefix}{field}'} for field in cls.STATUS_FIELDS.values()}}},
+            {'$sort': {'_id': 1}},
+            # '_id' is serialized as a string by the handler, the day is returned as a date
+            {'$project': {'_id': 0, 'day': '$_id', **dict.fromkeys(cls.STATUS_FIELDS.values(), 1)}}
+        ]
+    # series points of the counters (no database access)
+    @classmethod
+    def _series_points(cls, rows, first_day, end_day, interval):
+        """
+        Build one point per day or week of the range, with its counters and completion rate.
+
+        Args:
+            rows (list): The documents returned by the _series_pipeline aggregation.
+            first_day (datetime.datetime): The first day.
+            end_day (datetime.datetime): The day after the last one.
+            interval (str): 'day' or 'week' (weeks start on Monday).
+
+        Returns:
+            list: The points, with 'date' ('YYYY-MM-DD'), the counters, 'total' and 'completion_rate'
+                  (None without any entry); periods without activity are included with zeros.
+        """
+        def bucket(day):
+            return day - datetime.timedelta(days=day.weekday()) if interval == 'week' else day
+
+        step = datetime.timedelta(weeks=1) if interval == 'week' else datetime.timedelta(days=1)
+        points = {}
+        day = bucket(first_day)
+        while day < end_day:
+            points[day] = dict.fromkeys(cls.STATUS_FIELDS.values(), 0)
+            day += step
+        for row in rows:
+            counters = points[bucket(Utils.parse_datetime(row['day']))]
+            for field in counters:
+                counters[field] += row.get(field) or 0
+
+        series = []
+        for day, counters in points.items():
+            total = sum(counters.values())
+            done = counters['completed'] + counters['in_progress']
+            series.append({'date': day.strftime(Utils.DATE_FORMAT), **counters, 'total': total,
+                           'completion_rate': round(done / total, 4) if total else None})
+        return series
+    # completion rate time series
+    def series(self, user_id=None, start=None, end=None, interval='day', type=None, category=None):
+        """
+        Read the completion rate per day or per week of a user, or of all the users.
+
+        Args:
+            user_id (str, optional): The ID of the user, None for all the users.
+            start (str, optional): The first day ('YYYY-MM-DD'), a year before 'end' by default.
+            end (str, optional): The last day, included ('YYYY-MM-DD'), today by default.
+            interval (str, optional): 'day' or 'week'.
+            type (str, optional): Only count habits of this type.
+            category (str, optional): Only count habits of this category (ignored with 'type').
+
+        Returns:
+            dict: A dictionary with 'success' (bool), and 'interval', 'start', 'end' and 'series' (list, see
+                  _series_points), or 'error' (str).
+        """
+        if interval not in self.INTERVALS:
+            return {'success': False, 'error': 'Invalid interval. Interval must be either "day" or "week"'}
+        first_day, end_day, error = self._series_range(start, end)
+        if error:
+            return error
+
+        try:
+            rows = self.db_handler.aggregate(self.COLLECTION, self._series_pipeline(user_id, first_day, end_day, type, category))
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+        return self._series_result(rows, first_day, end_day, interval)
+    # result of a series (no database access)
+    @classmethod
+    def _series_result(cls, rows, first_day, end_day, interval):
+        """
+        Build the result returned by series.
+
+        Args:
+            rows (list): The documents returned by the _series_pipeline aggregation.
+            first_day (datetime.datetime): The first day.
+            end_day (datetime.datetime): The day after the last one.
+            interval (str): 'day' or 'week'.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), 'interval', 'start', 'end' and 'series'.
+        """
+        return {
+            'success': True,
+            'interval': interval,
+            'start': first_day.strftime(Utils.DATE_FORMAT),
+            'end': (end_day - datetime.timedelta(days=1)).strftime(Utils.DATE_FORMAT),
+            'series': cls._series_points(rows, first_day, end_day, interval)
+        }
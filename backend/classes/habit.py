@@ -1,6 +1,9 @@
 from classes.mongodb_handler import MongoDBHandler
 
 class Habit:
+    # fields of a pre setted habit, anything else sent to /habit/add (e.g. the admin credentials) is not stored
+    FIELDS = ['name', 'type', 'category', 'subcategory', 'description']
+
     def __init__(self, name=None, type=None, category=None, subcategory=None, description=None, _id=None):
         """
         Initialize a new habit object.
@@ -41,6 +44,27 @@ class Habit:
             In case of a failure (e.g., database connectivity issues, schema validation errors), 
             it returns an error message.
         """
+        error = self._validate(habit_data)
+        if error:
+            return error
+
+        try:
+            added_habit = db_handler.add_document('habits', self._habit_document(habit_data))
+            return {'success': True, 'data': added_habit}
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+    # validate a pre setted habit
+    @staticmethod
+    def _validate(habit_data):
+        """
+        Check the fields of a habit before it is added.
+
+        Args:
+            habit_data (dict): Data of the habit to add.
+
+        Returns:
+            dict: The error result, or None if the habit is valid.
+        """
         # Validate required fields
         required_fields = ['name', 'type', 'description']
         if not all(field in habit_data for field in required_fields):
@@ -51,12 +75,30 @@ class Habit:
         valid_types = ['daily', 'weekly']
         if habit_data['type'] not in valid_types:
             return {'success': False, 'error': 'Invalid habit type. Type must be either "daily" or "weekly"'}
+        return None
+    # stored document of a pre setted habit
+    @classmethod
+    def _habit_document(cls, habit_data):
+        """
+        Keep only the habit fields of the request data.
 
-        try:
-            added_habit = db_handler.add_document('habits', habit_data)
-            return {'success': True, 'data': added_habit}
-        except Exception as e:
-            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+        Args:
+            habit_data (dict): Data of the habit to add, as sent by the client.
+
+        Returns:
+            dict: The document to insert, with the fields in FIELDS that are present.
+        """
+        return {field: habit_data[field] for field in cls.FIELDS if field in habit_data}
+    # projection of the public habit fields
+    @classmethod
+    def _projection(cls):
+        """
+        Build the projection returning only the habit fields, so fields stored by older versions are not exposed.
+
+        Returns:
+            dict: The projection, '_id' is always included.
+        """
+        return {field: 1 for field in cls.FIELDS}
     # remove pre setted habit from habits (admin only)
     def remove(self, db_handler, habit_id):
         """
@@ -109,12 +151,8 @@ class Habit:
             It returns a list of habits on successful retrieval or an error message if there's an issue.
         """
         try:
-            if type:
-                print(type)
-                query = {'type': type}
-                habits = db_handler.list_documents('habits', query)
-            else:
-                habits = db_handler.list_documents('habits')
+            query = {'type': type} if type else None
+            habits = db_handler.list_documents('habits', query, projection=Habit._projection())
             return {'success': True, 'habits': habits}
         except Exception as e:
             return {'success': False, 'error': f'An error occurred: {str(e)}'}
\ No newline at end of file
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import time
+from classes.habit import Habit
+
+class HabitCatalog:
+    # 'system' document holding the catalog version, incremented on every change of the 'habits' collection
+    VERSION_ID = 'habit_catalog'
+
+    def __init__(self, db_handler, serialize=json.dumps, max_age=0, check_interval=1.0):
+        """
+        Initialize the in-process cache of the pre setted habits catalog (GET /habits).
+
+        Args:
+            db_handler (MongoDBHandler): An instance of MongoDBHandler to interact with the database.
+            serialize (callable): Serializes a result dict into the response body (e.g. app.json.dumps).
+            max_age (int): Seconds clients may reuse a response without revalidating it (Cache-Control).
+            check_interval (float): Seconds the catalog version read from the database is trusted.
+
+        Note:
+            Every process keeps its own serialized catalog per 'type' filter. The catalog version stored in
+            the database tells a process that another one changed the catalog; it is read at most once per
+            'check_interval', so most requests, and all the 304 answers, do not touch the database.
+        """
+        self.db_handler = db_handler
+        self.serialize = serialize
+        self.cache_control = f'public, max-age={int(max_age)}, must-revalidate'
+        self.check_interval = check_interval
+        self._entries = {}
+        self._version = None
+        self._checked_at = 0.0
+    # current catalog version, read from the database at most once per interval
+    def _current_version(self):
+        """
+        Return the catalog version, reading it again once the last read is older than 'check_interval'.
+
+        Returns:
+            int: The catalog version, 0 if the catalog never changed.
+        """
+        if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self._version
+        state = self.db_handler.find_document('system', {'_id': self.VERSION_ID}, projection={'version': 1})
+        return self._remember_version(state)
+    # store the version read from the database
+    def _remember_version(self, state):
+        """
+        Keep the version of a 'system' catalog document as the current one.
+
+        Args:
+            state (dict): The catalog version document, None if it does not exist.
+
+        Returns:
+            int: The version.
+        """
+        self._version = (state or {}).get('version', 0)
+        self._checked_at = time.monotonic()
+        return self._version
+    # cached entry of a result
+    def _store(self, key, version, result):
+        """
+        Serialize a catalog result once and cache it with its strong ETag.
+
+        Args:
+            key (str): The 'type' filter, '' for all the habits.
+            version (int): The catalog version the result was read at.
+            result (dict): The result of Habit.list_all.
+
+        Returns:
+            dict: The entry, with 'version', 'body' (str) and 'etag' (str, hash of the body).
+        """
+        body = self.serialize(result)
+        entry = {'version': version, 'body': body, 'etag': hashlib.sha256(body.encode()).hexdigest()[:32]}
+        self._entries[key] = entry
+        return entry
+    # serialized catalog of a type filter
+    def get(self, type=None):
+        """
+        Return the serialized catalog for a 'type' filter, from the cache while the catalog version did not change.
+
+        Args:
+            type (str, optional): Only list habits of this type (e.g., 'daily', 'weekly').
+
+        Returns:
+            tuple: (entry, error) where 'entry' (dict) has 'body' and 'etag', or 'error' (dict) is the failed
+                   Habit.list_all result, which is not cached.
+        """
+        version = self._current_version()
+        entry = self._entries.get(type or '')
+        if entry and entry['version'] == version:
+            return entry, None
+
+        # The version is read before the habits, a change made in between is fetched again on the next check
+        result = Habit.list_all(self.db_handler, type=type)
+        if not result['success']:
+            return None, result
+        return self._store(type or '', version, result), None
+    # the catalog changed
+    def invalidate(self):
+        """
+        Increment the catalog version in the database and drop the cached entries of this process.
+
+        Returns:
+            int: The new catalog version.
+
+        Note:
+            Called after /habit/add and /habit/remove; other processes see the new version within 'check_interval'.
+        """
+        state = self.db_handler.find_and_modify_document('system', {'_id': self.VERSION_ID}, {'$inc': {'version': 1}},
+                                                         projection={'version': 1}, upsert=True)
+        self._entries = {}
+        return self._remember_version(state)
@@ -1,9 +1,29 @@
 from classes.mongodb_handler import MongoDBHandler
+from classes.utils import Utils
+from classes.completion_rollups import CompletionRollups
 from bson import ObjectId
 import uuid
+import random
+import time
 import datetime
 
 class HabitTracker:
+    # how far the date range of a habit moves when it continues
+    PERIODS = {
+        'daily': datetime.timedelta(days=1),
+        'weekly': datetime.timedelta(weeks=1)
+    }
+    # read-modify-write attempts of a completion before giving up on concurrent writers,
+    # with a random pause of up to WRITE_RETRY_DELAY seconds (doubled after each attempt) in between
+    WRITE_ATTEMPTS = 5
+    WRITE_RETRY_DELAY = 0.01
+    CONFLICT_ERROR = {'success': False, 'error': 'The habits were modified by another request, please try again'}
+    # habits kept in the user's 'summary', by rank: (habit field, -1 for the highest value or 1 for the lowest)
+    SUMMARY_RANKS = {
+        'best': ('longest_streak', -1),
+        'worst': ('streak', 1)
+    }
+
     def __init__(self, db_handler):
         """
         Initialize HabitTracker with a MongoDBHandler instance.
@@ -12,8 +32,24 @@ class HabitTracker:
             db_handler (MongoDBHandler): An instance of MongoDBHandler to interact with the database.
         """
         self.db_handler = db_handler
+        self.rollups = CompletionRollups(db_handler, self.PERIODS)
+    # load the user, unless the caller already did
+    def _get_user(self, username, user=None):
+        """
+        Return the user document, loading it by username only if it was not provided.
+
+        Args:
+            username (str): The username of the user.
+            user (dict, optional): The already loaded user document.
+
+        Returns:
+            dict: The user document, or None if the user does not exist.
+        """
+        if user is not None:
+            return user
+        return self.db_handler.find_document('users', {'username': username})
     # list habits
-    def list_user_habits(self, username, habit_type=None, status=None):
+    def list_user_habits(self, username, habit_type=None, status=None, user=None):
         """
         List all habits assigned to a user, with optional filtering by habit type and status.
 
@@ -21,6 +57,7 @@ class HabitTracker:
             username (str): The username of the user whose habits to list.
             habit_type (str, optional): The type of the habits to filter (e.g., 'daily', 'weekly'). Defaults to None.
             status (str, optional): The status of the habits to filter (e.g., 'in progress', 'completed', 'failed'). Defaults to None.
+            user (dict, optional): The already loaded user document (e.g. from RequestContext), avoids loading it again.
 
         Returns:
             dict: A dictionary containing the result of the operation.
@@ -31,29 +68,69 @@ class HabitTracker:
             If the user has no habits or no habits match the filters, 'success' will be True and 'habits' will be an empty array.
         """
         # Validate user
-        user = self.db_handler.find_document('users', {'username': username})
+        user = self._get_user(username, user)
         if not user:
             return {'success': False, 'habits': [], 'message': 'User not found'}
 
-        user_habits = user.get('habits', [])
+        user_habits = self._filter_habits(user.get('habits', []), habit_type, status)
+
+        return {'success': True, 'habits': user_habits, 'message': 'Habits retrieved successfully'}
+    # filter habits by type and status (no database access)
+    @staticmethod
+    def _filter_habits(habits, habit_type=None, status=None):
+        """
+        Filter a list of habits by type and status.
+
+        Args:
+            habits (list): The habits of the user.
+            habit_type (str, optional): Only keep habits of this type.
+            status (str, optional): Only keep habits with this status.
 
+        Returns:
+            list: The matching habits.
+        """
         # Apply filters if provided
         if habit_type:
-            user_habits = [habit for habit in user_habits if habit.get('type') == habit_type]
+            habits = [habit for habit in habits if habit.get('type') == habit_type]
         if status:
-            user_habits = [habit for habit in user_habits if habit.get('status') == status]
+            habits = [habit for habit in habits if habit.get('status') == status]
+        return habits
+    # list completion history of a habit
+    def list_habit_history(self, username, habit_id, user=None):
+        """
+        List the completion history of one of the user's habits.
 
-        return {'success': True, 'habits': user_habits, 'message': 'Habits retrieved successfully'}
+        Args:
+            username (str): The username of the user.
+            habit_id (str): The ID of the habit.
+            user (dict, optional): The already loaded user document (e.g. from RequestContext), avoids loading it again.
+
+        Returns:
+            dict: A dictionary containing the result of the operation.
+                The dictionary includes keys 'success' (bool) indicating if the operation was successful,
+                'history' (list): The history entries ('datetime', 'status', 'streak', 'longest_streak') in insertion order,
+                and 'error' (str) in case of an error.
+        """
+        user = self._get_user(username, user)
+        if not user:
+            return {'success': False, 'error': 'User not found'}
+
+        if not any(habit['_id'] == habit_id for habit in user.get('habits', [])):
+            return {'success': False, 'error': 'Habit not found'}
+
+        history = self.db_handler.list_documents('completions', {'user_id': str(user['_id']), 'habit_id': habit_id})
+        return {'success': True, 'history': history}
     # assign habit (from pre setted habits)
-    def assign_habit(self, username, habit_id, start_range, end_range):
+    def assign_habit(self, username, habit_id, start_range, end_range, user=None):
         """
         Assign a habit to a user.
 
         Args:
             username (str): The username of the user to assign the habit to.
             habit_id (str): The ID of the habit to assign.
-            start_range (str): The start date range for the habit.
-            end_range (str): The end date range for the habit.
+            start_range (str or datetime.datetime): The start date range for the habit ('YYYY-MM-DD HH:MM').
+            end_range (str or datetime.datetime): The end date range for the habit ('YYYY-MM-DD HH:MM').
+            user (dict, optional): The already loaded user document (e.g. from RequestContext), avoids loading it again.
 
         Returns:
             dict: A dictionary containing the result of the assignment operation.
@@ -61,20 +138,12 @@ class HabitTracker:
                 'message' (str) describing the result, and 'error' (str) in case of an error.
         """
         # Validate dates
-        try:
-            start_datetime = datetime.datetime.strptime(start_range, '%Y-%m-%d %H:%M')
-            end_datetime = datetime.datetime.strptime(end_range, '%Y-%m-%d %H:%M')
-
-            # Check if end_range is greater than start_range
-            if end_datetime <= start_datetime:
-                return {'success': False, 'error': 'End date range must be later than start date range.'}
-        except ValueError:
-            return {'success': False, 'error': 'Invalid date format. Dates should be in YYYY-MM-DD HH:MM format.'}
-        except TypeError:
-            return {'success': False, 'error': 'Missing start_range or end_range.'}
+        start_datetime, end_datetime, error = self._parse_range(start_range, end_range)
+        if error:
+            return error
         
         # Validate user
-        user = self.db_handler.find_document('users', {'username': username})
+        user = self._get_user(username, user)
         if not user:
             return {'success': False, 'error': 'User not found'}
 
@@ -83,40 +152,18 @@ class HabitTracker:
         if not habit:
             return {'success': False, 'error': 'Habit not found'}
 
-        # Creation/Assign datetime
-        creation_datetime = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
-
         # Create habit
-        habit_data = {
-            '_id': str(uuid.uuid4()),
-            'habit_id': habit_id,
-            'name': habit['name'],
-            'type': habit['type'],
-            'category': habit.get('category', ''),
-            'subcategory': habit.get('subcategory', ''),
-            'description': habit.get('description', ''),
-            'start_range': start_range,
-            'end_range': end_range,
-            'status': 'in progress',
-            'creation_datetime': creation_datetime
-        }
+        habit_data = self._new_habit(habit['name'], habit['type'], start_datetime, end_datetime, habit.get('category', ''),
+                                     habit.get('subcategory', ''), habit.get('description', ''), habit_id=habit_id)
 
         # Validate habit type
-        valid_types = ['daily', 'weekly']
-        if habit_data.get('type') not in valid_types:
+        if habit_data.get('type') not in self.PERIODS:
             return {'success': False, 'error': 'Invalid habit type. Type must be either "daily" or "weekly"'}
 
-        try:
-            # Append the habit to the user's list
-            user_habits = user.get('habits', [])
-            user_habits.append(habit_data)
-            self.db_handler.update_document('users', user['_id'], {'habits': user_habits})
-
-            return {'success': True, 'message': 'Habit assigned successfully'}
-        except Exception as e:
-            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+        # Append the habit to the user's list (only the new habit is sent)
+        return self._write_plan(username, user, self._assign_plan(habit_data))
     # assign custom habit
-    def assign_custom_habit(self, username, name, type, start_range, end_range, category='', subcategory='', description=''):
+    def assign_custom_habit(self, username, name, type, start_range, end_range, category='', subcategory='', description='', user=None):
         """
         Assign a custom habit to a user by creating a new habit entry.
 
@@ -124,106 +171,165 @@ class HabitTracker:
             username (str): The username of the user to assign the habit to.
             name (str): Name of the habit.
             type (str): Type of the habit (e.g., 'daily', 'weekly').
-            start_range (str): The start date range for the habit.
-            end_range (str): The end date range for the habit.
+            start_range (str or datetime.datetime): The start date range for the habit ('YYYY-MM-DD HH:MM').
+            end_range (str or datetime.datetime): The end date range for the habit ('YYYY-MM-DD HH:MM').
             category (str, optional): Category of the habit.
             subcategory (str, optional): Subcategory of the habit.
             description (str, optional): Description of the habit.
+            user (dict, optional): The already loaded user document (e.g. from RequestContext), avoids loading it again.
 
         Returns:
             dict: A dictionary containing the result of the assignment operation.
                 The dictionary includes keys 'success' (bool) indicating if the operation was successful,
                 'message' (str) describing the result, and 'error' (str) in case of an error.
         """
-        user = self.db_handler.find_document('users', {'username': username})
+        user = self._get_user(username, user)
         if not user:
             return {'success': False, 'error': 'User not found'}
 
         # Validate date ranges
-        try:
-            start_datetime = datetime.datetime.strptime(start_range, '%Y-%m-%d %H:%M')
-            end_datetime = datetime.datetime.strptime(end_range, '%Y-%m-%d %H:%M')
-
-            # Check if end_range is greater than start_range
-            if end_datetime <= start_datetime:
-                return {'success': False, 'error': 'End date range must be later than start date range.'}
-        except ValueError:
-            return {'success': False, 'error': 'Invalid date format. Dates should be in YYYY-MM-DD HH:MM format.'}
-        except TypeError:
-            return {'success': False, 'error': 'Missing start_range or end_range.'}
+        start_datetime, end_datetime, error = self._parse_range(start_range, end_range)
+        if error:
+            return error
         
         # Validate habit type
-        valid_types = ['daily', 'weekly']
-        if type not in valid_types:
+        if type not in self.PERIODS:
             return {'success': False, 'error': 'Invalid habit type. Type must be either "daily" or "weekly"'}
         
-        # Creation/Assign datetime
-        creation_datetime = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
-
         # Prepare custom habit data
-        habit_data = {
-            '_id': str(uuid.uuid4()),
+        habit_data = self._new_habit(name, type, start_datetime, end_datetime, category, subcategory, description)
+
+        # Append the habit to the user's list (only the new habit is sent)
+        return self._write_plan(username, user, self._assign_plan(habit_data))
+    # validate the date range of a new habit (no database access)
+    @staticmethod
+    def _parse_range(start_range, end_range):
+        """
+        Parse and validate the date range of a habit.
+
+        Args:
+            start_range (str or datetime.datetime): The start date range for the habit.
+            end_range (str or datetime.datetime): The end date range for the habit.
+
+        Returns:
+            Tuple: (start datetime, end datetime, error result), the error result is None when the range is valid.
+        """
+        try:
+            start_datetime = Utils.parse_datetime(start_range)
+            end_datetime = Utils.parse_datetime(end_range)
+        except ValueError:
+            return None, None, {'success': False, 'error': 'Invalid date format. Dates should be in YYYY-MM-DD HH:MM format.'}
+        except TypeError:
+            return None, None, {'success': False, 'error': 'Missing start_range or end_range.'}
+
+        # Check if end_range is greater than start_range
+        if end_datetime <= start_datetime:
+            return None, None, {'success': False, 'error': 'End date range must be later than start date range.'}
+        return start_datetime, end_datetime, None
+    # habit embedded in the user document (no database access)
+    @staticmethod
+    def _new_habit(name, type, start_datetime, end_datetime, category='', subcategory='', description='', habit_id=None):
+        """
+        Build the habit appended to the user's list.
+
+        Args:
+            name (str): Name of the habit.
+            type (str): Type of the habit ('daily' or 'weekly').
+            start_datetime (datetime.datetime): The start date range for the habit.
+            end_datetime (datetime.datetime): The end date range for the habit.
+            category (str, optional): Category of the habit.
+            subcategory (str, optional): Subcategory of the habit.
+            description (str, optional): Description of the habit.
+            habit_id (str, optional): The ID of the predefined habit it was created from.
+
+        Returns:
+            dict: The habit, with a new '_id' and the current time as 'creation_datetime'.
+        """
+        habit_data = {'_id': str(uuid.uuid4())}
+        if habit_id:
+            habit_data['habit_id'] = habit_id
+        habit_data.update({
             'name': name,
             'type': type,
             'category': category,
             'subcategory': subcategory,
             'description': description,
-            'start_range': start_range,
-            'end_range': end_range,
+            'start_range': start_datetime,
+            'end_range': end_datetime,
             'status': 'in progress',
-            'creation_datetime': creation_datetime
-        }
-
-        try:
-            # Append the habit to the user's list
-            user_habits = user.get('habits', [])
-            user_habits.append(habit_data)
-            self.db_handler.update_document('users', user['_id'], {'habits': user_habits})
-
-            return {'success': True, 'message': 'Habit assigned successfully'}
-        except Exception as e:
-            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+            # Creation/Assign datetime
+            'creation_datetime': datetime.datetime.now().replace(second=0, microsecond=0)
+        })
+        return habit_data
     # dissociate/remove habit from habits list of user
-    def remove_habit(self, username, habit_id):
+    def remove_habit(self, username, habit_id, user=None):
         """
         Remove a habit from a user's list of habits.
 
         Args:
             username (str): The username of the user.
             habit_id (str): The ID of the habit to remove.
+            user (dict, optional): The already loaded user document (e.g. from RequestContext), avoids loading it again.
 
         Returns:
             dict: A dictionary containing the result of the assignment operation.
                 The dictionary includes keys 'success' (bool) indicating if the operation was successful,
                 'message' (str) describing the result, and 'error' (str) in case of an error.
         """
-        user = self.db_handler.find_document('users', {'username': username})
-        if not user:
-            return {'success': False, 'error': 'User not found'}
+        # Pull the habit out of the list, a concurrent removal is retried and reports 'Habit not found';
+        # the history of the habit goes with it
+        return self._write_plan(username, user, self._remove_plan(habit_id))
+    # writes of a new habit (no database access)
+    @classmethod
+    def _assign_plan(cls, habit_data):
+        """
+        Build the plan builder appending a habit, for _write_plan.
 
-        # Check if the habit exists for the user
-        user_habits = user.get('habits', [])
-        if not any(habit['_id'] == habit_id for habit in user_habits):
-            return {'success': False, 'error': 'Habit not found'}
+        Args:
+            habit_data (dict): The habit built by _new_habit.
 
-        try:
-            # Filter out the habit to be removed
-            updated_habits = [habit for habit in user_habits if habit['_id'] != habit_id]
-            self.db_handler.update_document('users', user['_id'], {'habits': updated_habits})
-        except Exception as e:
-            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+        Returns:
+            callable: Takes the user document, appends the habit to it in memory and returns (plan, result).
+        """
+        def build_plan(user):
+            plan = cls._new_plan()
+            plan['push'].append(habit_data)
+            user['habits'] = user.get('habits', []) + [habit_data]
+            return plan, {'success': True, 'message': 'Habit assigned successfully'}
+        return build_plan
+    # writes of a habit removal (no database access)
+    @classmethod
+    def _remove_plan(cls, habit_id):
+        """
+        Build the plan builder removing a habit, for _write_plan.
 
-        return {'success': True, 'message': 'Habit removed successfully'}
+        Args:
+            habit_id (str): The ID of the habit to remove.
+
+        Returns:
+            callable: Takes the user document, removes the habit from it in memory and returns (plan, result).
+        """
+        def build_plan(user):
+            habits = user.get('habits', [])
+            if not any(habit['_id'] == habit_id for habit in habits):
+                return None, {'success': False, 'error': 'Habit not found'}
+
+            plan = cls._new_plan()
+            plan['pull'][habit_id] = next(habit for habit in habits if habit['_id'] == habit_id)
+            user['habits'] = [habit for habit in habits if habit['_id'] != habit_id]
+            return plan, {'success': True, 'message': 'Habit removed successfully'}
+        return build_plan
     # update daily habit and proceed with app logic
-    def update_daily_habit(self, username, habit_id, completion_date, continue_enabled):
+    def update_daily_habit(self, username, habit_id, completion_date, continue_enabled, user=None):
         """
         Update a daily habit for a user.
 
         Args:
             username (str): The username of the user.
             habit_id (str): The ID of the habit to update.
-            completion_date (str): The date when the habit was completed.
+            completion_date (datetime.datetime or str): The date when the habit was completed.
             continue_enabled (bool): Whether the habit should continue or not.
+            user (dict, optional): The already loaded user document (e.g. from RequestContext), avoids loading it again.
 
         Returns:
             dict: A dictionary containing the following keys:
@@ -235,84 +341,18 @@ class HabitTracker:
             The method updates the habit's streak, longest streak, and status. 
             If the habit is not found or the user does not exist, it returns an error.
         """
-        user = self.db_handler.find_document('users', {'username': username})
-        if not user:
-            return {'success': False, 'error': 'User not found'}
-
-        # LOGIC
-
-        habit_found = False
-        user_habits = user.get('habits', [])
-        for habit in user_habits:
-            if habit['_id'] == habit_id:
-                habit_found = True
-
-                # Check if habit type is 'daily'
-                if habit.get('type') != 'daily':
-                    return {'success': False, 'error': 'Habit type is not daily'}
-
-                # Logic for checking the date range and updating the streak
-                start_range, end_range = habit.get('start_range'), habit.get('end_range')
-                completed_in_range = start_range <= completion_date <= end_range
-
-                # Logic to increase both range dates by one day if continue_enabled is true
-                if continue_enabled:
-                    start_datetime = datetime.datetime.strptime(start_range, '%Y-%m-%d %H:%M')
-                    end_datetime = datetime.datetime.strptime(end_range, '%Y-%m-%d %H:%M')
-
-                    # Increment both dates by one day
-                    new_start_range = (start_datetime + datetime.timedelta(days=1)).strftime('%Y-%m-%d %H:%M')
-                    new_end_range = (end_datetime + datetime.timedelta(days=1)).strftime('%Y-%m-%d %H:%M')
-
-                    # Update the habit's start and end ranges
-                    habit['start_range'] = new_start_range
-                    habit['end_range'] = new_end_range
-
-                # Update streak and longest_streak logic
-                if completed_in_range:
-                    habit['streak'] = habit.get('streak', 0) + 1
-                    habit['longest_streak'] = max(habit.get('longest_streak', 0), habit['streak'])
-                    habit['status'] = 'in progress' if continue_enabled else 'completed'
-                    current_status = 'completed' if continue_enabled else 'in progress'
-                else:
-                    # Longest streak logic
-                    habit['longest_streak'] = max(habit.get('longest_streak', 0), habit.get('streak', 0))
-                    habit['streak'] = 0
-                    habit['status'] = 'failed'
-                    current_status = 'failed'
-
-                habit['completion_datetime'] = completion_date
-
-                 # Add entry to completion_datetimes array
-                completion_entry = {
-                    'datetime': completion_date,
-                    'status': current_status,
-                    'streak': habit['streak'],
-                    'longest_streak': habit['longest_streak']
-                }
-                habit.setdefault('completion_datetimes', []).append(completion_entry)
-
-                break
-        
-        if not habit_found:
-            return {'success': False, 'error': 'Habit not found'}
-
-        try:
-            self.db_handler.update_document('users', user['_id'], {'habits': user_habits})
-        except Exception as e:
-            return {'success': False, 'error': f'An error occurred: {str(e)}'}
-
-        return {'success': True, 'message': 'Habit updated successfully'}
+        return self._complete_habit(username, habit_id, completion_date, continue_enabled, 'daily', self.PERIODS['daily'], user)
     # update weekly habit and proceed with app logic
-    def update_weekly_habit(self, username, habit_id, completion_date, continue_enabled):
+    def update_weekly_habit(self, username, habit_id, completion_date, continue_enabled, user=None):
         """
         Update a weekly habit for a user.
 
         Args:
             username (str): The username of the user.
             habit_id (str): The ID of the habit to update.
-            completion_date (str): The date when the habit was completed.
+            completion_date (datetime.datetime or str): The date when the habit was completed.
             continue_enabled (bool): Whether the habit should continue or not.
+            user (dict, optional): The already loaded user document (e.g. from RequestContext), avoids loading it again.
 
         Returns:
             dict: A dictionary containing the following keys:
@@ -324,109 +364,724 @@ class HabitTracker:
             The method updates the habit's streak, longest streak, and status. 
             If the habit is not found or the user does not exist, it returns an error.
         """
-        user = self.db_handler.find_document('users', {'username': username})
+        return self._complete_habit(username, habit_id, completion_date, continue_enabled, 'weekly', self.PERIODS['weekly'], user)
+    # shared completion flow of daily and weekly habits
+    def _complete_habit(self, username, habit_id, completion_date, continue_enabled, habit_type, period, user=None):
+        """
+        Apply a completion to a habit and persist only the changed fields.
+
+        Args:
+            username (str): The username of the user.
+            habit_id (str): The ID of the habit to update.
+            completion_date (datetime.datetime or str): The date when the habit was completed.
+            continue_enabled (bool): Whether the habit should continue or not.
+            habit_type (str): The expected type of the habit ('daily' or 'weekly').
+            period (datetime.timedelta): How far the date range moves when the habit continues.
+            user (dict, optional): The already loaded user document.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), and 'message' (str) or 'error' (str).
+
+        Note:
+            Only the changed fields of the habit are written, see _persist_plan. The history
+            entry is inserted into the 'completions' collection.
+        """
+        def build_plan(user):
+            plan, error = self._plan_completion(user, habit_id, completion_date, continue_enabled, habit_type, period)
+            return plan, error or {'success': True, 'message': 'Habit updated successfully'}
+
+        return self._write_plan(username, user, build_plan)
+    # apply many completions in order and persist them together
+    def complete_batch(self, username, items, user=None):
+        """
+        Apply a list of completions in order and persist them with one write per collection.
+
+        Args:
+            username (str): The username of the user.
+            items (list): Dictionaries with 'habit_id', 'completion_date' and optionally 'continue_habit'.
+            user (dict, optional): The already loaded user document.
+
+        Returns:
+            dict: A dictionary with 'success' (bool) and 'results' (list) or 'error' (str).
+
+        Note:
+            Each item runs through the same streak logic as update_daily_habit and update_weekly_habit,
+            on the in-memory habit, so several completions of one habit chain correctly. Each result has
+            the shape of those methods; an invalid item is reported without stopping the others.
+            'continue_habit' defaults to True for daily habits and False for weekly habits.
+        """
+        def build_plan(user):
+            results, plan = self._plan_batch(user, items)
+            return plan, {'success': True, 'results': results}
+
+        return self._write_plan(username, user, build_plan)
+    # move habits past missed periods in one step
+    def catch_up_habits(self, username, habit_id=None, now=None, user=None):
+        """
+        Move the date range of habits whose periods ended without a completion up to the current period.
+
+        Args:
+            username (str): The username of the user.
+            habit_id (str, optional): Only catch up this habit, all the user's habits otherwise.
+            now (datetime.datetime or str, optional): The reference date, the current time by default.
+            user (dict, optional): The already loaded user document.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), and 'missed' (dict, missed periods keyed by habit ID)
+                  and 'message' (str), or 'error' (str).
+
+        Note:
+            However long the user was away, each habit gets a single update and a single 'failed'
+            history entry carrying the number of 'missed' periods, all habits are written together.
+            Habits completed without continuing keep their date range.
+        """
+        def build_plan(user):
+            plan, error = self._plan_catch_up(user, habit_id, now)
+            return plan, error or self._catch_up_result(plan)
+
+        return self._write_plan(username, user, build_plan)
+    # optimistic read-modify-write of the user's habits
+    def _write_plan(self, username, user, build_plan):
+        """
+        Build the writes of a plan from the user document and persist them, retrying with a fresh document
+        when another request changed the user in between.
+
+        Args:
+            username (str): The username of the user.
+            user (dict): The already loaded user document, or None to load it.
+            build_plan (callable): Takes the user document and returns (plan, result): the writes (None when
+                                   there is nothing to write) and the result returned once they are persisted.
+
+        Returns:
+            dict: The result of build_plan, an error, or CONFLICT_ERROR after WRITE_ATTEMPTS lost races.
+
+        Note:
+            The update only matches the 'version' the plan was built from (see _persist_plan), so
+            concurrent writes of one user are never lost, whichever process serves them, without any lock.
+            A lost race is retried after a short random pause, see _retry_delay.
+            build_plan and the decisions of every attempt (_attempt_plan, _attempt_result) have no database
+            access, the async tracker shares them.
+        """
+        for attempt in range(self.WRITE_ATTEMPTS):
+            if attempt:
+                time.sleep(self._retry_delay(attempt))
+            user = self._get_user(username, user)
+            plan, result = self._attempt_plan(user, build_plan)
+            if plan:
+                result = self._attempt_result(result, self._persist_plan(user, plan))
+            if result:
+                return result
+            # Another write moved the version, plan again from the current document
+            user = None
+        return self.CONFLICT_ERROR
+    # plan of an attempt of _write_plan (no database access)
+    @classmethod
+    def _attempt_plan(cls, user, build_plan):
+        """
+        Build the writes of one attempt of _write_plan.
+
+        Args:
+            user (dict): The user document, None if the user does not exist.
+            build_plan (callable): The plan builder of _write_plan.
+
+        Returns:
+            Tuple: (plan, result); the plan is None when the result is final: an error, or nothing to write.
+        """
         if not user:
-            return {'success': False, 'error': 'User not found'}
+            return None, {'success': False, 'error': 'User not found'}
+        plan, result = build_plan(user)
+        return (plan if cls._has_writes(plan) else None), result
+    # result of an attempt of _write_plan (no database access)
+    @staticmethod
+    def _attempt_result(result, written):
+        """
+        Decide the outcome of an attempt of _write_plan once its plan was persisted.
 
-        # LOGIC
-
-        habit_found = False
-        user_habits = user.get('habits', [])
-        for habit in user_habits:
-            if habit['_id'] == habit_id:
-                habit_found = True
-
-                # Check if habit type is 'weekly'
-                if habit.get('type') != 'weekly':
-                    return {'success': False, 'error': 'Habit type is not daily'}
-
-                # Logic for checking the date range and updating the streak
-                start_range, end_range = habit.get('start_range'), habit.get('end_range')
-                completed_in_range = start_range <= completion_date <= end_range
-
-                # Logic to increase both range dates by one day if continue_enabled is true
-                if continue_enabled:
-                    start_datetime = datetime.datetime.strptime(start_range, '%Y-%m-%d %H:%M')
-                    end_datetime = datetime.datetime.strptime(end_range, '%Y-%m-%d %H:%M')
-
-                    # Increment both dates by one week
-                    new_start_range = (start_datetime + datetime.timedelta(weeks=1)).strftime('%Y-%m-%d %H:%M')
-                    new_end_range = (end_datetime + datetime.timedelta(weeks=1)).strftime('%Y-%m-%d %H:%M')
-
-                    # Update the habit's start and end ranges
-                    habit['start_range'] = new_start_range
-                    habit['end_range'] = new_end_range
-
-                # Update streak and longest_streak logic
-                if completed_in_range:
-                    habit['streak'] = habit.get('streak', 0) + 1
-                    habit['longest_streak'] = max(habit.get('longest_streak', 0), habit['streak'])
-                    habit['status'] = 'in progress' if continue_enabled else 'completed'
-                    current_status = 'completed' if continue_enabled else 'in progress'
-                else:
-                    # Longest streak logic
-                    habit['longest_streak'] = max(habit.get('longest_streak', 0), habit.get('streak', 0))
-                    habit['streak'] = 0
-                    habit['status'] = 'failed'
-                    current_status = 'failed'
-
-                habit['completion_datetime'] = completion_date
-
-                 # Add entry to completion_datetimes array
-                completion_entry = {
-                    'datetime': completion_date,
-                    'status': current_status,
-                    'streak': habit['streak'],
-                    'longest_streak': habit['longest_streak']
-                }
-                habit.setdefault('completion_datetimes', []).append(completion_entry)
-
-                break
-        
-        if not habit_found:
-            return {'success': False, 'error': 'Habit not found'}
+        Args:
+            result (dict): The result returned by build_plan.
+            written (dict): The outcome of _persist_plan, None if the user changed in between.
+
+        Returns:
+            dict: The result of the write, or None to plan it again from the current user document.
+        """
+        if written is None:
+            return None
+        return result if written['success'] else written
+    # persist the state changes and history of completions
+    def _persist_plan(self, user, plan):
+        """
+        Write the changed habits, the summary and the pending history writes in one update, then apply the history writes.
+
+        Args:
+            user (dict): The user document, with the plan applied to its habits in memory.
+            plan (dict): The writes built by _new_plan.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), and 'error' (str) if the update failed, or None if the user
+                  document changed since it was read and nothing was written.
 
+        Note:
+            The update only matches while every changed or removed habit still exists and the user is still
+            at the version of the document the plan was built from, see _plan_update and _version_condition.
+            That is what keeps the 'summary', computed from the in-memory habits, exact.
+            Once it matched the write has succeeded: the history entries and rollups it implies are recorded in
+            the user's 'pending_writes' by the same update (see _pending_write), so a failure while applying
+            them is only logged and they are applied again by the next write of the user.
+        """
+        update, conditions, array_filters, pending_writes = self._persist_update(user, plan)
         try:
-            self.db_handler.update_document('users', user['_id'], {'habits': user_habits})
+            updated = self.db_handler.modify_document('users', user['_id'], update, conditions=conditions, array_filters=array_filters)
         except Exception as e:
             return {'success': False, 'error': f'An error occurred: {str(e)}'}
+        if not updated:
+            return None
+
+        self._apply_pending_writes(user['_id'], pending_writes)
+        return {'success': True}
+    # versioned update of a plan (no database access)
+    @classmethod
+    def _persist_update(cls, user, plan):
+        """
+        Build the update of _persist_plan and the history writes to apply once it matched.
 
-        return {'success': True, 'message': 'Habit updated successfully'}
-    # get the longest streak habit
-    def longest_streak_habit(self, username, type):
+        Args:
+            user (dict): The user document, with the plan applied to its habits in memory.
+            plan (dict): The writes built by _new_plan.
+
+        Returns:
+            Tuple: (update, conditions, array_filters) for MongoDBHandler.modify_document, and the pending writes
+                   to apply after it, oldest first.
         """
-        Find the habit with the longest streak for a given user.
+        update, conditions, array_filters = cls._plan_update(plan)
+        update['$set']['summary'] = cls._summary(user.get('habits', []))
+        conditions.update(cls._version_condition(user))
+        pending = cls._pending_write(user, plan)
+        if pending:
+            update.setdefault('$push', {})['pending_writes'] = pending
+        # Writes left by an earlier request that failed to apply them come first
+        return update, conditions, array_filters, user.get('pending_writes', []) + ([pending] if pending else [])
+    # apply the history writes recorded in the user document
+    def _apply_pending_writes(self, user_id, pending_writes):
+        """
+        Insert the history entries of pending writes, count them in the rollups and delete the history of
+        removed habits on the server, then clear them from the user document.
+
+        Args:
+            user_id (str): The ID of the user.
+            pending_writes (list): The writes built by _pending_write, oldest first.
+
+        Returns:
+            bool: True if every write was applied, False if one failed; it and the following ones stay pending.
+
+        Note:
+            Applying a write again is harmless: the entries have fixed IDs and the insert skips the existing ones,
+            and the rollup documents that already counted the write are skipped (see CompletionRollups.record).
+        """
+        applied = []
+        try:
+            for pending in pending_writes:
+                for operation, args, kwargs in self._pending_operations(user_id, pending):
+                    operation(*args, **kwargs)
+                applied.append(pending['_id'])
+        except Exception as e:
+            print(f"ERROR: Could not apply the pending writes of user {user_id}: {e}")
+        if applied:
+            try:
+                self.db_handler.modify_document('users', user_id, self._applied_update(applied))
+            except Exception as e:
+                print(f"ERROR: Could not clear the pending writes of user {user_id}: {e}")
+                return False
+        return len(applied) == len(pending_writes)
+    # database calls applying a pending write, shared with AsyncHabitTracker (no database access)
+    def _pending_operations(self, user_id, pending):
+        """
+        List the calls applying a pending write, in order, without running them.
+
+        Args:
+            user_id (str): The ID of the user.
+            pending (dict): The write built by _pending_write.
+
+        Yields:
+            Tuple: (method of the database handler or of the rollups, args, kwargs); with the async handler
+                   the call returns a coroutine to await.
+        """
+        # The history lives in the 'completions' collection, the habit only keeps its current state
+        yield self.db_handler.insert_documents, ('completions', pending['documents']), {'ignore_duplicates': True}
+        # The daily counters of the time series follow the history, see CompletionRollups
+        yield self.rollups.record, (self._pending_habits(pending['habits']), pending['documents']), {'operation': pending['_id']}
+        # The rollups keep counting the history of removed habits, past days of the series never change
+        if pending['pull']:
+            yield self.db_handler.delete_documents, ('completions', self._pull_query(user_id, pending)), {}
+    # history writes of a plan, recorded with the user update (no database access)
+    @staticmethod
+    def _pending_write(user, plan):
+        """
+        Describe the history writes of a plan, so they can be applied, or applied again, after the user update.
+
+        Args:
+            user (dict): The user document the plan was built from.
+            plan (dict): The writes built by _new_plan; its history entries get their '_id'.
+
+        Returns:
+            dict: '_id' (the user ID and the version the update moves the user to), 'documents' (the history entries),
+                  'habits' (ID, type and category of the habits of the entries) and 'pull' (the IDs of the removed
+                  habits), or None if the plan writes no history.
+        """
+        if not plan['documents'] and not plan['pull']:
+            return None
+        write_id = f"{user['_id']}:{user.get('version', 0) + 1}"
+        for index, document in enumerate(plan['documents']):
+            document['_id'] = f'{write_id}:{index}'
+
+        def rollup_fields(habit):
+            return {'_id': habit['_id'], 'type': habit.get('type'), 'category': habit.get('category')}
+        habit_ids = {document['habit_id'] for document in plan['documents']}
+        return {'_id': write_id, 'documents': plan['documents'],
+                'habits': [rollup_fields(habit) for habit in user.get('habits', []) if habit['_id'] in habit_ids],
+                'pull': list(plan['pull'])}
+    # habits of a pending write, for the rollups (no database access)
+    @staticmethod
+    def _pending_habits(habits):
+        """
+        Key the habits of a pending write by ID, as CompletionRollups.record expects them.
+
+        Args:
+            habits (list): The 'habits' of a write built by _pending_write.
+
+        Returns:
+            dict: The habits keyed by habit ID.
+        """
+        return {habit['_id']: habit for habit in habits}
+    # history of the habits removed by a pending write (no database access)
+    @staticmethod
+    def _pull_query(user_id, pending):
+        """
+        Build the query of the 'completions' documents of the habits a pending write removes.
+
+        Args:
+            user_id (str): The ID of the user.
+            pending (dict): The write built by _pending_write.
+
+        Returns:
+            dict: The query.
+        """
+        return {'user_id': str(user_id), 'habit_id': {'$in': pending['pull']}}
+    # clear the applied pending writes (no database access)
+    @staticmethod
+    def _applied_update(applied):
+        """
+        Build the update removing applied writes from the user's 'pending_writes'.
+
+        Args:
+            applied (list): The IDs of the applied writes.
+
+        Returns:
+            dict: The update; it does not move the user's version, the habits did not change.
+        """
+        return {'$pull': {'pending_writes': {'_id': {'$in': applied}}}}
+    # empty set of completion writes (no database access)
+    @staticmethod
+    def _new_plan():
+        """
+        Start collecting the writes of one or more completions.
+
+        Returns:
+            dict: 'changes' (changed fields keyed by habit ID), 'counts' (completions keyed by habit ID),
+                  'documents' (the 'completions' documents to insert), 'missed' (periods caught up, keyed by habit ID),
+                  'push' (new habits) and 'pull' (removed habits keyed by habit ID).
+        """
+        return {'changes': {}, 'counts': {}, 'documents': [], 'missed': {}, 'push': [], 'pull': {}}
+    # whether a plan writes anything (no database access)
+    @staticmethod
+    def _has_writes(plan):
+        """
+        Tell whether a plan built by _new_plan has anything to write.
+
+        Args:
+            plan (dict): The plan, or None.
+
+        Returns:
+            bool: True if the plan changes, adds or removes habits.
+        """
+        return bool(plan and (plan['changes'] or plan['push'] or plan['pull']))
+    # add an applied completion to the writes (no database access)
+    @staticmethod
+    def _add_to_plan(plan, user, habit_id, changes, completion_entry):
+        """
+        Merge the changes and history entry of one completion into the writes.
+
+        Args:
+            plan (dict): The writes built by _new_plan, modified in place.
+            user (dict): The user document.
+            habit_id (str): The ID of the habit.
+            changes (dict): The habit fields that were modified.
+            completion_entry (dict): The new history entry.
+        """
+        plan['changes'].setdefault(habit_id, {}).update(changes)
+        plan['counts'][habit_id] = plan['counts'].get(habit_id, 0) + 1
+        plan['documents'].append(HabitTracker._completion_document(user['_id'], habit_id, completion_entry))
+    # completion of one habit (no database access)
+    @classmethod
+    def _plan_completion(cls, user, habit_id, completion_date, continue_enabled, habit_type, period):
+        """
+        Apply a completion to the in-memory habit and build its writes.
+
+        Args:
+            user (dict): The user document, its habit is modified in place.
+            habit_id (str): The ID of the habit to update.
+            completion_date (datetime.datetime or str): The date when the habit was completed.
+            continue_enabled (bool): Whether the habit should continue or not.
+            habit_type (str): The expected type of the habit ('daily' or 'weekly').
+            period (datetime.timedelta): How far the date range moves when the habit continues.
+
+        Returns:
+            Tuple: (plan, error result), the error result is None when the completion applies.
+        """
+        habit = next((habit for habit in user.get('habits', []) if habit['_id'] == habit_id), None)
+        if not habit:
+            return None, {'success': False, 'error': 'Habit not found'}
+
+        # Check habit type
+        if habit.get('type') != habit_type:
+            return None, {'success': False, 'error': f'Habit type is not {habit_type}'}
+
+        plan = cls._new_plan()
+        changes, completion_entry = cls._apply_completion(habit, completion_date, continue_enabled, period)
+        cls._add_to_plan(plan, user, habit_id, changes, completion_entry)
+        return plan, None
+    # completions of a batch (no database access)
+    @classmethod
+    def _plan_batch(cls, user, items):
+        """
+        Apply a list of completions in order to the in-memory habits and build their writes.
+
+        Args:
+            user (dict): The user document, its habits are modified in place.
+            items (list): Dictionaries with 'habit_id', 'completion_date' and optionally 'continue_habit'.
+
+        Returns:
+            Tuple: (results, plan) where 'results' (list) has one result per item.
+        """
+        habits = {habit['_id']: habit for habit in user.get('habits', [])}
+        results = []
+        plan = cls._new_plan()
+
+        for item in items:
+            if not isinstance(item, dict) or not item.get('habit_id') or not item.get('completion_date'):
+                results.append({'success': False, 'error': 'habit_id and completion_date are required'})
+                continue
+
+            habit_id = item['habit_id']
+            try:
+                completion_date = Utils.parse_datetime(item['completion_date'])
+            except (ValueError, TypeError):
+                results.append({'success': False, 'error': 'Invalid date format. Date should be in YYYY-MM-DD HH:MM format.'})
+                continue
+
+            habit = habits.get(habit_id)
+            if not habit:
+                results.append({'success': False, 'error': 'Habit not found'})
+                continue
+
+            habit_type = habit.get('type')
+            if habit_type not in cls.PERIODS:
+                results.append({'success': False, 'error': 'Invalid habit type'})
+                continue
+
+            continue_enabled = item.get('continue_habit', habit_type == 'daily')
+            changes, completion_entry = cls._apply_completion(habit, completion_date, continue_enabled, cls.PERIODS[habit_type])
+            cls._add_to_plan(plan, user, habit_id, changes, completion_entry)
+            results.append({'success': True, 'message': 'Habit updated successfully'})
+
+        return results, plan
+    # catch-up of the user's habits (no database access)
+    @classmethod
+    def _plan_catch_up(cls, user, habit_id=None, now=None):
+        """
+        Catch up the in-memory habits and build their writes.
+
+        Args:
+            user (dict): The user document, its habits are modified in place.
+            habit_id (str, optional): Only catch up this habit, all the user's habits otherwise.
+            now (datetime.datetime or str, optional): The reference date, the current time by default.
+
+        Returns:
+            Tuple: (plan, error result), the error result is None when the habit exists.
+        """
+        now = Utils.parse_datetime(now) if now else datetime.datetime.now().replace(second=0, microsecond=0)
+
+        habits = user.get('habits', [])
+        if habit_id:
+            habits = [habit for habit in habits if habit['_id'] == habit_id]
+            if not habits:
+                return None, {'success': False, 'error': 'Habit not found'}
+
+        plan = cls._new_plan()
+        for habit in habits:
+            period = cls.PERIODS.get(habit.get('type'))
+            if not period:
+                continue
+            changes, completion_entry = cls._apply_catch_up(habit, now, period)
+            if changes:
+                plan['missed'][habit['_id']] = completion_entry['missed']
+                cls._add_to_plan(plan, user, habit['_id'], changes, completion_entry)
+        return plan, None
+    # result of a catch-up (no database access)
+    @staticmethod
+    def _catch_up_result(plan):
+        """
+        Build the result returned by catch_up_habits.
+
+        Args:
+            plan (dict): The writes built by _plan_catch_up.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), 'missed' (dict) and 'message' (str).
+        """
+        missed = plan['missed']
+        return {'success': True, 'missed': missed, 'message': f'{len(missed)} habits caught up' if missed else 'Habits are up to date'}
+    # single update of the user document (no database access)
+    @staticmethod
+    def _plan_update(plan):
+        """
+        Build the update writing the changed fields of every habit of the plan, and its new or removed habits.
+
+        Args:
+            plan (dict): The writes built by _new_plan.
+
+        Returns:
+            Tuple: (update, conditions, array_filters) for MongoDBHandler.modify_document.
+
+        Note:
+            Each habit is targeted by its own array filter ('h0', 'h1', ...), so only the changed fields
+            are $set and other habits of the user are never rewritten. The 'status_counts' of a habit
+            count its history entries by status (see CompletionRollups.habit_counts). The conditions require every
+            changed or removed habit to still exist.
+        """
+        update = {'$set': {}, '$inc': {}}
+        array_filters = []
+        status_counts = CompletionRollups.habit_counts(plan['documents'])
+        for index, (habit_id, changes) in enumerate(plan['changes'].items()):
+            identifier = f'h{index}'
+            for field, value in changes.items():
+                update['$set'][f'habits.$[{identifier}].{field}'] = value
+            update['$inc'][f'habits.$[{identifier}].completion_count'] = plan['counts'][habit_id]
+            # History entries of the habit by status, the completion rate of the admin habits report
+            for status, count in status_counts.get(habit_id, {}).items():
+                update['$inc'][f'habits.$[{identifier}].status_counts.{status}'] = count
+            array_filters.append({f'{identifier}._id': habit_id})
+        if plan['push']:
+            update['$push'] = {'habits': {'$each': plan['push']}}
+        if plan['pull']:
+            update['$pull'] = {'habits': {'_id': {'$in': list(plan['pull'])}}}
+
+        conditions = {}
+        existing = list(plan['changes']) + list(plan['pull'])
+        if existing:
+            conditions['habits._id'] = {'$all': existing}
+        return HabitTracker._versioned(update), conditions, array_filters or None
+    # every write of the user's habits moves its version forward
+    @staticmethod
+    def _versioned(update):
+        """
+        Add the increment of the user document 'version' to an update.
+
+        Args:
+            update (dict): The update operators, modified in place.
+
+        Returns:
+            dict: The update.
+
+        Note:
+            The version identifies the state of the user's habits and history; listings use it as their
+            ETag, so every mutation of HabitTracker must go through this.
+        """
+        update.setdefault('$inc', {})['version'] = 1
+        return update
+    # pause before retrying a write that lost a race
+    @classmethod
+    def _retry_delay(cls, attempt):
+        """
+        Pick the pause before a new attempt, random so the requests that collided do not collide again.
+
+        Args:
+            attempt (int): The number of the attempt about to start (1 for the first retry).
+
+        Returns:
+            float: The pause in seconds.
+        """
+        return random.uniform(0, cls.WRITE_RETRY_DELAY * 2 ** (attempt - 1))
+    # condition matching the user document only at the version it was read
+    @staticmethod
+    def _version_condition(user):
+        """
+        Build the condition of an update that must not overwrite a concurrent change of the user.
+
+        Args:
+            user (dict): The user document the update was computed from.
+
+        Returns:
+            dict: The condition on 'version'; documents written before versions existed have none.
+        """
+        if 'version' in user:
+            return {'version': user['version']}
+        return {'version': {'$exists': False}}
+    # streak logic of a single completion (no database access)
+    @staticmethod
+    def _apply_completion(habit, completion_date, continue_enabled, period):
+        """
+        Update a habit in memory with one completion: date range, streak, longest streak and status.
+
+        Args:
+            habit (dict): The habit to update, modified in place.
+            completion_date (datetime.datetime or str): The date when the habit was completed.
+            continue_enabled (bool): Whether the habit should continue or not.
+            period (datetime.timedelta): How far the date range moves when the habit continues.
+
+        Returns:
+            tuple: (changes, completion_entry) where 'changes' (dict) holds the habit fields that
+                   were modified and 'completion_entry' (dict) is the new history entry.
+
+        Note:
+            'completion_count' is incremented in memory but not returned in 'changes', it is
+            persisted with $inc.
+        """
+        changes = {}
+        completion_date = Utils.parse_datetime(completion_date)
+
+        # Logic for checking the date range and updating the streak (no-op parse for stored datetimes)
+        start_range, end_range = Utils.parse_datetime(habit.get('start_range')), Utils.parse_datetime(habit.get('end_range'))
+        completed_in_range = start_range <= completion_date <= end_range
+
+        # Logic to move both range dates by one period if continue_enabled is true
+        if continue_enabled:
+            changes['start_range'] = start_range + period
+            changes['end_range'] = end_range + period
+
+        # Update streak and longest_streak logic
+        if completed_in_range:
+            changes['streak'] = habit.get('streak', 0) + 1
+            changes['longest_streak'] = max(habit.get('longest_streak', 0), changes['streak'])
+            changes['status'] = 'in progress' if continue_enabled else 'completed'
+            current_status = 'completed' if continue_enabled else 'in progress'
+        else:
+            # Longest streak logic
+            changes['longest_streak'] = max(habit.get('longest_streak', 0), habit.get('streak', 0))
+            changes['streak'] = 0
+            changes['status'] = 'failed'
+            current_status = 'failed'
+
+        changes['completion_datetime'] = completion_date
+        habit.update(changes)
+
+        # History entry of the completion
+        completion_entry = {
+            'datetime': completion_date,
+            'status': current_status,
+            'streak': habit['streak'],
+            'longest_streak': habit['longest_streak']
+        }
+        habit['completion_count'] = habit.get('completion_count', 0) + 1
+
+        return changes, completion_entry
+    # catch-up logic of missed periods (no database access)
+    @staticmethod
+    def _apply_catch_up(habit, now, period):
+        """
+        Update a habit in memory so its date range contains 'now', counting the periods it missed.
+
+        Args:
+            habit (dict): The habit to update, modified in place.
+            now (datetime.datetime): The reference date.
+            period (datetime.timedelta): The length of a period of the habit.
+
+        Returns:
+            tuple: (changes, completion_entry) as in _apply_completion, or (None, None) if the habit
+                   is not behind or was completed without continuing.
+
+        Note:
+            The number of missed periods is computed with one integer division, the streak is reset
+            as for a failed completion.
+        """
+        end_range = Utils.parse_datetime(habit.get('end_range'))
+        if habit.get('status') == 'completed' or now <= end_range:
+            return None, None
+        start_range = Utils.parse_datetime(habit.get('start_range'))
+
+        # ceil((now - end_range) / period): the first window whose end is not before 'now'
+        missed = -((end_range - now) // period)
+        changes = {
+            'start_range': start_range + missed * period,
+            'end_range': end_range + missed * period,
+            'longest_streak': max(habit.get('longest_streak', 0), habit.get('streak', 0)),
+            'streak': 0,
+            'status': 'failed'
+        }
+        habit.update(changes)
+
+        # One compact history entry for all the missed periods
+        completion_entry = {
+            'datetime': now,
+            'status': 'failed',
+            'streak': 0,
+            'longest_streak': habit['longest_streak'],
+            'missed': missed,
+            'missed_since': start_range
+        }
+        habit['completion_count'] = habit.get('completion_count', 0) + 1
+
+        return changes, completion_entry
+    # document stored in the completions collection
+    @staticmethod
+    def _completion_document(user_id, habit_id, completion_entry):
+        """
+        Build the 'completions' collection document of a history entry.
+
+        Args:
+            user_id (str): The ID of the user.
+            habit_id (str): The ID of the user's habit.
+            completion_entry (dict): The history entry ('datetime', 'status', 'streak', 'longest_streak').
+
+        Returns:
+            dict: The document, keyed by 'user_id', 'habit_id' and 'datetime'.
+        """
+        return {'user_id': str(user_id), 'habit_id': habit_id, **completion_entry}
+    # completion rate time series
+    def completion_series(self, username, start=None, end=None, interval='day', type=None, category=None):
+        """
+        Read the completion rate of a user per day or per week, from the daily rollups.
 
         Args:
             username (str): The username of the user.
+            start (str, optional): The first day ('YYYY-MM-DD'), a year before 'end' by default.
+            end (str, optional): The last day, included ('YYYY-MM-DD'), today by default.
+            interval (str, optional): 'day' or 'week'.
+            type (str, optional): Only count habits of this type.
+            category (str, optional): Only count habits of this category.
 
         Returns:
-            dict: The habit with the longest streak or an error message.
+            dict: The result of CompletionRollups.series, or an error if the user does not exist.
         """
-        user = self.db_handler.find_document('users', {'username': username})
+        user = self.db_handler.find_document('users', {'username': username}, projection={'_id': 1})
         if not user:
             return {'success': False, 'error': 'User not found'}
+        return self.rollups.series(user['_id'], start, end, interval, type, category)
+    # get the longest streak habit
+    def longest_streak_habit(self, username, type):
+        """
+        Find the habit with the longest streak for a given user.
 
-        user_habits_raw = user.get('habits', [])
-        
-        # Apply type filter if type is defined
-        if type:
-            user_habits = [habit for habit in user_habits_raw if habit.get('type') == type]
-        else:
-            user_habits = user_habits_raw
-        
-        if not user_habits:
-            return {'success': False, 'error': 'No habits found for user'}
-
-        # LOGIC
+        Args:
+            username (str): The username of the user.
+            type (str, optional): Only consider habits of this type (e.g., 'daily', 'weekly').
 
-        # Use 'max' as a 'for each' to iterate over 'user_habits'
-        # For each habit, the 'lambda' function extracts 'longest_streak', using 0 as default if it's not present
-        # This approach (lambda) avoids the need for an extra method just to get 'longest_streak'
-        # 'max' then finds the habit with the highest 'longest_streak' value
+        Returns:
+            dict: The habit with the longest streak or an error message.
 
-        habit = max(user_habits, key=lambda h: h.get('longest_streak', 0))
-        return {'success': True, 'habit': habit}
+        Note:
+            The habit is read from the user's 'summary', see _summary_habit.
+        """
+        return self._summary_habit(username, type, 'best')
     # get the worst habit
     def strugglest_habit(self, username, type):
         """
@@ -434,30 +1089,226 @@ class HabitTracker:
 
         Args:
             username (str): The username of the user.
+            type (str, optional): Only consider habits of this type (e.g., 'daily', 'weekly').
 
         Returns:
             dict: The habit with the most recent failure or an error message.
+
+        Note:
+            The habit is read from the user's 'summary', see _summary_habit.
+        """
+        return self._summary_habit(username, type, 'worst')
+    # analytics summary of the user's habits (no database access)
+    @classmethod
+    def _summary(cls, habits):
+        """
+        Compute the 'summary' stored in the user document, written with every change of its habits.
+
+        Args:
+            habits (list): The user's habits.
+
+        Returns:
+            dict: 'best' and 'worst' (habit IDs keyed by type, 'all' for any type, see SUMMARY_RANKS),
+                  'status' (number of habits keyed by status) and 'completions' (total completion count).
+
+        Note:
+            Habits are ranked like _select_pipeline: missing values count as 0 and on ties the first
+            habit of the list wins. A type without habits has no key.
+        """
+        summary = {'status': {}, 'completions': 0}
+        for habit in habits:
+            status = habit.get('status', 'in progress')
+            summary['status'][status] = summary['status'].get(status, 0) + 1
+            summary['completions'] += habit.get('completion_count', 0)
+
+        for rank, (field, direction) in cls.SUMMARY_RANKS.items():
+            selected = {}
+            for habit in habits:
+                score = habit.get(field) or 0
+                for key in ('all', habit.get('type')):
+                    if key and (key not in selected or (score - selected[key][0]) * direction < 0):
+                        selected[key] = (score, habit['_id'])
+            summary[rank] = {key: habit_id for key, (score, habit_id) in selected.items()}
+        return summary
+    # projection of the summary entry of a rank and type (no database access)
+    @classmethod
+    def _summary_projection(cls, type, rank):
+        """
+        Build the projection reading one habit ID of the user's 'summary'.
+
+        Args:
+            type (str, optional): The habit type, None for any type.
+            rank (str): A key of SUMMARY_RANKS.
+
+        Returns:
+            dict: The projection, or None if the type can not be in the summary.
+        """
+        if type and type not in cls.PERIODS:
+            return None
+        return {f'summary.{rank}.{type or "all"}': 1}
+    # habit ID read from the summary projection (no database access)
+    @staticmethod
+    def _summary_habit_id(user, type, rank):
+        """
+        Decide the next step of _summary_habit from the user document read with _summary_projection.
+
+        Args:
+            user (dict): The projected user document, None if the user does not exist.
+            type (str, optional): The habit type, None for any type.
+            rank (str): A key of SUMMARY_RANKS.
+
+        Returns:
+            Tuple: (habit ID to read, final result); both are None when the user has no summary yet and the
+                   habit must be selected with _select_habit.
         """
-        user = self.db_handler.find_document('users', {'username': username})
         if not user:
-            return {'success': False, 'error': 'User not found'}
+            return None, {'success': False, 'error': 'User not found'}
+        if 'summary' not in user:
+            return None, None
+        habit_id = user['summary'].get(rank, {}).get(type or 'all')
+        if not habit_id:
+            return None, {'success': False, 'error': 'No habits found for user'}
+        return habit_id, None
+    # projection of a single habit of the user (no database access)
+    @staticmethod
+    def _habit_projection(habit_id):
+        """
+        Build the projection reading one habit of the user document, without the others.
 
-        user_habits_raw = user.get('habits', [])
-        
-        # Apply type filter if type is defined
-        if type:
-            user_habits = [habit for habit in user_habits_raw if habit.get('type') == type]
-        else:
-            user_habits = user_habits_raw
+        Args:
+            habit_id (str): The ID of the habit.
 
-        if not user_habits:
-            return {'success': False, 'error': 'No habits found for user'}
+        Returns:
+            dict: The $elemMatch projection.
+        """
+        return {'_id': 0, 'habits': {'$elemMatch': {'_id': habit_id}}}
+    # habit returned by the analytics (no database access)
+    @staticmethod
+    def _summary_result(selected):
+        """
+        Build the result of _summary_habit from the user document read with an $elemMatch projection.
 
-        # LOGIC
+        Args:
+            selected (dict): The document with the single matched habit in 'habits', None if the user does not exist.
+
+        Returns:
+            dict: A dictionary with 'success' (bool) and 'habit' (dict), or None if the habit was removed
+                  in between and must be selected with _select_habit.
+        """
+        if not selected or not selected.get('habits'):
+            return None
+        habit = selected['habits'][0]
+        habit.pop('completion_datetimes', None)
+        return {'success': True, 'habit': habit}
+    # select one habit of the user from its summary
+    def _summary_habit(self, username, type, rank):
+        """
+        Select the best or worst habit of the user with two projected reads of its document.
+
+        Args:
+            username (str): The username of the user.
+            type (str, optional): Only consider habits of this type.
+            rank (str): A key of SUMMARY_RANKS.
 
-        # Use 'min' as a 'for each' to iterate over 'user_habits'
-        # For each habit, the 'lambda' function extracts the 'streak' value, using 0 as default if it's not present
-        # This approach avoids the need for an extra method to get 'streak'
-        # 'min' then finds the habit with the lowest 'streak' value, which represents the worst habit
-        habit = min(user_habits, key=lambda h: h.get('streak', 0))
-        return {'success': True, 'habit': habit}
\ No newline at end of file
+        Returns:
+            dict: A dictionary with 'success' (bool), and 'habit' (dict) or 'error' (str).
+
+        Note:
+            The summary gives the habit ID, the second read returns that habit alone, so the cost does not
+            grow with the number of habits. Users without a summary yet (see Migrations.rebuild_summaries),
+            or whose habit was removed between both reads, fall back to the _select_habit aggregation.
+        """
+        reads, document = self._summary_reads(type, rank), None
+        try:
+            while True:
+                document = self.db_handler.find_document('users', {'username': username}, projection=reads.send(document))
+        except StopIteration as selected:
+            return selected.value or self._select_habit(username, type, *self.SUMMARY_RANKS[rank])
+    # reads of the summary selection, shared with AsyncHabitTracker (no database access)
+    @classmethod
+    def _summary_reads(cls, type, rank):
+        """
+        Walk through the reads of _summary_habit: each projection of the user document is yielded and the
+        document read with it is sent back.
+
+        Args:
+            type (str, optional): Only consider habits of this type.
+            rank (str): A key of SUMMARY_RANKS.
+
+        Returns:
+            dict: The result of the selection, or None to fall back to the _select_habit aggregation.
+        """
+        projection = cls._summary_projection(type, rank)
+        if not projection:
+            return None
+        user = yield projection
+        habit_id, result = cls._summary_habit_id(user, type, rank)
+        if habit_id:
+            result = cls._summary_result((yield cls._habit_projection(habit_id)))
+        return result
+    # select one habit of the user with an aggregation
+    def _select_habit(self, username, type, field, direction):
+        """
+        Select the user's habit with the highest or lowest value of a field.
+
+        Args:
+            username (str): The username of the user.
+            type (str, optional): Only consider habits of this type.
+            field (str): The habit field to rank by, missing values count as 0.
+            direction (int): -1 for the highest value, 1 for the lowest.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), and 'habit' (dict) or 'error' (str).
+
+        Note:
+            On ties the first habit of the list wins ('position' is the array index), like Python's max/min.
+        """
+        result = self.db_handler.aggregate('users', self._select_pipeline(username, type, field, direction))
+        return self._selected_habit(result)
+    # aggregation selecting one habit (no database access)
+    @staticmethod
+    def _select_pipeline(username, type, field, direction):
+        """
+        Build the aggregation used by _select_habit.
+
+        Args:
+            username (str): The username of the user.
+            type (str, optional): Only consider habits of this type.
+            field (str): The habit field to rank by, missing values count as 0.
+            direction (int): -1 for the highest value, 1 for the lowest.
+
+        Returns:
+            list: The aggregation stages, returning at most one document with the selected 'habit'.
+        """
+        habits = {'$ifNull': ['$habits', []]}
+        if type:
+            habits = {'$filter': {'input': habits, 'as': 'h', 'cond': {'$eq': ['$$h.type', type]}}}
+
+        return [
+            {'$match': {'username': username}},
+            {'$project': {'habit': habits}},
+            # One document per habit, a user without habits still yields one document (without 'habit')
+            {'$unwind': {'path': '$habit', 'includeArrayIndex': 'position', 'preserveNullAndEmptyArrays': True}},
+            {'$addFields': {'score': {'$ifNull': [f'$habit.{field}', 0]}}},
+            {'$sort': {'score': direction, 'position': 1}},
+            {'$limit': 1},
+            {'$project': {'_id': 0, 'habit': 1}},
+            {'$project': {'habit.completion_datetimes': 0}}
+        ]
+    # result of a habit selection (no database access)
+    @staticmethod
+    def _selected_habit(result):
+        """
+        Build the result of _select_habit from the aggregation output.
+
+        Args:
+            result (list): The documents returned by the _select_pipeline aggregation.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), and 'habit' (dict) or 'error' (str).
+        """
+        if not result:
+            return {'success': False, 'error': 'User not found'}
+        if not result[0].get('habit'):
+            return {'success': False, 'error': 'No habits found for user'}
+        return {'success': True, 'habit': result[0]['habit']}
@@ -0,0 +1,20 @@
+import datetime
+from flask.json.provider import DefaultJSONProvider
+from classes.utils import Utils
+
+class JSONProvider(DefaultJSONProvider):
+    # dates are stored as datetimes but sent to clients as 'YYYY-MM-DD HH:MM'
+    @staticmethod
+    def default(o):
+        """
+        Serialize the values the standard JSON encoder does not handle.
+
+        Args:
+            o: The value to serialize.
+
+        Returns:
+            The JSON compatible value, datetimes are formatted with Utils.format_datetime.
+        """
+        if isinstance(o, datetime.datetime):
+            return Utils.format_datetime(o)
+        return DefaultJSONProvider.default(o)
@@ -0,0 +1,320 @@
+from pymongo import ASCENDING, UpdateOne
+from classes.habit_tracker import HabitTracker
+from classes.completion_rollups import CompletionRollups
+from classes.utils import Utils
+
+class Migrations:
+    # habit fields stored as datetimes since they stopped being 'YYYY-MM-DD HH:MM' strings
+    HABIT_DATETIME_FIELDS = ['start_range', 'end_range', 'completion_datetime', 'creation_datetime']
+
+    def __init__(self, db_handler, batch_size=500):
+        """
+        Initialize the data migrations with a MongoDBHandler instance.
+
+        Args:
+            db_handler (MongoDBHandler): An instance of MongoDBHandler to interact with the database.
+            batch_size (int): Number of users processed per batch.
+
+        Note:
+            Progress is checkpointed in the 'system' collection after every batch, so an interrupted
+            migration resumes where it stopped.
+        """
+        self.db_handler = db_handler
+        self.batch_size = batch_size
+    # load the checkpoint of a migration
+    def _load_checkpoint(self, name):
+        """
+        Load the saved progress of a migration.
+
+        Args:
+            name (str): The name of the migration.
+
+        Returns:
+            dict: The checkpoint document, empty if the migration never ran.
+        """
+        state = self.db_handler.find_document('system', {'_id': f'migration:{name}'})
+        return state or {}
+    # save the checkpoint of a migration
+    def _save_checkpoint(self, name, values):
+        """
+        Save the progress of a migration.
+
+        Args:
+            name (str): The name of the migration.
+            values (dict): The checkpoint values to store.
+        """
+        self.db_handler.db['system'].update_one({'_id': f'migration:{name}'}, {'$set': values}, upsert=True)
+    # move embedded completion history to the completions collection
+    def migrate_completions(self, restart=False):
+        """
+        Move every 'habits.completion_datetimes' array into the 'completions' collection.
+
+        For each user, the embedded entries are inserted as 'completions' documents, then in one
+        update the habits get their 'completion_count' and lose the embedded array.
+
+        Args:
+            restart (bool): Ignore the saved checkpoint and scan all users again.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), 'users' (int) migrated in this run and 'completions' (int) moved.
+
+        Note:
+            Entries are tagged 'migrated', so a user interrupted between both writes is migrated
+            again from scratch without duplicating its history. Completions written by the
+            application in the meantime are kept, 'completion_count' is incremented, never overwritten.
+        """
+        users_collection = self.db_handler.db['users']
+        completions_collection = self.db_handler.db['completions']
+        self.db_handler.ensure_indexes()
+
+        checkpoint = {} if restart else self._load_checkpoint('completions')
+        last_user_id = checkpoint.get('last_user_id')
+        migrated_users = 0
+        migrated_completions = 0
+
+        while True:
+            query = {'habits.completion_datetimes': {'$exists': True}}
+            if last_user_id:
+                query['_id'] = {'$gt': last_user_id}
+            users = list(users_collection.find(query, {'habits._id': 1, 'habits.completion_datetimes': 1})
+                         .sort('_id', ASCENDING).limit(self.batch_size))
+            if not users:
+                break
+
+            for user in users:
+                user_id = str(user['_id'])
+                entries = []
+                counts = {}
+                for habit in user.get('habits', []):
+                    history = habit.get('completion_datetimes') or []
+                    counts[habit['_id']] = len(history)
+                    entries.extend({'user_id': user_id, 'habit_id': habit['_id'], **entry, 'datetime': self._to_datetime(entry.get('datetime')), 'migrated': True} for entry in history)
+
+                # Replace what an interrupted run may have inserted for this user
+                completions_collection.delete_many({'user_id': user_id, 'migrated': True})
+                if entries:
+                    completions_collection.insert_many(entries, ordered=False)
+
+                update = {'$unset': {'habits.$[].completion_datetimes': ''}}
+                array_filters = []
+                for index, (habit_id, count) in enumerate(counts.items()):
+                    if count:
+                        update.setdefault('$inc', {})[f'habits.$[h{index}].completion_count'] = count
+                        array_filters.append({f'h{index}._id': habit_id})
+                # The listings of the user change ('completion_count'), so does its version
+                update.setdefault('$inc', {})['version'] = 1
+                users_collection.update_one({'_id': user['_id']}, update, array_filters=array_filters or None)
+
+                migrated_users += 1
+                migrated_completions += len(entries)
+
+            last_user_id = users[-1]['_id']
+            self._save_checkpoint('completions', {'last_user_id': last_user_id, 'done': False})
+            print(f"INFO: Migrated {migrated_users} users, {migrated_completions} completions.")
+
+        self._save_checkpoint('completions', {'last_user_id': last_user_id, 'done': True})
+        return {'success': True, 'users': migrated_users, 'completions': migrated_completions}
+    # convert a legacy date string, leaving unparsable values untouched
+    @staticmethod
+    def _to_datetime(value):
+        """
+        Convert a legacy 'YYYY-MM-DD HH:MM' string into a datetime.
+
+        Args:
+            value: The stored value.
+
+        Returns:
+            datetime.datetime: The parsed date, or the value unchanged if it is not a valid date string.
+        """
+        try:
+            return Utils.parse_datetime(value)
+        except (ValueError, TypeError):
+            return value
+    # server side conversion of a string field into a date
+    @staticmethod
+    def _date_expression(field):
+        """
+        Build the aggregation expression converting a 'YYYY-MM-DD HH:MM' string field into a date.
+
+        Args:
+            field (str): The field path expression (e.g. '$datetime' or '$$habit.start_range').
+
+        Returns:
+            dict: The expression; values that are not strings, or not valid dates, are kept as they are.
+        """
+        return {'$cond': [
+            {'$eq': [{'$type': field}, 'string']},
+            {'$dateFromString': {'dateString': field, 'format': Utils.DATETIME_FORMAT, 'onError': field}},
+            field
+        ]}
+    # store date strings as BSON dates
+    def migrate_datetimes(self):
+        """
+        Convert the date strings of habits and completions into BSON dates.
+
+        The habit fields in HABIT_DATETIME_FIELDS and the 'datetime' of completions are converted on the
+        server with pipeline updates, one update_many per collection, without loading any document.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), 'users' (int) and 'completions' (int) modified.
+
+        Note:
+            Only documents still holding strings are matched, so the migration can be interrupted and run
+            again. Run 'migrate-completions' first, it converts the embedded history it moves.
+        """
+        self.db_handler.ensure_indexes()
+
+        string_fields = [{field: {'$type': 'string'}} for field in self.HABIT_DATETIME_FIELDS]
+        habit_fields = {field: self._date_expression(f'$$habit.{field}') for field in self.HABIT_DATETIME_FIELDS}
+        users_result = self.db_handler.db['users'].update_many(
+            {'habits': {'$elemMatch': {'$or': string_fields}}},
+            [{'$set': {
+                'habits': {'$map': {
+                    'input': '$habits',
+                    'as': 'habit',
+                    'in': {'$mergeObjects': ['$$habit', habit_fields]}
+                }},
+                'version': {'$add': [{'$ifNull': ['$version', 0]}, 1]}
+            }}]
+        )
+        print(f"INFO: Converted the habit dates of {users_result.modified_count} users.")
+
+        completions_result = self.db_handler.db['completions'].update_many(
+            {'datetime': {'$type': 'string'}},
+            [{'$set': {'datetime': self._date_expression('$datetime')}}]
+        )
+        print(f"INFO: Converted the dates of {completions_result.modified_count} completions.")
+
+        return {'success': True, 'users': users_result.modified_count, 'completions': completions_result.modified_count}
+    # recompute the analytics summary of every user
+    def rebuild_summaries(self):
+        """
+        Recompute the 'summary' of every user from its habits, see HabitTracker._summary.
+
+        Users are read in batches of 'batch_size' with only the ranked habit fields, and each batch
+        is written with one bulk_write.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), 'users' (int) rebuilt and 'skipped' (int).
+
+        Note:
+            Each summary is only written while the user is at the version it was read at; a user changed in
+            the meantime got a fresh summary from that change and is 'skipped'. The version is not incremented,
+            the summary selects the same habits as the aggregation it replaces.
+        """
+        users_collection = self.db_handler.db['users']
+        projection = {'version': 1, 'habits._id': 1, 'habits.type': 1, 'habits.status': 1, 'habits.completion_count': 1,
+                      **{f'habits.{field}': 1 for field, _ in HabitTracker.SUMMARY_RANKS.values()}}
+        last_user_id = None
+        rebuilt = 0
+        skipped = 0
+
+        while True:
+            query = {'_id': {'$gt': last_user_id}} if last_user_id else {}
+            users = list(users_collection.find(query, projection).sort('_id', ASCENDING).limit(self.batch_size))
+            if not users:
+                break
+
+            requests = [UpdateOne({'_id': user['_id'], **HabitTracker._version_condition(user)},
+                                  {'$set': {'summary': HabitTracker._summary(user.get('habits', []))}})
+                        for user in users]
+            result = users_collection.bulk_write(requests, ordered=False)
+            rebuilt += result.matched_count
+            skipped += len(requests) - result.matched_count
+
+            last_user_id = users[-1]['_id']
+            print(f"INFO: Rebuilt the summaries of {rebuilt} users.")
+
+        return {'success': True, 'users': rebuilt, 'skipped': skipped}
+    # build the daily rollups from the completion history
+    def backfill_rollups(self, restart=False):
+        """
+        Rebuild the 'daily_rollups' counters of every user from its 'completions' history.
+
+        Users are processed in batches of 'batch_size': the history of each user is streamed from a cursor and
+        counted (see CompletionRollups.increments), so only the counters of the batch are held in memory. The
+        previous counters of the batch are then deleted and the new ones are written with one bulk_write. The
+        'status_counts' of every habit (see CompletionRollups.habit_counts) are set from the same pass.
+
+        Args:
+            restart (bool): Ignore the saved checkpoint and scan all users again.
+
+        Returns:
+            dict: A dictionary with 'success' (bool), 'users' (int) processed in this run, 'completions' (int)
+                  counted, 'rollups' (int) written and 'skipped' (int) users whose 'status_counts' were not set.
+
+        Note:
+            Progress is checkpointed after every batch. A batch being rebuilt while its users complete habits
+            may miss those completions, run it before opening the time series or when the traffic is low. The
+            'status_counts' are only set while the user is at the version it was read at, run it again with
+            'restart' if users were 'skipped'.
+        """
+        users_collection = self.db_handler.db['users']
+        rollups_collection = self.db_handler.db[CompletionRollups.COLLECTION]
+        rollups = CompletionRollups(self.db_handler, HabitTracker.PERIODS)
+        self.db_handler.ensure_indexes()
+
+        checkpoint = {} if restart else self._load_checkpoint('rollups')
+        last_user_id = checkpoint.get('last_user_id')
+        processed_users = 0
+        counted_completions = 0
+        written_rollups = 0
+        skipped = 0
+
+        def counted(documents, status_counts):
+            nonlocal counted_completions
+            for document in documents:
+                counted_completions += 1
+                CompletionRollups.habit_counts([document], status_counts)
+                yield document
+
+        while True:
+            query = {'_id': {'$gt': last_user_id}} if last_user_id else {}
+            users = list(users_collection.find(query, {'version': 1, 'habits._id': 1, 'habits.type': 1, 'habits.category': 1})
+                         .sort('_id', ASCENDING).limit(self.batch_size))
+            if not users:
+                break
+
+            user_ids = [str(user['_id']) for user in users]
+            habits = {habit['_id']: habit for user in users for habit in user.get('habits', [])}
+            requests = []
+            user_requests = []
+            for user, user_id in zip(users, user_ids):
+                status_counts = {}
+                documents = self.db_handler.iterate_documents('completions', {'user_id': user_id}, projection=CompletionRollups.PROJECTION)
+                requests.extend(rollups.increment_requests(rollups.increments(habits, counted(documents, status_counts))))
+                if user.get('habits'):
+                    user_requests.append(self._status_counts_request(user, status_counts))
+
+            # Replace what a previous run counted for these users
+            rollups_collection.delete_many({'user_id': {'$in': user_ids}})
+            written_rollups += self.db_handler.increment_documents(CompletionRollups.COLLECTION, requests)
+            if user_requests:
+                skipped += len(user_requests) - users_collection.bulk_write(user_requests, ordered=False).matched_count
+            processed_users += len(users)
+
+            last_user_id = users[-1]['_id']
+            self._save_checkpoint('rollups', {'last_user_id': last_user_id, 'done': False})
+            print(f"INFO: Rolled up {processed_users} users, {counted_completions} completions.")
+
+        self._save_checkpoint('rollups', {'last_user_id': last_user_id, 'done': True})
+        return {'success': True, 'users': processed_users, 'completions': counted_completions, 'rollups': written_rollups, 'skipped': skipped}
+    # write of the status counters of the habits of a user (no database access)
+    @staticmethod
+    def _status_counts_request(user, status_counts):
+        """
+        Build the update setting the 'status_counts' of every habit of a user.
+
+        Args:
+            user (dict): The user, with its 'version' and the '_id' of its habits.
+            status_counts (dict): The counters keyed by habit ID, see CompletionRollups.habit_counts.
+
+        Returns:
+            pymongo.UpdateOne: The update, only applied while the user is at the version it was read at.
+        """
+        update = {'$set': {}, '$inc': {'version': 1}}
+        array_filters = []
+        for index, habit in enumerate(user['habits']):
+            update['$set'][f'habits.$[h{index}].status_counts'] = status_counts.get(habit['_id'], {})
+            array_filters.append({f'h{index}._id': habit['_id']})
+        return UpdateOne({'_id': user['_id'], **HabitTracker._version_condition(user)}, update, array_filters=array_filters)
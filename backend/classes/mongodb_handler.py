@@ -1,8 +1,35 @@
-from pymongo import MongoClient
+import os
+import time
+from pymongo import MongoClient, ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
 from bson import ObjectId
 from classes.utils import Utils
 
+class MissingIndexError(PyMongoError):
+    # A unique index could not be created, its collection is not used until it exists
+    pass
+
 class MongoDBHandler:
+    # Indexes created on first use of the database: (collection, keys, options)
+    INDEXES = [
+        ('users', [('username', ASCENDING)], {'unique': True}),
+        ('users', [('email', ASCENDING)], {'unique': True, 'partialFilterExpression': {'email': {'$type': 'string'}}}),
+        ('users', [('habits._id', ASCENDING)], {}),
+        ('users', [('simulated', ASCENDING)], {'sparse': True}),
+        ('habits', [('name', ASCENDING)], {}),
+        ('habits', [('type', ASCENDING)], {}),
+        ('completions', [('user_id', ASCENDING), ('habit_id', ASCENDING), ('datetime', ASCENDING)], {}),
+        ('daily_rollups', [('user_id', ASCENDING), ('day', ASCENDING)], {'unique': True}),
+        ('daily_rollups', [('day', ASCENDING)], {}),
+    ]
+    # code of the write error of a document whose unique key already exists
+    DUPLICATE_KEY_ERROR = 11000
+    # operations remembered by a document of increment_documents, to skip them when applied again
+    APPLIED_OPERATIONS = 20
+    # seconds before a failed index is created again from a collection access, doubled after each failure
+    INDEX_RETRY_DELAY = 5
+    INDEX_RETRY_MAX_DELAY = 300
+
     def __init__(self, uri, db_name):
         """
         Initialize MongoDB connection.
@@ -10,9 +37,142 @@ class MongoDBHandler:
         Args:
             uri (str): MongoDB URI.
             db_name (str): Name of the database.
+
+        Note:
+            A MongoClient is not fork-safe. The client belongs to the process that opened it; a forked
+            process (e.g. a pre-forked server worker) opens its own on first use, see 'client'.
+        """
+        self.uri = uri
+        self.db_name = db_name
+        self._client = MongoClient(uri)
+        self._pid = os.getpid()
+        self.indexes_ready = False
+        self.missing_unique_indexes = set()
+        self.pending_indexes = list(self.INDEXES)
+        self._index_retry_delay = 0
+        self._next_index_attempt = 0
+    # client of the current process
+    @property
+    def client(self):
+        """
+        The MongoClient of the current process, opened again after a fork().
+
+        Returns:
+            MongoClient: The pymongo client.
+
+        Note:
+            The client inherited from the parent is dropped without being closed, closing it would
+            act on sockets and monitor threads that belong to the parent.
+        """
+        if self._pid != os.getpid():
+            self._client = MongoClient(self.uri)
+            self._pid = os.getpid()
+        return self._client
+    # database of the current process
+    @property
+    def db(self):
+        """
+        The database, through the client of the current process.
+
+        Returns:
+            Database: The pymongo database.
+        """
+        return self.client[self.db_name]
+    # close the client of the current process
+    def close(self):
+        """
+        Close the connections of this process, e.g. when a server worker exits.
+
+        Note:
+            The handler stays usable, the next access opens a new client.
+        """
+        if self._pid == os.getpid():
+            self._client.close()
+        self._pid = None
+    # create the declared indexes (idempotent)
+    def ensure_indexes(self):
+        """
+        Create the indexes declared in INDEXES that do not exist yet, once per handler.
+
+        Returns:
+            bool: True if every index exists, False if one could not be created.
+
+        Raises:
+            PyMongoError: If the database can not be reached; nothing is marked as ready, so the next
+                          access tries again.
+
+        Note:
+            Creating an index that already exists is a no-op in MongoDB, so this is safe on every start.
+            An index rejected by the server (e.g. duplicated usernames in old data for a unique index) is
+            reported, the remaining indexes are still created and only the failed ones stay in 'pending_indexes'.
+            A collection access tries them again after INDEX_RETRY_DELAY seconds, doubled after each failure up to
+            INDEX_RETRY_MAX_DELAY. The collections of a missing unique index are listed in 'missing_unique_indexes'.
+        """
+        if self.indexes_ready:
+            return True
+
+        failed = []
+        for index in self.pending_indexes:
+            collection_name, keys, options = index
+            try:
+                self.db[collection_name].create_index(keys, **options)
+            except OperationFailure as e:
+                print(f"ERROR: Could not create index {keys} on '{collection_name}': {e}")
+                failed.append(index)
+        self.pending_indexes = failed
+        self.missing_unique_indexes = self._unique_collections(failed)
+        self.indexes_ready = not failed
+        self._index_retry_delay = self._index_backoff(self._index_retry_delay) if failed else 0
+        self._next_index_attempt = time.monotonic() + self._index_retry_delay
+        return self.indexes_ready
+    # collections of unique indexes (no database access)
+    @staticmethod
+    def _unique_collections(indexes):
+        """
+        List the collections of the unique indexes among INDEXES entries.
+
+        Args:
+            indexes (list): (collection, keys, options) entries of INDEXES.
+
+        Returns:
+            set: The collection names.
+        """
+        return {collection_name for collection_name, _, options in indexes if options.get('unique')}
+    # delay before failed indexes are created again (no database access)
+    @classmethod
+    def _index_backoff(cls, delay):
+        """
+        Compute the delay before the next attempt to create failed indexes.
+
+        Args:
+            delay (int): The delay after the previous failure, 0 after the first one.
+
+        Returns:
+            int: INDEX_RETRY_DELAY, then twice the previous delay up to INDEX_RETRY_MAX_DELAY.
+        """
+        return min(delay * 2, cls.INDEX_RETRY_MAX_DELAY) if delay else cls.INDEX_RETRY_DELAY
+    # collection access, provisions the indexes on first use
+    def _collection(self, collection_name):
+        """
+        Return a collection, creating the declared indexes on the first access and the failed ones once their
+        retry delay passed (see ensure_indexes).
+
+        Args:
+            collection_name (str): The name of the collection.
+
+        Returns:
+            Collection: The pymongo collection.
+
+        Raises:
+            MissingIndexError: If a unique index of the collection does not exist, e.g. usernames and emails
+                               are only kept unique by their indexes, so users are not read or written without them.
         """
-        self.client = MongoClient(uri)
-        self.db = self.client[db_name]
+        if not self.indexes_ready:
+            if time.monotonic() >= self._next_index_attempt:
+                self.ensure_indexes()
+            if collection_name in self.missing_unique_indexes:
+                raise MissingIndexError(f"A unique index of '{collection_name}' is missing, see the errors of ensure_indexes.")
+        return self.db[collection_name]
     # add document (generic)
     def add_document(self, collection_name, document):
         """
@@ -24,10 +184,130 @@ class MongoDBHandler:
 
         Returns:
             dict: The added document with serialized '_id'.
+
+        Note:
+            The returned document is built from the insert result, it is not read back from the database.
+        """
+        collection = self._collection(collection_name)
+        result = collection.insert_one(document)
+        return Utils.serialize_document({**document, '_id': result.inserted_id})
+    # insert document without returning it (generic)
+    def insert_document(self, collection_name, document):
+        """
+        Insert a document into a specified collection, in a single round trip.
+
+        Args:
+            collection_name (str): The name of the collection.
+            document (dict): The document to insert.
+
+        Returns:
+            str: The ID of the inserted document.
         """
-        collection = self.db[collection_name]
+        collection = self._collection(collection_name)
         result = collection.insert_one(document)
-        return Utils.serialize_document(self.find_document(collection_name, {'_id': result.inserted_id}))
+        return str(result.inserted_id)
+    # insert many documents (generic)
+    def insert_documents(self, collection_name, documents, ignore_duplicates=False):
+        """
+        Insert several documents into a specified collection, in a single round trip.
+
+        Args:
+            collection_name (str): The name of the collection.
+            documents (list): The documents to insert.
+            ignore_duplicates (bool): Skip the documents whose '_id' already exists instead of failing, so inserting
+                                      the same documents again is harmless.
+
+        Returns:
+            list: The IDs (str) of the inserted documents, in order.
+        """
+        if not documents:
+            return []
+        collection = self._collection(collection_name)
+        try:
+            result = collection.insert_many(documents, ordered=not ignore_duplicates)
+        except BulkWriteError as e:
+            if not ignore_duplicates or not self._duplicates_only(e):
+                raise
+            return self._inserted_ids(documents, e)
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+    # write errors of documents that already exist (no database access)
+    @classmethod
+    def _duplicates_only(cls, error):
+        """
+        Tell whether an unordered bulk write only failed on documents that already exist.
+
+        Args:
+            error (BulkWriteError): The error of the bulk write.
+
+        Returns:
+            bool: True if every write error is a duplicate key error.
+        """
+        details = error.details or {}
+        return not details.get('writeConcernErrors') and all(
+            write_error.get('code') == cls.DUPLICATE_KEY_ERROR for write_error in details.get('writeErrors', []))
+    # IDs of the documents an unordered insert did write (no database access)
+    @staticmethod
+    def _inserted_ids(documents, error):
+        """
+        Return the IDs of the documents inserted by an unordered insert_many that failed on some of them.
+
+        Args:
+            documents (list): The documents of the insert, in order.
+            error (BulkWriteError): The error of the insert.
+
+        Returns:
+            list: The IDs (str) of the documents that were not rejected, in order.
+        """
+        rejected = {write_error['index'] for write_error in error.details.get('writeErrors', [])}
+        return [str(document['_id']) for index, document in enumerate(documents) if index not in rejected]
+    # increment counters of several documents, creating the missing ones (generic)
+    def increment_documents(self, collection_name, increments, operation=None):
+        """
+        Apply $inc upserts to several documents in a single round trip.
+
+        Args:
+            collection_name (str): The name of the collection.
+            increments (list): (query, counters) pairs; a document matching no query is created from the
+                               equality fields of its query, with the counters as initial values.
+            operation (str, optional): ID of the write the counters belong to, kept in the 'operations' of the
+                                       documents; a document that already has it is left unchanged, so the
+                                       same write can be applied again.
+
+        Returns:
+            int: The number of documents updated or created.
+
+        Note:
+            With an operation, the queries must match at most one document through a unique index: the upsert
+            of a document that already applied it then fails as a duplicate, and is skipped.
+        """
+        if not increments:
+            return 0
+        collection = self._collection(collection_name)
+        try:
+            result = collection.bulk_write(self._increment_updates(increments, operation), ordered=False)
+        except BulkWriteError as e:
+            if not operation or not self._duplicates_only(e):
+                raise
+            return e.details.get('nMatched', 0) + e.details.get('nUpserted', 0)
+        return result.matched_count + result.upserted_count
+    # $inc upserts of increment_documents (no database access)
+    @classmethod
+    def _increment_updates(cls, increments, operation=None):
+        """
+        Build the bulk write requests of increment_documents.
+
+        Args:
+            increments (list): (query, counters) pairs.
+            operation (str, optional): ID of the write the counters belong to.
+
+        Returns:
+            list: One UpdateOne upsert per pair.
+        """
+        if not operation:
+            return [UpdateOne(query, {'$inc': counters}, upsert=True) for query, counters in increments]
+        applied = {'$push': {'operations': {'$each': [operation], '$slice': -cls.APPLIED_OPERATIONS}}}
+        return [UpdateOne({**query, 'operations': {'$ne': operation}}, {'$inc': counters, **applied}, upsert=True)
+                for query, counters in increments]
     # delete document (generic)
     def delete_document(self, collection_name, document_id):
         """
@@ -40,23 +320,40 @@ class MongoDBHandler:
         Returns:
             bool: True if deletion was successful, False otherwise.
         """
-        collection = self.db[collection_name]
+        collection = self._collection(collection_name)
         result = collection.delete_one({"_id": ObjectId(document_id)})
         return result.deleted_count > 0
+    # delete documents matching a query (generic)
+    def delete_documents(self, collection_name, query):
+        """
+        Delete all documents matching a query from a specified collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            query (dict): The query of the documents to delete.
+
+        Returns:
+            int: The number of deleted documents.
+        """
+        collection = self._collection(collection_name)
+        result = collection.delete_many(query)
+        return result.deleted_count
     # finds document (generic)
-    def find_document(self, collection_name, query):
+    def find_document(self, collection_name, query, projection=None, sort=None):
         """
         Find a document in a specified collection.
 
         Args:
             collection_name (str): The name of the collection.
             query (dict): The query to find the document.
+            projection (dict, optional): The fields to return (e.g. {'password': 0}), all fields by default.
+            sort (list, optional): (field, direction) pairs deciding which document is returned first.
 
         Returns:
             dict: The found document, or None if not found.
         """
-        collection = self.db[collection_name]
-        document = collection.find_one(query)
+        collection = self._collection(collection_name)
+        document = collection.find_one(query, projection=projection, sort=sort)
         return Utils.serialize_document(document) if document else None
     # updates document (generic)
     def update_document(self, collection_name, document_id, update_values):
@@ -71,20 +368,116 @@ class MongoDBHandler:
         Returns:
             dict: The updated document.
         """
-        collection = self.db[collection_name]
+        collection = self._collection(collection_name)
         collection.update_one({'_id': ObjectId(document_id)}, {'$set': update_values})
         return Utils.serialize_document(self.find_document(collection_name, {'_id': ObjectId(document_id)}))
+    # modify document with update operators (generic)
+    def modify_document(self, collection_name, document_id, update, conditions=None, array_filters=None):
+        """
+        Apply update operators ($set, $push, $pull, ...) to a document, without reading it back.
+
+        Args:
+            collection_name (str): The name of the collection.
+            document_id (str): The ID of the document to update.
+            update (dict): The update operators to apply.
+            conditions (dict, optional): Extra conditions the document must match to be updated.
+            array_filters (list, optional): Filters for the '$[<identifier>]' positional operators.
+
+        Returns:
+            bool: True if a document matched (and was updated), False otherwise.
+        """
+        collection = self._collection(collection_name)
+        query = {'_id': ObjectId(document_id), **(conditions or {})}
+        result = collection.update_one(query, update, array_filters=array_filters)
+        return result.matched_count > 0
+    # modify document and return its post-image (generic)
+    def find_and_modify_document(self, collection_name, query, update, projection=None, array_filters=None, upsert=False):
+        """
+        Apply update operators to the first document matching a query and return it as updated, in a single round trip.
+
+        Args:
+            collection_name (str): The name of the collection.
+            query (dict): The query to find the document.
+            update (dict): The update operators to apply.
+            projection (dict, optional): The fields to return, e.g. {'version': 1}.
+            array_filters (list, optional): Filters for the '$[<identifier>]' positional operators.
+            upsert (bool): Insert the document if no document matches.
+
+        Returns:
+            dict: The updated document with serialized '_id', or None if no document matched.
+        """
+        collection = self._collection(collection_name)
+        document = collection.find_one_and_update(query, update, projection=projection, array_filters=array_filters,
+                                                  upsert=upsert, return_document=ReturnDocument.AFTER)
+        return Utils.serialize_document(document) if document else None
     # list documents (generic)
-    def list_documents(self, collection_name, query=None):
+    def list_documents(self, collection_name, query=None, projection=None, sort=None):
         """
         List all documents in a specified collection.
 
         Args:
             collection_name (str): The name of the collection.
+            query (dict, optional): The query to filter the documents.
+            projection (dict, optional): The fields to return, all fields by default.
+            sort (list, optional): (field, direction) pairs to order the documents.
 
         Returns:
             list: A list of all documents in the collection.
         """
-        collection = self.db[collection_name]
-        documents = collection.find(query or {})
-        return [Utils.serialize_document(doc) for doc in documents]
\ No newline at end of file
+        collection = self._collection(collection_name)
+        documents = collection.find(query or {}, projection=projection, sort=sort)
+        return [Utils.serialize_document(doc) for doc in documents]
+    # iterate documents (generic)
+    def iterate_documents(self, collection_name, query=None, projection=None, sort=None, limit=0, batch_size=500):
+        """
+        Iterate over the documents of a specified collection without loading them all in memory.
+
+        Args:
+            collection_name (str): The name of the collection.
+            query (dict, optional): The query to filter the documents.
+            projection (dict, optional): The fields to return, all fields by default.
+            sort (list, optional): (field, direction) pairs to order the documents.
+            limit (int): Maximum number of documents, 0 for no limit.
+            batch_size (int): Number of documents fetched from the server per round trip.
+
+        Yields:
+            dict: The documents with serialized '_id', one at a time, as they come off the cursor.
+        """
+        collection = self._collection(collection_name)
+        with collection.find(query or {}, projection=projection, sort=sort, limit=limit, batch_size=batch_size) as cursor:
+            for document in cursor:
+                yield Utils.serialize_document(document)
+    # aggregation pipeline (generic)
+    def aggregate(self, collection_name, pipeline, **options):
+        """
+        Run an aggregation pipeline on a specified collection.
+
+        Args:
+            collection_name (str): The name of the collection.
+            pipeline (list): The aggregation stages.
+            **options: Extra aggregate options (e.g. allowDiskUse=True).
+
+        Returns:
+            list: The resulting documents with serialized '_id'.
+        """
+        collection = self._collection(collection_name)
+        documents = collection.aggregate(pipeline, **options)
+        return [Utils.serialize_document(doc) for doc in documents]
+    # iterate aggregation results (generic)
+    def iterate_aggregate(self, collection_name, pipeline, batch_size=500, **options):
+        """
+        Run an aggregation pipeline and iterate over the results without loading them all in memory.
+
+        Args:
+            collection_name (str): The name of the collection.
+            pipeline (list): The aggregation stages.
+            batch_size (int): Number of documents fetched from the server per round trip.
+            **options: Extra aggregate options (e.g. allowDiskUse=True).
+
+        Yields:
+            dict: The resulting documents with serialized '_id', one at a time.
+        """
+        collection = self._collection(collection_name)
+        with collection.aggregate(pipeline, batchSize=batch_size, **options) as cursor:
+            for document in cursor:
+                yield Utils.serialize_document(document)
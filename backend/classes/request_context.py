@@ -0,0 +1,105 @@
+from classes.user import User
+from classes.utils import Utils
+
+class RequestContext:
+    # fields of the user read for an ETag without loading its habits
+    ETAG_PROJECTION = {'version': 1, 'pending_writes._id': 1}
+
+    def __init__(self, request, db_handler, token_manager=None):
+        """
+        Initialize the per-request context.
+
+        The request body and the Basic Auth header are parsed once here, so a route and the
+        methods it calls share the same data instead of normalizing the request again.
+
+        Args:
+            request (Request): The Flask request object.
+            db_handler (MongoDBHandler): The database handler for interacting with the database.
+            token_manager (TokenManager, optional): Verifier for signed session tokens.
+        """
+        self.request = request
+        self.db_handler = db_handler
+        self.token_manager = token_manager
+        self.data = Utils.normalize_auth_credentials(request)
+        self.username = None
+        self._auth_result = None
+        self._user = None
+    # authenticate the request once
+    def authenticate(self):
+        """
+        Authenticate the request, using the session token first and Basic Auth as a fallback.
+
+        Returns:
+            Tuple: (username, error message)
+
+        Note:
+            The result is cached, calling it again does not verify the credentials again.
+            With Basic Auth the user document loaded to check the password is kept in the context.
+        """
+        if self._auth_result:
+            return self._auth_result
+
+        token = Utils.get_bearer_token(self.request) if self.token_manager else None
+        if token:
+            self.username = self.token_manager.verify_token(token)
+            self._auth_result = (self.username, None) if self.username else (None, 'Invalid or expired token')
+            return self._auth_result
+
+        username = self.data.get('username')
+        password = self.data.get('password')
+        if not username or not password:
+            self._auth_result = (None, 'Username and password are required')
+            return self._auth_result
+
+        user = User(username=username, password=password).authenticate(self.db_handler)
+        if not user:
+            self._auth_result = (None, 'Invalid credentials')
+            return self._auth_result
+
+        self.username = username
+        self._user = user
+        self._auth_result = (username, None)
+        return self._auth_result
+    # authenticated user document (loaded at most once)
+    @property
+    def user(self):
+        """
+        The document of the authenticated user.
+
+        Returns:
+            dict: The user document, or None if the request is not authenticated or the user does not exist.
+
+        Note:
+            Token authenticated requests load the document lazily on first access, only once.
+        """
+        if self._user is None and self.username:
+            self._user = self.db_handler.find_document('users', {'username': self.username})
+        return self._user
+    # ETag of the authenticated user's data, read from the version only when the client can be answered 304
+    def etag(self, load_user=True):
+        """
+        Build the strong ETag of a response computed from the authenticated user's habits and history.
+
+        Args:
+            load_user (bool): The response is built from the user document, so it is loaded now when
+                              the client did not send If-None-Match, instead of reading the version alone.
+
+        Returns:
+            str: The ETag value, or None if the request is not authenticated or the user does not exist.
+
+        Note:
+            When the user document is not loaded yet and the client sent If-None-Match (or the response does
+            not need the document), only its '_id' and 'version' are read, so an unchanged user is answered
+            304 without loading its habits. The version is moved before the history entries of a write are
+            inserted (see HabitTracker._apply_pending_writes), so the ETag also changes once they are applied.
+        """
+        if not self.username:
+            return None
+        if self._user is None and (self.request.if_none_match or not load_user):
+            state = self.db_handler.find_document('users', {'username': self.username}, projection=self.ETAG_PROJECTION)
+        else:
+            state = self.user
+        if not state:
+            return None
+        params = {key: value for key, value in self.data.items() if key not in ('username', 'password')}
+        return Utils.user_etag(state['_id'], state.get('version', 0), self.request.path, params, pending=bool(state.get('pending_writes')))
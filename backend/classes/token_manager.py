@@ -0,0 +1,49 @@
+import hashlib
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+class TokenManager:
+    def __init__(self, secret_key, expires_in=3600, salt='healthhub-session'):
+        """
+        Initialize the session token manager.
+
+        Args:
+            secret_key (str): Secret used to sign the tokens (HMAC-SHA256).
+            expires_in (int): Lifetime of an issued token in seconds.
+            salt (str): Namespace of the signer, tokens signed with another salt are rejected.
+        """
+        self.expires_in = int(expires_in)
+        self.serializer = URLSafeTimedSerializer(secret_key, salt=salt, signer_kwargs={'digest_method': hashlib.sha256})
+    # issue a signed token
+    def issue_token(self, username, role='user'):
+        """
+        Issue a signed bearer token for an already authenticated account.
+
+        Args:
+            username (str): The username the token is issued for.
+            role (str): The role of the account ('user' or 'admin').
+
+        Returns:
+            dict: A dictionary containing the 'token' (str) and 'expires_in' (int, seconds).
+        """
+        token = self.serializer.dumps({'username': username, 'role': role})
+        return {'token': token, 'expires_in': self.expires_in}
+    # verify a signed token
+    def verify_token(self, token, role='user'):
+        """
+        Verify a bearer token without touching the database.
+
+        Args:
+            token (str): The token sent by the client.
+            role (str): The role the token must have been issued for.
+
+        Returns:
+            str: The username stored in the token, or None if the token is invalid, expired or has another role.
+        """
+        try:
+            payload = self.serializer.loads(token, max_age=self.expires_in)
+        except (SignatureExpired, BadSignature):
+            return None
+
+        if not isinstance(payload, dict) or payload.get('role') != role:
+            return None
+        return payload.get('username')
@@ -1,8 +1,14 @@
 from werkzeug.security import check_password_hash, generate_password_hash
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+from bson.errors import InvalidId
 from classes.mongodb_handler import MongoDBHandler
 from classes.utils import Utils
 
 class User:
+    # Fields returned when listing users
+    IDENTITY_FIELDS = {'username': 1, 'email': 1, 'name': 1}
+
     def __init__(self, username=None, password=None, email=None, name=None, _id=None):
         """
         Initialize a new user object.
@@ -34,44 +40,26 @@ class User:
                 - 'error' (str, optional): An error message if registration fails.
 
         Note:
-            The method checks for missing fields, existing username or email, and then registers the user.
+            The method checks for missing fields and then registers the user with a single insert.
+            Existing usernames or emails are rejected by the unique indexes of the 'users' collection,
+            so two concurrent registrations cannot both succeed. While one of these indexes is missing the
+            handler refuses the insert (MissingIndexError) and the registration fails instead of adding a duplicate.
             It returns a user data object on successful registration or an error message on failure.
         """
 
         # Check for missing fields directly in request data
         if not all([self.username, self.email, self.name, self.password]):
             return {'success': False, 'error': 'All fields (username, email, name, password) are required'}
-        
-        # Check if username already exists
-        if db_handler.find_document('users', {'username': self.username}):
-            return {'success': False, 'error': 'Username already exists'}
-        
-        # Check if email already exists
-        if db_handler.find_document('users', {'email': self.email}):
-            return {'success': False, 'error': 'Email already exists'}
 
         # Hash the password for security
         hashed_password = generate_password_hash(self.password, method='pbkdf2:sha256')
 
-        # Prepare User object
-        user_data = {
-            'username': self.username,
-            'email': self.email,
-            'name': self.name,
-            'password': hashed_password
-        }
-
         # Add the new user to the database
         try:
-            result = db_handler.add_document('users', user_data)
-            return {
-                'success': True,
-                'data': {
-                    '_id': result.get('_id'),
-                    'name': result.get('name'),
-                    'username': result.get('username')
-                }
-            }
+            user_id = db_handler.insert_document('users', self._user_document(hashed_password))
+            return self._registration_result(user_id)
+        except DuplicateKeyError as e:
+            return self._duplicate_key_error(e)
         except Exception as e:
             return {'success': False, 'error': f'An error occurred during registration: {str(e)}'}
     # log-in User
@@ -93,8 +81,95 @@ class User:
             It returns user data on successful login or an error message on failure.
         """
         
+        return self._login_result(self.authenticate(db_handler))
+    # check credentials and return the stored user
+    def authenticate(self, db_handler):
+        """
+        Check the user's credentials against the database.
+
+        Args:
+            db_handler (MongoDBHandler): The database handler for interacting with the database.
+
+        Returns:
+            dict: The full user document if the credentials are valid, None otherwise.
+
+        Note:
+            The returned document can be reused by the caller (e.g. RequestContext), so a request
+            does not need to load the same user again.
+        """
+        if not self.username or not self.password:
+            return None
+
         user_data = db_handler.find_document('users', {'username': self.username})
         if not user_data or not check_password_hash(user_data['password'], self.password):
+            return None
+        return user_data
+    # document stored in the users collection
+    def _user_document(self, hashed_password):
+        """
+        Build the document of a new user.
+
+        Args:
+            hashed_password (str): The PBKDF2 hash of the password.
+
+        Returns:
+            dict: The user document.
+        """
+        return {
+            'username': self.username,
+            'email': self.email,
+            'name': self.name,
+            'password': hashed_password
+        }
+    # result of a successful registration
+    def _registration_result(self, user_id):
+        """
+        Build the result returned by register.
+
+        Args:
+            user_id (str): The ID of the inserted user.
+
+        Returns:
+            dict: The result with the registered user data.
+        """
+        return {
+            'success': True,
+            'data': {
+                '_id': user_id,
+                'name': self.name,
+                'username': self.username
+            }
+        }
+    # error of a registration rejected by a unique index
+    @staticmethod
+    def _duplicate_key_error(e):
+        """
+        Build the registration error of a duplicate key.
+
+        Args:
+            e (DuplicateKeyError): The error raised by the insert.
+
+        Returns:
+            dict: The result telling whether the email or the username already exists.
+        """
+        # The violated unique index tells which field already exists
+        key_pattern = (e.details or {}).get('keyPattern') or {}
+        if 'email' in key_pattern or 'index: email' in str(e):
+            return {'success': False, 'error': 'Email already exists'}
+        return {'success': False, 'error': 'Username already exists'}
+    # result of a login
+    @staticmethod
+    def _login_result(user_data):
+        """
+        Build the result returned by login.
+
+        Args:
+            user_data (dict): The authenticated user document, None if the credentials are invalid.
+
+        Returns:
+            dict: The result with the logged-in user's data, or the error.
+        """
+        if not user_data:
             return {'success': False, 'error': 'Invalid credentials'}
 
         return {
@@ -128,6 +203,9 @@ class User:
         try:
             deletion_result = db_handler.delete_document('users', user_id)
             if deletion_result:
+                # Remove the completion history and daily rollups of the user as well
+                db_handler.delete_documents('completions', {'user_id': str(user_id)})
+                db_handler.delete_documents('daily_rollups', {'user_id': str(user_id)})
                 return {'success': True, 'message': 'User successfully deleted'}
             else:
                 return {'success': False, 'error': 'User not found'}
@@ -135,12 +213,13 @@ class User:
             return {'success': False, 'error': f'An error occurred: {str(e)}'}
     # list all users
     @staticmethod
-    def list_all(db_handler):
+    def list_all(db_handler, with_counts=False):
         """
         List all users in the database.
 
         Args:
             db_handler (MongoDBHandler): The database handler for interacting with the database.
+            with_counts (bool): Also return 'habit_count' and 'completion_count' for every user.
 
         Returns:
             dict: A dictionary containing the following keys:
@@ -149,11 +228,86 @@ class User:
                 - 'error' (str, optional): An error message if the operation fails.
 
         Note:
-            The method retrieves a list of all users from the database.
-            It returns the list of users on successful retrieval or an error message if there's an issue.
+            Only the identity fields ('_id', 'username', 'email', 'name') are returned: no password hash,
+            no habits. The counts are computed by MongoDB, so the payload does not depend on the user history.
         """
         try:
-            users = db_handler.list_documents('users')
+            if with_counts:
+                users = db_handler.aggregate('users', User._list_pipeline(sort={'username': 1}, with_counts=True))
+            else:
+                users = db_handler.list_documents('users', projection=User.IDENTITY_FIELDS, sort=[('username', 1)])
             return {'success': True, 'users': users}
         except Exception as e:
-            return {'success': False, 'error': f'An error occurred: {str(e)}'}
\ No newline at end of file
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+    # aggregation used to list users
+    @staticmethod
+    def _list_pipeline(query=None, sort=None, limit=None, with_counts=False):
+        """
+        Build the aggregation pipeline used to list users.
+
+        Args:
+            query (dict, optional): The query to filter the users.
+            sort (dict, optional): The sort order, by '_id' by default.
+            limit (int, optional): Maximum number of users.
+            with_counts (bool): Add 'habit_count' and 'completion_count', computed by MongoDB.
+
+        Returns:
+            list: The aggregation stages, ending with the projection of the identity fields.
+        """
+        pipeline = [{'$match': query or {}}, {'$sort': sort or {'_id': 1}}]
+        if limit:
+            pipeline.append({'$limit': limit})
+
+        projection = dict(User.IDENTITY_FIELDS)
+        if with_counts:
+            projection['habit_count'] = {'$size': {'$ifNull': ['$habits', []]}}
+            projection['completion_count'] = {'$sum': '$habits.completion_count'}
+        pipeline.append({'$project': projection})
+        return pipeline
+    # list a page of users (keyset pagination)
+    @staticmethod
+    def list_page(db_handler, after=None, limit=100, with_counts=False):
+        """
+        List one page of users, ordered by '_id'.
+
+        Args:
+            db_handler (MongoDBHandler): The database handler for interacting with the database.
+            after (str, optional): The '_id' of the last user of the previous page, None for the first page.
+            limit (int): Maximum number of users in the page.
+            with_counts (bool): Also return 'habit_count' and 'completion_count' for every user.
+
+        Returns:
+            dict: A dictionary containing the following keys:
+                - 'success' (bool): Indicates whether the retrieval of users was successful.
+                - 'users' (list, optional): The users of the page.
+                - 'next_after' (str, optional): The value of 'after' for the next page, None on the last page.
+                - 'error' (str, optional): An error message if the operation fails.
+
+        Note:
+            The page starts right after 'after' on the '_id' index, so every page costs the same
+            no matter how deep it is, unlike skip/offset pagination.
+        """
+        try:
+            query = {'_id': {'$gt': ObjectId(after)}} if after else {}
+            users = db_handler.aggregate('users', User._list_pipeline(query, limit=limit, with_counts=with_counts))
+            next_after = users[-1]['_id'] if len(users) == limit else None
+            return {'success': True, 'users': users, 'next_after': next_after}
+        except (InvalidId, TypeError):
+            return {'success': False, 'error': 'Invalid value for after'}
+        except Exception as e:
+            return {'success': False, 'error': f'An error occurred: {str(e)}'}
+    # iterate over all users
+    @staticmethod
+    def iterate_all(db_handler, with_counts=False, batch_size=500):
+        """
+        Iterate over all users, ordered by '_id', without loading them all in memory.
+
+        Args:
+            db_handler (MongoDBHandler): The database handler for interacting with the database.
+            with_counts (bool): Also return 'habit_count' and 'completion_count' for every user.
+            batch_size (int): Number of users fetched from the database per round trip.
+
+        Returns:
+            generator: The users (identity fields only), one at a time.
+        """
+        return db_handler.iterate_aggregate('users', User._list_pipeline(with_counts=with_counts), batch_size=batch_size)
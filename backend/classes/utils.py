@@ -1,6 +1,14 @@
+import asyncio
 import base64
+import datetime
+import hashlib
+import json
+import math
 
 class Utils:
+    # format of the dates exchanged with API clients
+    DATETIME_FORMAT = '%Y-%m-%d %H:%M'
+    DATE_FORMAT = '%Y-%m-%d'
 
     # used for valid string in API responses
     @staticmethod
@@ -17,11 +25,84 @@ class Utils:
         if '_id' in doc:
             doc['_id'] = str(doc['_id'])
         return doc
+    # parse an API date ('YYYY-MM-DD HH:MM') into a datetime
+    @staticmethod
+    def parse_datetime(value):
+        """
+        Parse a date sent by a client, stored dates are datetimes and are returned unchanged.
+
+        Args:
+            value (str or datetime.datetime): The date in 'YYYY-MM-DD HH:MM' format, or an already parsed date.
+
+        Returns:
+            datetime.datetime: The parsed date.
+
+        Raises:
+            ValueError: If the string is not a valid date in the expected format.
+            TypeError: If the value is neither a string nor a datetime (e.g. None).
+
+        Note:
+            The canonical zero-padded form is sliced directly, other spellings accepted by
+            strptime (e.g. '2023-1-5 9:00') fall back to it.
+        """
+        if isinstance(value, datetime.datetime):
+            return value
+        if isinstance(value, str) and len(value) == 16 and value[4] == '-' and value[7] == '-' and value[10] == ' ' and value[13] == ':':
+            digits = value[0:4] + value[5:7] + value[8:10] + value[11:13] + value[14:16]
+            if digits.isascii() and digits.isdigit():
+                return datetime.datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]), int(value[11:13]), int(value[14:16]))
+        return datetime.datetime.strptime(value, Utils.DATETIME_FORMAT)
+    # parse an API day ('YYYY-MM-DD') into a datetime at midnight
+    @staticmethod
+    def parse_date(value):
+        """
+        Parse a day sent by a client.
+
+        Args:
+            value (str or datetime.datetime): The day in 'YYYY-MM-DD' format, or a datetime.
+
+        Returns:
+            datetime.datetime: The day at midnight.
+
+        Raises:
+            ValueError: If the string is not a valid day in the expected format.
+            TypeError: If the value is neither a string nor a datetime (e.g. None).
+        """
+        if not isinstance(value, datetime.datetime):
+            value = datetime.datetime.strptime(value, Utils.DATE_FORMAT)
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    # format a datetime for API responses
+    @staticmethod
+    def format_datetime(value):
+        """
+        Format a date the way API clients expect it.
+
+        Args:
+            value (datetime.datetime): The date to format.
+
+        Returns:
+            str: The date in 'YYYY-MM-DD HH:MM' format.
+        """
+        return f'{value.year:04d}-{value.month:02d}-{value.day:02d} {value.hour:02d}:{value.minute:02d}'
+    # nearest-rank percentile of measurements (no database access)
+    @staticmethod
+    def percentile(ordered, rank):
+        """
+        Return a percentile of sorted measurements, e.g. a latency p95.
+
+        Args:
+            ordered (list): The measurements, sorted in ascending order (not empty).
+            rank (float): The percentile, from 0 to 100.
+
+        Returns:
+            The smallest measurement not lower than 'rank' percent of them.
+        """
+        return ordered[max(0, math.ceil(rank / 100 * len(ordered)) - 1)]
     # extracts username and password from the authorization header of the HTTP request
     @staticmethod
     def normalize_auth_credentials(request):
         """
-        Extracts and normalizes the username and password from the request's JSON data and Authorization header.
+        Extracts and normalizes the username and password from the request's JSON data (query string for GET) and Authorization header.
 
         Args:
             request (Request): The Flask request object.
@@ -29,9 +110,44 @@ class Utils:
         Returns:
             dict: A dictionary containing the 'username' and 'password'.
         """
-        result = request.json.copy() if request.json else {}
-        auth_header = request.headers.get('Authorization')
+        # GET requests carry their parameters in the query string
+        if request.method == 'GET':
+            result = request.args.to_dict()
+        else:
+            result = request.json.copy() if request.json else {}
+        return Utils.merge_basic_auth(result, request.headers.get('Authorization'))
+    # strong ETag of a user's data at a version
+    @staticmethod
+    def user_etag(user_id, version, path, params, pending=False):
+        """
+        Build the ETag of a response computed from a user's habits and history.
+
+        Args:
+            user_id (str): The ID of the user.
+            version (int): The 'version' of the user document.
+            path (str): The request path.
+            params (dict): The request parameters, without the credentials.
+            pending (bool): The user has 'pending_writes', its history does not match its version yet.
+
+        Returns:
+            str: The ETag value (unquoted), the same as long as the user's version and pending state do not change.
+        """
+        state = [str(user_id), version, path, params] + (['pending'] if pending else [])
+        key = json.dumps(state, sort_keys=True, default=str)
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+    # adds the Basic Auth credentials of the authorization header to the request data
+    @staticmethod
+    def merge_basic_auth(result, auth_header):
+        """
+        Add the username and password of a Basic Auth header to the request data, unless the data has them.
+
+        Args:
+            result (dict): The request JSON data, modified in place.
+            auth_header (str): The value of the Authorization header, may be None.
 
+        Returns:
+            dict: The data with 'username' and 'password' from the header when present.
+        """
         # Initialize username and password as empty strings
         username = ''
         password = ''
@@ -51,21 +167,62 @@ class Utils:
             result.setdefault('password', password)
 
         return result
+    # run blocking work (e.g. PBKDF2) off the event loop
+    @staticmethod
+    async def run_in_executor(func, *args):
+        """
+        Run a blocking function in the default thread pool, for the asyncio application.
+
+        Args:
+            func (callable): The blocking function, e.g. werkzeug's check_password_hash.
+            *args: The arguments of the function.
+
+        Returns:
+            The value returned by the function.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+    # extracts the bearer token from the authorization header of the HTTP request
+    @staticmethod
+    def get_bearer_token(request):
+        """
+        Extracts the session token from a 'Bearer' Authorization header.
+
+        Args:
+            request (Request): The Flask request object.
+
+        Returns:
+            str: The token, or None if the request does not carry a bearer token.
+        """
+        auth_header = request.headers.get('Authorization')
+        if auth_header and auth_header.startswith('Bearer '):
+            return auth_header[7:].strip() or None
+        return None
     # authenticate user credentials from the HTTP Header, notice is here to be used also on app.py if needed
     @staticmethod
-    def authenticate_user(request, db_handler):
+    def authenticate_user(request, db_handler, token_manager=None):
         """
         Authenticate a user based on credentials provided in the request.
 
+        A signed bearer token is checked first (no database access and no password hashing),
+        HTTP Basic credentials are used as a fallback.
+
         Args:
             request: Flask request object.
             db_handler: Instance of MongoDBHandler for database operations.
+            token_manager (TokenManager, optional): Verifier for signed session tokens.
 
         Returns:
             Tuple: (username, error message)
         """
         from classes.user import User
 
+        token = Utils.get_bearer_token(request) if token_manager else None
+        if token:
+            username = token_manager.verify_token(token)
+            if not username:
+                return None, 'Invalid or expired token'
+            return username, None
+
         data = Utils.normalize_auth_credentials(request)
 
         username = data.get('username')
@@ -78,7 +235,7 @@ class Utils:
 
         user_data = user.login(db_handler)
 
-        if not user_data:
+        if not user_data or not user_data.get('success'):
             return None, 'Invalid credentials'
 
         return username, None
\ No newline at end of file
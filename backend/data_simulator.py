@@ -1,13 +1,27 @@
 import datetime
+import hashlib
+import os
 import random
 import json
+import time
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from werkzeug.security import generate_password_hash
 from pymongo import MongoClient, errors
+from bson import ObjectId
 
 from classes.mongodb_handler import MongoDBHandler
 from classes.habit_tracker import HabitTracker
+from classes.habit_catalog import HabitCatalog
+from classes.completion_rollups import CompletionRollups
+from classes.utils import Utils
 
 class DataSimulator:
+    # Users of the scale mode are named '<prefix><index>', share one password and are marked 'simulated'
+    scale_username_prefix = 'simuser'
+    scale_password = '1234'
+
     def __init__(self, mongo_uri, mongo_db_name, config_file='data/test_data_config.json', success_probability=0.8, interactions_path='data/interactions.json'):
         self.config_file = config_file
         self.success_probability = success_probability
@@ -37,8 +51,7 @@ class DataSimulator:
                     added_habit = db_handler.add_document('habits', habit)
                     print(f"INFO: Habit '{habit['name']}' created: {added_habit['_id']}")
                 else:
-                    print(f"ERROR: Habit '{habit['name']}' already exists.")
-                    return False
+                    print(f"INFO: Habit '{habit['name']}' already exists, kept.")
             print("INFO: Predefined habits processing completed.")
             return True
         except Exception as e:
@@ -52,16 +65,16 @@ class DataSimulator:
         user_collection = mongo_db['users']
         try:
             user = user_collection.find_one({'username': user_data['username']})
-            if not user:
-                hashed_password = generate_password_hash(user_data['password'], method='pbkdf2:sha256')
-                user_data['password'] = hashed_password
-
-                user_collection.insert_one(user_data)
-                print("INFO: User created.")
-                return True
-            else:
-                print("ERROR: User already exists.")
-                return False
+            if user:
+                # Seeding again replaces the simulated data of the test user instead of adding to it
+                mongo_db['completions'].delete_many({'user_id': str(user['_id'])})
+                mongo_db[CompletionRollups.COLLECTION].delete_many({'user_id': str(user['_id'])})
+                user_collection.delete_one({'_id': user['_id']})
+                print("INFO: Existing test user reset.")
+            hashed_password = generate_password_hash(user_data['password'], method='pbkdf2:sha256')
+            user_collection.insert_one({**user_data, 'password': hashed_password})
+            print("INFO: User created.")
+            return True
         except Exception as e:
             print(f"Error (create_user) creating test user: {e}")
             return False
@@ -69,21 +82,16 @@ class DataSimulator:
         def random_success_probability(success_rate):
             return random.random() < success_rate
         def get_appropriate_completion_date(current_date, habit, is_successful):
-            start_range = datetime.datetime.strptime(habit['start_range'], '%Y-%m-%d %H:%M')
-            end_range = datetime.datetime.strptime(habit['end_range'], '%Y-%m-%d %H:%M')
-
             if is_successful:
-                successful_completion_date = start_range + datetime.timedelta(minutes=1)
-                return successful_completion_date.strftime('%Y-%m-%d %H:%M')
+                return habit['start_range'] + datetime.timedelta(minutes=1)
             else:
-                failed_completion_date = end_range + datetime.timedelta(hours=1)
-                return failed_completion_date.strftime('%Y-%m-%d %H:%M')
+                return habit['end_range'] + datetime.timedelta(hours=1)
         def get_datetime_range(start_time, end_time):
             start_hour, start_minute = map(int, start_time.split(':'))
             end_hour, end_minute = map(int, end_time.split(':'))
-            start_range = datetime.datetime.now().replace(hour=start_hour, minute=start_minute)
-            end_range = datetime.datetime.now().replace(hour=end_hour, minute=end_minute)
-            return start_range.strftime('%Y-%m-%d %H:%M'), end_range.strftime('%Y-%m-%d %H:%M')
+            start_range = datetime.datetime.now().replace(hour=start_hour, minute=start_minute, second=0, microsecond=0)
+            end_range = datetime.datetime.now().replace(hour=end_hour, minute=end_minute, second=0, microsecond=0)
+            return start_range, end_range
         user_data = config['test_user']
         simulation_config = config['simulation']
         user = db_handler.find_document('users', {'username': user_data['username']})
@@ -93,6 +101,9 @@ class DataSimulator:
         interactions_log = []
         predefined_habits = db_handler.list_documents('habits')
         for habit in predefined_habits:
+            # Habits added by the admin have no simulated time range
+            if habit['name'] not in simulation_config['habit_time_ranges']:
+                continue
             time_range = simulation_config['habit_time_ranges'][habit['name']]
             start_time, end_time = time_range['start'], time_range['end']
             start_range, end_range = get_datetime_range(start_time, end_time)
@@ -106,7 +117,7 @@ class DataSimulator:
             for habit in assigned_habits:
                 if habit['type'] == 'daily' or (habit['type'] == 'weekly' and day % 7 == 0):
                     is_successful = random_success_probability(success_probability)
-                    current_date = datetime.datetime.strptime(habit['start_range'], '%Y-%m-%d %H:%M')
+                    current_date = habit['start_range']
                     continue_enabled = True
                     completion_date = get_appropriate_completion_date(current_date, habit, is_successful)
                     completion_method = habit_tracker.update_daily_habit if habit['type'] == 'daily' else habit_tracker.update_weekly_habit
@@ -135,12 +146,200 @@ class DataSimulator:
         if not self.create_predefined_habits(db_handler, config['habits']):
             print("(data_simulator) Failed to create predefined habits.")
             return False
+        # Running servers serve the new catalog once they see the new version
+        HabitCatalog(db_handler).invalidate()
         interactions = self.simulate_daily_interactions(config, db_handler, habit_tracker, self.success_probability)
         if not interactions:
             print("(data_simulator) Failed to simulate daily interactions.")
             return False
         save_interactions_to_json(interactions, self.interactions_path)
         return True
+    def config_fingerprint(self, config_file):
+        try:
+            with open(config_file, 'rb') as file:
+                return hashlib.sha256(file.read()).hexdigest()
+        except Exception as e:
+            print(f"Error reading configuration: {e}")
+            return False
+    def seed(self, force=False):
+        fingerprint = self.config_fingerprint(self.config_file)
+        if not fingerprint:
+            return False
+        db_handler = MongoDBHandler(self.mongo_uri, self.mongo_db_name)
+        seed_state = db_handler.find_document('system', {'_id': 'seed'})
+        if not force and seed_state and seed_state.get('fingerprint') == fingerprint:
+            print(f"INFO: Test data already seeded from '{self.config_file}' (unchanged), skipping.")
+            return True
+        if not self.run_simulation():
+            return False
+        db_handler.db['system'].update_one({'_id': 'seed'}, {'$set': {'fingerprint': fingerprint, 'config_file': self.config_file,
+                                                                      'seeded_at': datetime.datetime.now()}}, upsert=True)
+        return True
+    # Scale mode: N users x M habits x D days on a virtual clock, built in memory and written in chunks
+    def scale_habit_templates(self, config):
+        time_ranges = config['simulation']['habit_time_ranges']
+        templates = [{**habit, 'start': time_ranges[habit['name']]['start'], 'end': time_ranges[habit['name']]['end']}
+                     for habit in config['habits'] if habit['name'] in time_ranges]
+        return templates + config['simulation']['custom_habits']
+    def build_scale_user(self, index, templates, habits_per_user, first_day, password_hash, predefined_ids, rng):
+        def at_time(day, time):
+            hour, minute = map(int, time.split(':'))
+            return day.replace(hour=hour, minute=minute)
+        username = f"{self.scale_username_prefix}{index:07d}"
+        habits = []
+        for habit_index in range(habits_per_user):
+            template = templates[habit_index % len(templates)]
+            # Past the number of templates, the same habits are assigned again under a numbered name
+            name = template['name'] if habit_index < len(templates) else f"{template['name']} {habit_index // len(templates) + 1}"
+            habit = HabitTracker._new_habit(name, template['type'], at_time(first_day, template['start']), at_time(first_day, template['end']),
+                                            template['category'], template['subcategory'], template['description'],
+                                            habit_id=predefined_ids.get(template['name']))
+            # Ids are drawn from the seeded generator too, so a dataset can be regenerated exactly
+            habit['_id'] = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            habit['creation_datetime'] = first_day
+            habits.append(habit)
+        user_id = ObjectId(int(first_day.timestamp()).to_bytes(4, 'big') + rng.getrandbits(64).to_bytes(8, 'big'))
+        return {'_id': user_id, 'username': username, 'password': password_hash, 'email': f"{username}@simulation.test",
+                'name': f"Simulated User {index}", 'habits': habits, 'simulated': True}
+    def simulate_scale_user(self, user, days, rng, success_probability):
+        # Same interactions and streak logic as simulate_daily_interactions, without any database access
+        for day in range(days):
+            for habit in user['habits']:
+                if habit['type'] == 'daily' or (habit['type'] == 'weekly' and day % 7 == 0):
+                    is_successful = rng.random() < success_probability
+                    if is_successful:
+                        completion_date = habit['start_range'] + datetime.timedelta(minutes=1)
+                    else:
+                        completion_date = habit['end_range'] + datetime.timedelta(hours=1)
+                    _, completion_entry = HabitTracker._apply_completion(habit, completion_date, True, HabitTracker.PERIODS[habit['type']])
+                    yield habit, HabitTracker._completion_document(user['_id'], habit['_id'], completion_entry)
+    def simulate_scale_users(self, db_handler, config, first_user, users, habits_per_user, days, first_day, log_file, rng, chunk_size):
+        password_hash = generate_password_hash(self.scale_password, method='pbkdf2:sha256')
+        predefined_ids = {habit['name']: habit['_id'] for habit in db_handler.list_documents('habits', projection={'name': 1})}
+        templates = self.scale_habit_templates(config)
+        rollups = CompletionRollups(db_handler, HabitTracker.PERIODS)
+        user_chunk, completion_chunk, rollup_chunk = [], [], []
+        completions = 0
+        for index in range(first_user, first_user + users):
+            user = self.build_scale_user(index, templates, habits_per_user, first_day, password_hash, predefined_ids, rng)
+            user_completions = []
+            for habit, completion in self.simulate_scale_user(user, days, rng, self.success_probability):
+                completion_chunk.append(completion)
+                user_completions.append(completion)
+                if log_file:
+                    log_file.write(json.dumps({'action': 'complete', 'user': user['username'], 'habit': habit['name'],
+                                               'datetime': Utils.format_datetime(completion['datetime']),
+                                               'status': completion['status'], 'streak': completion['streak']}) + '\n')
+                if len(completion_chunk) >= chunk_size:
+                    db_handler.insert_documents('completions', completion_chunk)
+                    completions += len(completion_chunk)
+                    completion_chunk = []
+            # The user is written with the final state of its habits, after its whole history, and its summary
+            status_counts = CompletionRollups.habit_counts(user_completions)
+            for habit in user['habits']:
+                habit['status_counts'] = status_counts.get(habit['_id'], {})
+            user['summary'] = HabitTracker._summary(user['habits'])
+            user_chunk.append(user)
+            if len(user_chunk) >= chunk_size:
+                db_handler.insert_documents('users', user_chunk)
+                user_chunk = []
+            # Daily rollups of the whole history of the user, the same counters as the API writes
+            rollup_chunk.extend(rollups.increment_requests(rollups.increments({habit['_id']: habit for habit in user['habits']}, user_completions)))
+            if len(rollup_chunk) >= chunk_size:
+                db_handler.increment_documents(CompletionRollups.COLLECTION, rollup_chunk)
+                rollup_chunk = []
+        db_handler.insert_documents('users', user_chunk)
+        db_handler.insert_documents('completions', completion_chunk)
+        db_handler.increment_documents(CompletionRollups.COLLECTION, rollup_chunk)
+        return completions + len(completion_chunk)
+    def reset_scale_users(self, db_handler, chunk_size):
+        # Remove the users (and their completions and rollups) of a previous scale run, never a real user with a similar name
+        query = {'simulated': True}
+        user_ids = []
+        for user in db_handler.iterate_documents('users', query, projection={'_id': 1}, batch_size=chunk_size):
+            # The history refers to users by the string of their ID
+            user_ids.append(str(user['_id']))
+            if len(user_ids) >= chunk_size:
+                db_handler.delete_documents('completions', {'user_id': {'$in': user_ids}})
+                db_handler.delete_documents(CompletionRollups.COLLECTION, {'user_id': {'$in': user_ids}})
+                user_ids = []
+        if user_ids:
+            db_handler.delete_documents('completions', {'user_id': {'$in': user_ids}})
+            db_handler.delete_documents(CompletionRollups.COLLECTION, {'user_id': {'$in': user_ids}})
+        return db_handler.delete_documents('users', query)
+    def shard_seed(self, seed, shard):
+        # Stable across processes and Python runs, unlike hash()
+        return int.from_bytes(hashlib.sha256(f"{seed}:{shard}".encode()).digest()[:8], 'big')
+    def run_scale_shard(self, config, shard, first_user, users, habits_per_user, days, first_day, log_path, seed, chunk_size):
+        # Runs in a worker process, with its own MongoClient and its own chunks
+        db_handler = MongoDBHandler(self.mongo_uri, self.mongo_db_name)
+        started = time.perf_counter()
+        log_file = open(log_path, 'w') if log_path else None
+        try:
+            completions = self.simulate_scale_users(db_handler, config, first_user, users, habits_per_user, days, first_day,
+                                                    log_file, random.Random(self.shard_seed(seed, shard)), chunk_size)
+        finally:
+            if log_file:
+                log_file.close()
+            db_handler.close()
+        return {'shard': shard, 'users': users, 'completions': completions, 'seconds': time.perf_counter() - started}
+    def merge_shard_logs(self, log_path, shard_paths):
+        with open(log_path, 'w') as log_file:
+            for shard_path in shard_paths:
+                with open(shard_path, 'r') as shard_file:
+                    for line in shard_file:
+                        log_file.write(line)
+                os.remove(shard_path)
+    def run_scale_simulation(self, users, habits_per_user, days, chunk_size=1000, first_day=None, log_path=None, workers=1, seed=None):
+        config = self.load_test_data_config(self.config_file)
+        if not config:
+            print("(data_simulator) Failed to load configuration.")
+            return False
+        # The virtual clock ends today by default
+        if first_day is None:
+            first_day = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - datetime.timedelta(days=days)
+        # The same seed, workers and arguments regenerate the same dataset
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        print(f"INFO: Scale simulation seed: {seed}.")
+        db_handler = MongoDBHandler(self.mongo_uri, self.mongo_db_name)
+        removed = self.reset_scale_users(db_handler, chunk_size)
+        if removed:
+            print(f"INFO: Removed {removed} users of a previous scale simulation.")
+        db_handler.close()
+
+        # Contiguous ranges of users, one per shard
+        shards = []
+        first_user = 0
+        for shard in range(workers):
+            shard_users = users // workers + (1 if shard < users % workers else 0)
+            if shard_users:
+                shard_log = f"{log_path}.shard{shard}" if log_path else None
+                shards.append((config, shard, first_user, shard_users, habits_per_user, days, first_day, shard_log, seed, chunk_size))
+            first_user += shard_users
+
+        started = time.perf_counter()
+        try:
+            if len(shards) == 1:
+                results = [self.run_scale_shard(*shards[0])]
+            else:
+                # Spawned workers do not inherit the parent's MongoClient
+                with ProcessPoolExecutor(max_workers=len(shards), mp_context=multiprocessing.get_context('spawn')) as executor:
+                    results = list(executor.map(self.run_scale_shard, *zip(*shards)))
+        except Exception as e:
+            print(f"Error (run_scale_simulation): {e}")
+            return False
+        seconds = time.perf_counter() - started
+
+        for result in results:
+            print(f"INFO: Shard {result['shard']}: {result['users']} users, {result['completions']} completions in {result['seconds']:.1f}s "
+                  f"({result['completions'] / max(result['seconds'], 1e-9):.0f} completions/s).")
+        completions = sum(result['completions'] for result in results)
+        print(f"INFO: Simulated {users} users, {completions} completions in {seconds:.1f}s ({completions / max(seconds, 1e-9):.0f} completions/s).")
+        if log_path:
+            self.merge_shard_logs(log_path, [shard[7] for shard in shards])
+            print(f"Interactions saved to {log_path}.")
+        return {'users': users, 'completions': completions, 'seconds': seconds, 'seed': seed, 'shards': results}
 
 def main():
     simulator = DataSimulator()
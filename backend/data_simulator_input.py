@@ -1,13 +1,5 @@
-import os
 from data_simulator import DataSimulator
-
-mongo_auth_enabled = os.environ.get('MONGO_AUTH_ENABLED', 'false').lower() == 'true'
-mongo_username = os.environ.get('MONGO_USERNAME', 'admin')
-mongo_password = os.environ.get('MONGO_PASSWORD', 'admin1234')
-mongo_host = os.environ.get('MONGO_HOST', 'localhost')
-mongo_port = os.environ.get('MONGO_PORT', '27017')
-mongo_db_name = os.environ.get('DB_NAME', 'healthhub')
-mongo_uri = f"mongodb://{mongo_username}:{mongo_password}@{mongo_host}:{mongo_port}/{mongo_db_name}?authSource=admin" if mongo_auth_enabled else f"mongodb://{mongo_host}:{mongo_port}/{mongo_db_name}"
+from settings import mongo_uri, mongo_db_name
 
 class InteractiveDataSimulator:
     def __init__(self):
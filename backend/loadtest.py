@@ -0,0 +1,233 @@
+import argparse
+import base64
+import datetime
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from classes.utils import Utils
+from settings import backend_port
+
+# HTTP load test of a running backend, e.g. `python loadtest.py --config data/load_test_mix.json --concurrency 20 --duration 60`.
+# The users of the traffic mix are seeded through /register and /user/assign_habit, then every worker thread sends
+# requests drawn by weight from the mix until the duration has elapsed.
+
+class Connection:
+    # One keep-alive connection per thread, opened again when the server closed it
+    def __init__(self, url, timeout=10):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.timeout = timeout
+        self.connection = None
+    def request(self, method, path, body=None, headers=None):
+        # Returns (status, decoded JSON body or None); the status is 0 when no response was received
+        headers = dict(headers or {})
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps(body)
+        for attempt in range(2):
+            reused = self.connection is not None
+            try:
+                if not reused:
+                    self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # An idle keep-alive connection closed by the server is retried once on a new one
+                self.close()
+                if not reused or attempt:
+                    return 0, None
+            except (OSError, http.client.HTTPException):
+                self.close()
+                return 0, None
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+def load_mix(config_file):
+    with open(config_file) as file:
+        config = json.load(file)
+    if not config.get('requests') or not config.get('users') or not config.get('habit'):
+        raise ValueError("The traffic mix needs 'users', 'habit' and a non empty 'requests' list.")
+    for entry in config['requests']:
+        if not entry.get('method') or not entry.get('path') or entry.get('weight', 1) <= 0:
+            raise ValueError(f"Invalid request in the traffic mix: {entry}")
+        if entry.get('auth', 'token') not in ('token', 'basic', 'none'):
+            raise ValueError(f"Invalid 'auth' in the traffic mix (token, basic or none): {entry}")
+    return config
+
+def render(value, context):
+    # Fills the '{username}', '{password}', '{habit_id}' and '{now}' placeholders of strings, at any depth
+    if isinstance(value, str):
+        return value.format_map(context)
+    if isinstance(value, dict):
+        return {key: render(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render(item, context) for item in value]
+    return value
+
+def succeeded(status, data):
+    return 0 < status < 400 and not (isinstance(data, dict) and data.get('success') is False)
+
+def find_habit_id(connection, name):
+    status, catalog = connection.request('GET', '/habits')
+    if not succeeded(status, catalog):
+        raise RuntimeError(f"Could not read the habits catalog (HTTP {status}).")
+    for habit in catalog.get('habits', []):
+        if habit['name'] == name:
+            return habit['_id']
+    raise RuntimeError(f"The pre setted habit '{name}' does not exist, seed the database first (manage.py seed).")
+
+def seed_user(connection, config, index, habit_id):
+    username = f"{config.get('username_prefix', 'loaduser')}{index:05d}"
+    password = config.get('password', 'loadtest1234')
+    # A user left by a previous run is rejected by /register, it is reused as is
+    connection.request('POST', '/register', {'username': username, 'password': password, 'email': f"{username}@loadtest.test",
+                                             'name': f"Load Test User {index}"})
+    status, login = connection.request('POST', '/login', {'username': username, 'password': password})
+    if not succeeded(status, login):
+        raise RuntimeError(f"Could not log in '{username}' (HTTP {status}): {login}")
+    headers = {'Authorization': f"Bearer {login['data']['token']}"}
+
+    for attempt in range(2):
+        status, listing = connection.request('GET', '/user/habits', headers=headers)
+        if not succeeded(status, listing):
+            raise RuntimeError(f"Could not list the habits of '{username}' (HTTP {status}): {listing}")
+        habit = next((habit for habit in listing.get('habits', []) if habit.get('habit_id') == habit_id), None)
+        if habit or attempt:
+            break
+        # Today's period, so check-ins sent during the test are in range
+        today = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        status, assigned = connection.request('POST', '/user/assign_habit', {'habit_id': habit_id, 'start_range': Utils.format_datetime(today),
+                                                                              'end_range': Utils.format_datetime(today + datetime.timedelta(hours=23, minutes=59))}, headers)
+        if not succeeded(status, assigned):
+            raise RuntimeError(f"Could not assign the habit to '{username}' (HTTP {status}): {assigned}")
+    if not habit:
+        raise RuntimeError(f"The habit assigned to '{username}' is not listed.")
+    return {'username': username, 'password': password, 'token': login['data']['token'], 'habit_id': habit['_id']}
+
+def seed_users(url, config, concurrency, timeout):
+    connection = Connection(url, timeout)
+    habit_id = find_habit_id(connection, config['habit'])
+    connection.close()
+    # Registration hashes a password per user, so the users are seeded in parallel, one connection per thread
+    local = threading.local()
+    def seed(index):
+        if not hasattr(local, 'connection'):
+            local.connection = Connection(url, timeout)
+        return seed_user(local.connection, config, index, habit_id)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(seed, range(config['users'])))
+
+def request_of(entry, user):
+    context = {**user, 'now': Utils.format_datetime(datetime.datetime.now())}
+    path = render(entry['path'], context)
+    if entry.get('query'):
+        path = f"{path}?{urlencode(render(entry['query'], context))}"
+    headers = {}
+    auth = entry.get('auth', 'token')
+    if auth == 'token':
+        headers['Authorization'] = f"Bearer {user['token']}"
+    elif auth == 'basic':
+        credentials = base64.b64encode(f"{user['username']}:{user['password']}".encode()).decode()
+        headers['Authorization'] = f"Basic {credentials}"
+    body = render(entry['json'], context) if 'json' in entry else None
+    return entry['method'].upper(), path, body, headers
+
+def run_worker(url, users, mix, deadline, timeout, seed):
+    # Sends requests until the deadline; returns (request name, seconds, succeeded) samples
+    rng = random.Random(seed)
+    weights = [entry.get('weight', 1) for entry in mix]
+    connection = Connection(url, timeout)
+    samples = []
+    index = 0
+    while time.perf_counter() < deadline:
+        entry = rng.choices(mix, weights)[0]
+        method, path, body, headers = request_of(entry, users[index % len(users)])
+        index += 1
+        started = time.perf_counter()
+        status, data = connection.request(method, path, body, headers)
+        samples.append((entry.get('name', f"{method} {entry['path']}"), time.perf_counter() - started, succeeded(status, data)))
+    connection.close()
+    return samples
+
+def run_load(url, users, mix, concurrency, duration, timeout, seed=None):
+    # Every worker drives its own share of the users, so the requests of a user are rarely concurrent
+    shares = [users[worker::concurrency] or [users[worker % len(users)]] for worker in range(concurrency)]
+    seeds = random.Random(seed)
+    started = time.perf_counter()
+    deadline = started + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_worker, url, share, mix, deadline, timeout, seeds.getrandbits(64)) for share in shares]
+        samples = [sample for future in futures for sample in future.result()]
+    return samples, time.perf_counter() - started
+
+def summary(samples, seconds):
+    ordered = sorted(latency for _, latency, _ in samples)
+    errors = sum(1 for _, _, ok in samples if not ok)
+    result = {'requests': len(samples), 'errors': errors, 'error_rate': round(errors / len(samples), 4) if samples else None,
+              'throughput': round(len(samples) / seconds, 2) if seconds else None}
+    if ordered:
+        result['latency_ms'] = {name: round(value * 1000, 3) for name, value in (
+            ('p50', Utils.percentile(ordered, 50)), ('p95', Utils.percentile(ordered, 95)), ('p99', Utils.percentile(ordered, 99)),
+            ('mean', statistics.fmean(ordered)), ('max', ordered[-1]))}
+    return result
+
+def report(samples, seconds):
+    names = {}
+    for sample in samples:
+        names.setdefault(sample[0], []).append(sample)
+    return {'seconds': round(seconds, 2), 'total': summary(samples, seconds),
+            'endpoints': {name: summary(endpoint_samples, seconds) for name, endpoint_samples in names.items()}}
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test a running backend with a traffic mix.')
+    parser.add_argument('--config', default='data/load_test_mix.json', help='Traffic mix: users, habit and weighted requests (default: data/load_test_mix.json).')
+    parser.add_argument('--url', default=f"http://localhost:{backend_port}", help=f"Backend URL (default: http://localhost:{backend_port}).")
+    parser.add_argument('--concurrency', type=int, default=10, help='Worker threads sending requests (default: 10).')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load after seeding (default: 30).')
+    parser.add_argument('--timeout', type=float, default=10, help='Seconds before a request fails (default: 10).')
+    parser.add_argument('--seed', type=int, help='Random seed of the request sequence (default: random).')
+    parser.add_argument('--output', help='Write the report to this JSON file.')
+    args = parser.parse_args()
+
+    try:
+        mix = load_mix(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Error (load_mix): {e}")
+        return 1
+    try:
+        users = seed_users(args.url, mix, args.concurrency, args.timeout)
+    except RuntimeError as e:
+        print(f"Error (seed_users): {e}")
+        return 1
+    print(f"INFO: {len(users)} users ready, {args.concurrency} workers for {args.duration:g}s against {args.url}.")
+
+    samples, seconds = run_load(args.url, users, mix['requests'], args.concurrency, args.duration, args.timeout, args.seed)
+    result = {'generated_at': Utils.format_datetime(datetime.datetime.now()), 'url': args.url, 'config': args.config,
+              'concurrency': args.concurrency, 'duration': args.duration, 'users': len(users), **report(samples, seconds)}
+    for name, endpoint in [*result['endpoints'].items(), ('all', result['total'])]:
+        latency = endpoint.get('latency_ms', {})
+        print(f"  {name:<24} {endpoint['requests']:>8} requests  {endpoint['throughput']:>9.2f} req/s  {(endpoint['error_rate'] or 0) * 100:>6.2f}% errors  "
+              f"p50 {latency.get('p50', 0):>9.3f}  p95 {latency.get('p95', 0):>9.3f}  p99 {latency.get('p99', 0):>9.3f} ms")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(result, file, indent=2)
+        print(f"Report saved to {args.output}.")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
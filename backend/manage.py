@@ -0,0 +1,91 @@
+import argparse
+import datetime
+from classes.mongodb_handler import MongoDBHandler
+from classes.migrations import Migrations
+from data_simulator import DataSimulator
+from settings import mongo_uri, mongo_db_name, config_file, success_probability, interactions_path
+
+# Maintenance commands, e.g. `python manage.py migrate-completions --batch-size 200`
+
+def migrate_completions(db_handler, args):
+    migrations = Migrations(db_handler, batch_size=args.batch_size)
+    result = migrations.migrate_completions(restart=args.restart)
+    print(f"Completions migration finished: {result['users']} users, {result['completions']} completions moved.")
+    return result['success']
+
+def migrate_datetimes(db_handler, args):
+    result = Migrations(db_handler).migrate_datetimes()
+    print(f"Datetimes migration finished: {result['users']} users, {result['completions']} completions converted.")
+    return result['success']
+
+def rebuild_summaries(db_handler, args):
+    result = Migrations(db_handler, batch_size=args.batch_size).rebuild_summaries()
+    print(f"Summaries rebuilt: {result['users']} users, {result['skipped']} changed meanwhile and skipped.")
+    return result['success']
+
+def backfill_rollups(db_handler, args):
+    migrations = Migrations(db_handler, batch_size=args.batch_size)
+    result = migrations.backfill_rollups(restart=args.restart)
+    print(f"Rollups backfill finished: {result['users']} users, {result['completions']} completions, {result['rollups']} daily rollups, {result['skipped']} users changed meanwhile without habit counters.")
+    return result['success']
+
+def seed(db_handler, args):
+    simulator = DataSimulator(mongo_uri=mongo_uri, mongo_db_name=mongo_db_name, config_file=args.config_file,
+                              success_probability=success_probability, interactions_path=interactions_path)
+    success = simulator.seed(force=args.force)
+    print("Seeding finished." if success else "Seeding encountered errors.")
+    return success
+
+def simulate(db_handler, args):
+    simulator = DataSimulator(mongo_uri=mongo_uri, mongo_db_name=mongo_db_name, config_file=args.config_file,
+                              success_probability=args.success_probability)
+    first_day = datetime.datetime.strptime(args.start, '%Y-%m-%d') if args.start else None
+    result = simulator.run_scale_simulation(args.users, args.habits, args.days, chunk_size=args.chunk_size, first_day=first_day,
+                                            log_path=args.log, workers=args.workers, seed=args.seed)
+    return bool(result)
+
+def main():
+    parser = argparse.ArgumentParser(description='HealthHub maintenance commands.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_completions = subparsers.add_parser('migrate-completions', help='Move embedded completion history to the completions collection.')
+    parser_completions.add_argument('--batch-size', type=int, default=500, help='Users processed per batch (default: 500).')
+    parser_completions.add_argument('--restart', action='store_true', help='Ignore the saved checkpoint and scan all users again.')
+    parser_completions.set_defaults(handler=migrate_completions)
+
+    parser_datetimes = subparsers.add_parser('migrate-datetimes', help='Store habit and completion dates as BSON dates instead of strings.')
+    parser_datetimes.set_defaults(handler=migrate_datetimes)
+
+    parser_summaries = subparsers.add_parser('rebuild-summaries', help='Recompute the analytics summary of every user from its habits.')
+    parser_summaries.add_argument('--batch-size', type=int, default=500, help='Users processed per batch (default: 500).')
+    parser_summaries.set_defaults(handler=rebuild_summaries)
+
+    parser_rollups = subparsers.add_parser('backfill-rollups', help='Build the daily completion rollups from the completion history.')
+    parser_rollups.add_argument('--batch-size', type=int, default=500, help='Users processed per batch (default: 500).')
+    parser_rollups.add_argument('--restart', action='store_true', help='Ignore the saved checkpoint and rebuild all users again.')
+    parser_rollups.set_defaults(handler=backfill_rollups)
+
+    parser_seed = subparsers.add_parser('seed', help='Load the test data, skipped when the configuration did not change since the last seed.')
+    parser_seed.add_argument('--config-file', default=config_file, help=f'Test data configuration (default: {config_file}).')
+    parser_seed.add_argument('--force', action='store_true', help='Seed again even if the configuration did not change.')
+    parser_seed.set_defaults(handler=seed)
+
+    parser_simulate = subparsers.add_parser('simulate', help='Generate users x habits x days of simulated history for capacity testing.')
+    parser_simulate.add_argument('--users', type=int, default=1000, help='Number of simulated users (default: 1000).')
+    parser_simulate.add_argument('--habits', type=int, default=10, help='Habits per user (default: 10).')
+    parser_simulate.add_argument('--days', type=int, default=365, help='Simulated days of history (default: 365).')
+    parser_simulate.add_argument('--start', help='First simulated day, YYYY-MM-DD (default: the history ends today).')
+    parser_simulate.add_argument('--chunk-size', type=int, default=1000, help='Documents per insert (default: 1000).')
+    parser_simulate.add_argument('--success-probability', type=float, default=success_probability, help=f'Probability of a completion in range (default: {success_probability}).')
+    parser_simulate.add_argument('--config-file', default=config_file, help=f'Habit templates and time ranges (default: {config_file}).')
+    parser_simulate.add_argument('--workers', type=int, default=1, help='Processes sharing the users (default: 1).')
+    parser_simulate.add_argument('--seed', type=int, help='Global random seed; the same seed and workers regenerate the same dataset (default: random, printed).')
+    parser_simulate.add_argument('--log', help='Write every simulated interaction to this NDJSON file.')
+    parser_simulate.set_defaults(handler=simulate)
+
+    args = parser.parse_args()
+    db_handler = MongoDBHandler(mongo_uri, mongo_db_name)
+    return 0 if args.handler(db_handler, args) else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,51 @@
+from gunicorn.app.base import BaseApplication
+from settings import backend_port, web_workers, web_threads, web_graceful_timeout
+
+# Production server: `python serve.py`
+# Gunicorn pre-forks WEB_WORKERS processes, each serving requests with WEB_THREADS threads.
+# The app is imported once in the master (preload), so the session secret is shared,
+# and every worker opens its own MongoClient after the fork.
+
+# after fork, in the worker
+def post_fork(server, worker):
+    import app
+    # Opens the MongoClient of this worker now, instead of on its first request
+    app.db_handler.client
+    server.log.info(f"Worker {worker.pid} connected to MongoDB.")
+
+# worker is exiting (after the graceful drain)
+def worker_exit(server, worker):
+    import app
+    app.db_handler.close()
+
+class Server(BaseApplication):
+    def __init__(self, options=None):
+        """
+        Initialize the gunicorn application.
+
+        Args:
+            options (dict, optional): Gunicorn settings overriding the defaults.
+        """
+        self.options = options or {}
+        super().__init__()
+    # apply the settings
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+    # the WSGI application
+    def load(self):
+        from app import app
+        return app
+
+if __name__ == '__main__':
+    Server({
+        'bind': f'0.0.0.0:{backend_port}',
+        'workers': web_workers,
+        'worker_class': 'gthread',
+        'threads': web_threads,
+        'preload_app': True,
+        # On SIGTERM workers stop accepting connections and finish their requests within this delay
+        'graceful_timeout': web_graceful_timeout,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+    }).run()
@@ -0,0 +1,45 @@
+import os
+import secrets
+
+# BACKEND PORT
+backend_port = os.environ.get('BACKEND_PORT', '5000')
+
+# Production server (serve.py): worker processes, threads per worker, seconds given to in-flight requests on shutdown
+web_workers = int(os.environ.get('WEB_WORKERS', str(os.cpu_count() or 1)))
+web_threads = int(os.environ.get('WEB_THREADS', '4'))
+web_graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', '30'))
+
+# Admin account details
+admin_username = os.environ.get('ADMIN_USERNAME', 'admin')
+admin_password = os.environ.get('ADMIN_PASSWORD', 'admin1234')
+
+# Session tokens (must be shared by every backend process, otherwise tokens only validate on the issuing process)
+session_secret_key = os.environ.get('SESSION_SECRET_KEY') or secrets.token_hex(32)
+session_token_expiration = int(os.environ.get('SESSION_TOKEN_EXPIRATION', '3600'))
+
+# Database configuration
+mongo_auth_enabled = os.environ.get('MONGO_AUTH_ENABLED', 'false').lower() == 'true'
+mongo_username = os.environ.get('MONGO_USERNAME', 'admin')
+mongo_password = os.environ.get('MONGO_PASSWORD', 'admin1234')
+mongo_host = os.environ.get('MONGO_HOST', 'localhost')
+mongo_port = os.environ.get('MONGO_PORT', '27017')
+mongo_db_name = os.environ.get('DB_NAME', 'healthhub')
+mongo_uri = f"mongodb://{mongo_username}:{mongo_password}@{mongo_host}:{mongo_port}/{mongo_db_name}?authSource=admin" if mongo_auth_enabled else f"mongodb://{mongo_host}:{mongo_port}/{mongo_db_name}"
+
+# Admin users listing: cursor batch size when streaming, maximum page size when paginating
+users_batch_size = int(os.environ.get('USERS_BATCH_SIZE', '500'))
+
+# Largest number of items accepted by one /user/complete_batch request
+complete_batch_max_items = int(os.environ.get('COMPLETE_BATCH_MAX_ITEMS', '500'))
+
+# Pre setted habits catalog (GET /habits): Cache-Control max-age, seconds a process trusts the catalog version it read
+habits_cache_max_age = int(os.environ.get('HABITS_CACHE_MAX_AGE', '0'))
+habits_version_check_interval = float(os.environ.get('HABITS_VERSION_CHECK_INTERVAL', '1'))
+
+# Admin analytics (/admin/analytics/*): seconds a report is served from the cache of a process, 0 disables the cache
+admin_analytics_cache_ttl = float(os.environ.get('ADMIN_ANALYTICS_CACHE_TTL', '300'))
+
+# Simulation settings
+config_file = os.environ.get('SIMULATION_CONFIG_FILE', 'data/test_data_config.json')
+success_probability = float(os.environ.get('SIMULATION_SUCCESS_PROBABILITY', '0.8'))
+interactions_path = os.environ.get('SIMULATION_INTERACTIONS_PATH', 'data/interactions.json')
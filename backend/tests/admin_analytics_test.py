@@ -0,0 +1,95 @@
+import unittest
+import datetime
+from unittest.mock import MagicMock, patch
+from classes.admin_analytics import AdminAnalytics
+
+class TestAdminAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup AdminAnalytics with a mocked MongoDBHandler.
+        """
+        self.mock_db_handler = MagicMock()
+        self.analytics = AdminAnalytics(self.mock_db_handler, ttl=60)
+        self.now = datetime.datetime(2024, 1, 3, 15, 0)
+
+    def test_activity(self):
+        """
+        Test active users are counted on the server from the rollups of the range, with every day returned.
+        """
+        self.mock_db_handler.aggregate.return_value = [{
+            'days': [{'day': datetime.datetime(2024, 1, 2), 'active_users': 2, 'completed': 3, 'in_progress': 0, 'failed': 1}],
+            'totals': [{'active_users': 3}]
+        }]
+
+        result = self.analytics.activity(days=3, now=self.now)
+
+        collection, pipeline = self.mock_db_handler.aggregate.call_args.args
+        self.assertEqual(collection, 'daily_rollups')
+        self.assertEqual(self.mock_db_handler.aggregate.call_args.kwargs, {'allowDiskUse': True})
+        self.assertEqual(pipeline[0]['$match']['day'], {'$gte': datetime.datetime(2024, 1, 1), '$lt': datetime.datetime(2024, 1, 4)})
+        self.assertEqual(set(pipeline[1]['$facet']), {'days', 'totals'})
+        self.assertEqual(result['active_users'], 3)
+        self.assertEqual([day['date'] for day in result['days']], ['2024-01-01', '2024-01-02', '2024-01-03'])
+        self.assertEqual(result['days'][1], {'date': '2024-01-02', 'active_users': 2, 'completed': 3, 'in_progress': 0, 'failed': 1, 'completion_rate': 0.75})
+        self.assertIsNone(result['days'][0]['completion_rate'])
+
+    def test_habits(self):
+        """
+        Test the habits report only projects the habit fields it groups and computes the rates of the rows.
+        """
+        self.mock_db_handler.aggregate.return_value = [{
+            'totals': [{'_id': None, 'users': 2, 'habits': 5}],
+            'predefined_habits': [{'_id': 'habit1', 'name': 'Walk', 'assigned': 4, 'completions': 10, 'on_streak': 3, 'failed': 1, 'average_longest_streak': 2.5,
+                                   'completed_entries': 6, 'in_progress_entries': 2, 'failed_entries': 2}, {'_id': 'habit2', 'assigned': 1, 'completions': 0, 'on_streak': 0, 'failed': 0}],
+            'categories': [{'_id': 'Health', 'habits': 5, 'abandoned': 2}]
+        }]
+
+        result = self.analytics.habits(abandoned_after=7, limit=10, now=self.now)
+
+        collection, pipeline = self.mock_db_handler.aggregate.call_args.args
+        self.assertEqual(collection, 'users')
+        self.assertEqual(self.mock_db_handler.aggregate.call_args.kwargs, {'allowDiskUse': True})
+        self.assertEqual(set(pipeline[0]['$project']), {'_id'} | {f'habits.{field}' for field in AdminAnalytics.HABIT_FIELDS})
+        abandoned = pipeline[1]['$facet']['categories'][1]['$group']['abandoned']['$sum']['$cond'][0]
+        self.assertIn({'$lt': ['$habits.end_range', datetime.datetime(2023, 12, 27, 15, 0)]}, abandoned['$and'])
+        self.assertIn({'$eq': [{'$type': '$habits.end_range'}, 'date']}, abandoned['$and'])
+        self.assertEqual((result['users'], result['habits']), (2, 5))
+        completed = pipeline[1]['$facet']['predefined_habits'][2]['$group']['completed_entries']
+        self.assertEqual(completed, {'$sum': {'$ifNull': ['$habits.status_counts.completed', 0]}})
+        self.assertEqual(result['predefined_habits'][0]['on_streak_rate'], 0.75)
+        self.assertEqual(result['predefined_habits'][0]['completion_rate'], 0.8)
+        self.assertIsNone(result['predefined_habits'][1]['completion_rate'])
+        self.assertEqual(result['categories'], [{'category': 'Health', 'habits': 5, 'abandoned': 2, 'abandonment_rate': 0.4}])
+
+    def test_reports_are_cached_for_ttl(self):
+        """
+        Test a report is aggregated once while cached, again once the TTL expired, and errors are not cached.
+        """
+        self.mock_db_handler.aggregate.side_effect = [Exception('timeout'), [{}], [{}]]
+
+        with patch('classes.admin_analytics.time.monotonic', side_effect=[0, 10, 100, 100]):
+            self.assertFalse(self.analytics.habits(now=self.now)['success'])
+            first = self.analytics.habits(now=self.now)
+            self.assertIs(self.analytics.habits(now=self.now), first)
+            self.assertIsNot(self.analytics.habits(now=self.now), first)
+
+        self.assertEqual(self.mock_db_handler.aggregate.call_count, 3)
+
+    def test_cache_drops_expired_and_oldest_reports(self):
+        """
+        Test storing a report drops the expired ones, and the oldest ones once CACHE_SIZE reports are cached.
+        """
+        self.analytics.CACHE_SIZE = 2
+        with patch('classes.admin_analytics.time.monotonic', side_effect=[0, 30, 40, 95]):
+            for limit in (1, 2, 3, 4):
+                self.analytics._store(('habits', 14, limit), {'success': True})
+                if limit == 3:
+                    # the first report was dropped to stay under CACHE_SIZE
+                    self.assertEqual(list(self.analytics._cache), [('habits', 14, 2), ('habits', 14, 3)])
+
+        # the second report expired
+        self.assertEqual(list(self.analytics._cache), [('habits', 14, 3), ('habits', 14, 4)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import datetime
+from unittest.mock import AsyncMock
+from classes.async_admin_analytics import AsyncAdminAnalytics
+from classes.admin_analytics import AdminAnalytics
+
+class TestAsyncAdminAnalytics(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_db_handler = AsyncMock()
+        self.analytics = AsyncAdminAnalytics(self.mock_db_handler, ttl=60)
+        self.now = datetime.datetime(2024, 1, 3, 15, 0)
+
+    async def test_habits_runs_the_shared_aggregation_once(self):
+        """
+        Test the habits report runs the aggregation of AdminAnalytics and is then served from the cache.
+        """
+        self.mock_db_handler.aggregate.return_value = [{'totals': [{'users': 2, 'habits': 5}]}]
+
+        result = await self.analytics.habits(abandoned_after=7, limit=10, now=self.now)
+
+        self.assertEqual((result['success'], result['users'], result['habits']), (True, 2, 5))
+        _, collection, pipeline, _ = AdminAnalytics._habits_report(7, 10, self.now)
+        self.mock_db_handler.aggregate.assert_awaited_once_with(collection, pipeline, allowDiskUse=True)
+        self.assertIs(await self.analytics.habits(abandoned_after=7, limit=10, now=self.now), result)
+        self.mock_db_handler.aggregate.assert_awaited_once()
+
+    async def test_activity_error(self):
+        """
+        Test a failed aggregation is reported and not cached.
+        """
+        self.mock_db_handler.aggregate.side_effect = Exception('timeout')
+
+        result = await self.analytics.activity(days=3, now=self.now)
+
+        self.assertEqual(result, {'success': False, 'error': 'An error occurred: timeout'})
+        self.assertEqual(self.analytics._cache, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from unittest.mock import AsyncMock
+from classes.async_habit_catalog import AsyncHabitCatalog
+
+class TestAsyncHabitCatalog(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_db_handler = AsyncMock()
+        self.mock_db_handler.find_document.return_value = {'_id': 'habit_catalog', 'version': 1}
+        self.mock_db_handler.list_documents.return_value = [{'_id': 'habit123', 'name': 'Read', 'type': 'daily'}]
+        self.catalog = AsyncHabitCatalog(self.mock_db_handler, check_interval=30)
+
+    async def test_get_cached(self):
+        """
+        Test the catalog is read once and then served from the cache.
+        """
+        entry, error = await self.catalog.get('daily')
+        cached_entry, _ = await self.catalog.get('daily')
+
+        self.assertIsNone(error)
+        self.assertIs(cached_entry, entry)
+        self.mock_db_handler.list_documents.assert_awaited_once()
+
+    async def test_invalidate(self):
+        """
+        Test invalidate increments the version and the next read goes to the database.
+        """
+        await self.catalog.get()
+        self.mock_db_handler.find_and_modify_document.return_value = {'_id': 'habit_catalog', 'version': 2}
+
+        self.assertEqual(await self.catalog.invalidate(), 2)
+        entry, _ = await self.catalog.get()
+
+        self.assertEqual(entry['version'], 2)
+        self.assertEqual(self.mock_db_handler.list_documents.await_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
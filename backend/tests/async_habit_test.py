@@ -0,0 +1,30 @@
+import unittest
+from unittest.mock import AsyncMock
+from classes.async_habit import AsyncHabit
+
+class TestAsyncHabit(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_db_handler = AsyncMock()
+
+    async def test_add_habit_invalid_type(self):
+        """
+        Test the shared validation rejects an invalid type without writing.
+        """
+        result = await AsyncHabit().add_habit(self.mock_db_handler, {'name': 'Read', 'type': 'monthly', 'description': ''})
+
+        self.assertFalse(result['success'])
+        self.mock_db_handler.add_document.assert_not_awaited()
+
+    async def test_list_all_by_type(self):
+        """
+        Test habits are filtered by type.
+        """
+        self.mock_db_handler.list_documents.return_value = [{'_id': 'habit123', 'type': 'daily'}]
+
+        result = await AsyncHabit.list_all(self.mock_db_handler, type='daily')
+
+        self.assertEqual(result, {'success': True, 'habits': [{'_id': 'habit123', 'type': 'daily'}]})
+        self.mock_db_handler.list_documents.assert_awaited_once_with('habits', {'type': 'daily'}, projection=AsyncHabit._projection())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import datetime
+from unittest.mock import AsyncMock, call
+from classes.async_habit_tracker import AsyncHabitTracker
+from classes.habit_tracker import HabitTracker
+
+class TestAsyncHabitTracker(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_db_handler = AsyncMock()
+        self.mock_db_handler.insert_documents.side_effect = lambda collection, documents, **kwargs: [document['_id'] for document in documents]
+        self.habit_tracker = AsyncHabitTracker(self.mock_db_handler)
+
+    async def test_update_daily_habit_matches_sync_writes(self):
+        """
+        Test a completion produces the same update and history as HabitTracker.
+        """
+        def user():
+            return {'_id': 'user123', 'habits': [{'_id': 'habit123', 'type': 'daily', 'start_range': '2023-01-01 10:00', 'end_range': '2023-01-02 10:00'}]}
+        self.mock_db_handler.find_document.return_value = user()
+        self.mock_db_handler.modify_document.return_value = True
+
+        result = await self.habit_tracker.update_daily_habit('test_user', 'habit123', '2023-01-01 12:00', True)
+
+        self.assertEqual(result, {'success': True, 'message': 'Habit updated successfully'})
+        completed = user()
+        plan, _ = HabitTracker._plan_completion(completed, 'habit123', '2023-01-01 12:00', True, 'daily', HabitTracker.PERIODS['daily'])
+        update, conditions, array_filters = HabitTracker._plan_update(plan)
+        update['$set']['summary'] = HabitTracker._summary(completed['habits'])
+        conditions.update(HabitTracker._version_condition(user()))
+        update['$push'] = {'pending_writes': HabitTracker._pending_write(user(), plan)}
+        self.assertEqual(self.mock_db_handler.modify_document.await_args_list, [
+            call('users', 'user123', update, conditions=conditions, array_filters=array_filters),
+            call('users', 'user123', {'$pull': {'pending_writes': {'_id': {'$in': ['user123:1']}}}})
+        ])
+        self.mock_db_handler.insert_documents.assert_awaited_once_with('completions', plan['documents'], ignore_duplicates=True)
+        self.mock_db_handler.increment_documents.assert_awaited_once()
+
+    async def test_remove_habit_deletes_history_on_server(self):
+        """
+        Test a removal awaits the shared operations of its pending write: the history is deleted without being read.
+        """
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123', 'version': 1, 'habits': [{'_id': 'habit123', 'type': 'daily'}]}
+        self.mock_db_handler.modify_document.return_value = True
+
+        result = await self.habit_tracker.remove_habit('test_user', 'habit123')
+
+        self.assertTrue(result['success'])
+        self.mock_db_handler.delete_documents.assert_awaited_once_with('completions', {'user_id': 'user123', 'habit_id': {'$in': ['habit123']}})
+        self.mock_db_handler.list_documents.assert_not_awaited()
+        self.mock_db_handler.modify_document.assert_awaited_with('users', 'user123', {'$pull': {'pending_writes': {'_id': {'$in': ['user123:2']}}}})
+
+    async def test_update_weekly_habit_wrong_type(self):
+        """
+        Test the shared validation rejects a habit of another type without writing.
+        """
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123', 'habits': [{'_id': 'habit123', 'type': 'daily'}]}
+
+        result = await self.habit_tracker.update_weekly_habit('test_user', 'habit123', '2023-01-01 12:00', False)
+
+        self.assertEqual(result, {'success': False, 'error': 'Habit type is not weekly'})
+        self.mock_db_handler.modify_document.assert_not_awaited()
+
+    async def test_assign_custom_habit(self):
+        """
+        Test a custom habit is pushed with its dates stored as datetimes.
+        """
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123', 'habits': []}
+
+        result = await self.habit_tracker.assign_custom_habit('test_user', 'Read', 'daily', '2023-01-01 10:00', '2023-01-02 10:00')
+
+        self.assertTrue(result['success'])
+        update = self.mock_db_handler.modify_document.call_args.args[2]
+        habit = update['$push']['habits']['$each'][0]
+        self.assertEqual(habit['start_range'], datetime.datetime(2023, 1, 1, 10, 0))
+        self.assertEqual(update['$set']['summary']['best'], {'all': habit['_id'], 'daily': habit['_id']})
+
+    async def test_longest_streak_habit_from_summary(self):
+        """
+        Test the habit is read from the summary without any aggregation.
+        """
+        self.mock_db_handler.find_document.side_effect = [{'_id': 'user123', 'summary': {'best': {'daily': 'habit123'}}},
+                                                          {'habits': [{'_id': 'habit123'}]}]
+
+        result = await self.habit_tracker.longest_streak_habit('test_user', 'daily')
+
+        self.assertEqual(result, {'success': True, 'habit': {'_id': 'habit123'}})
+        self.mock_db_handler.find_document.assert_awaited_with('users', {'username': 'test_user'}, projection={'_id': 0, 'habits': {'$elemMatch': {'_id': 'habit123'}}})
+        self.mock_db_handler.aggregate.assert_not_awaited()
+
+    async def test_longest_streak_habit(self):
+        """
+        Test a user without summary runs the shared aggregation.
+        """
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123'}
+        self.mock_db_handler.aggregate.return_value = [{'habit': {'_id': 'habit123'}}]
+
+        result = await self.habit_tracker.longest_streak_habit('test_user', 'daily')
+
+        self.assertEqual(result, {'success': True, 'habit': {'_id': 'habit123'}})
+        self.mock_db_handler.aggregate.assert_awaited_once_with('users', HabitTracker._select_pipeline('test_user', 'daily', 'longest_streak', -1))
+
+    async def test_complete_batch_retries_after_conflict(self):
+        """
+        Test a write that lost a race against another request is planned again from the reloaded user.
+        """
+        def user(version):
+            return {'_id': 'user123', 'version': version, 'habits': [{'_id': 'habit123', 'type': 'daily', 'start_range': '2023-01-01 10:00', 'end_range': '2023-01-02 10:00'}]}
+        self.mock_db_handler.find_document.side_effect = [user(1), user(2)]
+        self.mock_db_handler.modify_document.side_effect = [False, True, True]
+
+        result = await self.habit_tracker.complete_batch('test_user', [{'habit_id': 'habit123', 'completion_date': '2023-01-01 12:00'}])
+
+        self.assertTrue(result['success'])
+        versions = [call.kwargs['conditions']['version'] for call in self.mock_db_handler.modify_document.await_args_list[:2]]
+        self.assertEqual(versions, [1, 2])
+        self.mock_db_handler.insert_documents.assert_awaited_once()
+
+if __name__ == '__main__':
+    unittest.main()
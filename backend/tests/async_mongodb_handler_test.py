@@ -0,0 +1,124 @@
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from classes.async_mongodb_handler import AsyncMongoDBHandler
+from classes.mongodb_handler import MissingIndexError
+
+class AsyncCursor:
+    """Minimal motor cursor: async iteration and close()."""
+    def __init__(self, documents):
+        self.documents = list(documents)
+        self.close = AsyncMock()
+    def __aiter__(self):
+        return self
+    async def __anext__(self):
+        if not self.documents:
+            raise StopAsyncIteration
+        return self.documents.pop(0)
+
+class TestAsyncMongoDBHandler(unittest.IsolatedAsyncioTestCase):
+
+    @patch('classes.async_mongodb_handler.AsyncIOMotorClient')
+    def setUp(self, mock_motor_client):
+        """
+        Setup AsyncMongoDBHandler with a mocked motor client for testing.
+        """
+        self.db_name = 'mock_db'
+        self.handler = AsyncMongoDBHandler('mock_uri', self.db_name)
+        self.mock_db = mock_motor_client.return_value[self.db_name]
+        self.collection = self.mock_db['test_collection']
+        self.collection.create_index = AsyncMock()
+
+    async def test_ensure_indexes_on_first_use(self):
+        """
+        Test the declared indexes are created once, on the first collection access.
+        """
+        self.collection.find_one = AsyncMock(return_value=None)
+
+        await self.handler.find_document('test_collection', {'name': 'test'})
+        await self.handler.find_document('test_collection', {'name': 'test'})
+
+        self.assertEqual(self.collection.create_index.await_count, len(AsyncMongoDBHandler.INDEXES))
+
+    @patch('classes.async_mongodb_handler.time.monotonic')
+    async def test_missing_unique_index_refuses_collection(self, mock_monotonic):
+        """
+        Test a collection is not used while one of its unique indexes is missing, and the failed index is not retried before its delay.
+        """
+        self.collection.create_index.side_effect = [OperationFailure('duplicate key')] + [None] * (len(AsyncMongoDBHandler.INDEXES) - 1)
+        self.mock_db.__getitem__.side_effect = lambda name: self.collection
+        mock_monotonic.side_effect = [0, 0, 1]
+
+        with self.assertRaises(MissingIndexError):
+            await self.handler.find_document('users', {'username': 'test'})
+        with self.assertRaises(MissingIndexError):
+            await self.handler.find_document('users', {'username': 'test'})
+        self.assertFalse(self.handler.indexes_ready)
+        self.assertEqual(self.handler.pending_indexes, AsyncMongoDBHandler.INDEXES[:1])
+        self.assertEqual(self.collection.create_index.await_count, len(AsyncMongoDBHandler.INDEXES))
+
+    async def test_find_document(self):
+        """
+        Test find_document awaits find_one and serializes the '_id'.
+        """
+        document_id = ObjectId('507f1f77bcf86cd799439011')
+        self.collection.find_one = AsyncMock(return_value={'_id': document_id, 'name': 'test'})
+
+        result = await self.handler.find_document('test_collection', {'name': 'test'}, projection={'name': 1})
+
+        self.collection.find_one.assert_awaited_once_with({'name': 'test'}, projection={'name': 1}, sort=None)
+        self.assertEqual(result, {'_id': str(document_id), 'name': 'test'})
+
+    async def test_modify_document(self):
+        """
+        Test modify_document sends the conditions and array filters and reports the match.
+        """
+        document_id = '507f1f77bcf86cd799439011'
+        update = {'$set': {'habits.$[h0].streak': 1}}
+        self.collection.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+
+        result = await self.handler.modify_document('test_collection', document_id, update, conditions={'habits._id': 'h1'}, array_filters=[{'h0._id': 'h1'}])
+
+        self.collection.update_one.assert_awaited_once_with({'_id': ObjectId(document_id), 'habits._id': 'h1'}, update, array_filters=[{'h0._id': 'h1'}])
+        self.assertTrue(result)
+
+    async def test_insert_documents(self):
+        """
+        Test insert_documents inserts all documents with one insert_many call.
+        """
+        inserted_ids = [ObjectId('507f1f77bcf86cd799439011'), ObjectId('507f1f77bcf86cd799439012')]
+        self.collection.insert_many = AsyncMock(return_value=MagicMock(inserted_ids=inserted_ids))
+
+        result = await self.handler.insert_documents('test_collection', [{'name': 'a'}, {'name': 'b'}])
+
+        self.collection.insert_many.assert_awaited_once_with([{'name': 'a'}, {'name': 'b'}], ordered=True)
+        self.assertEqual(result, [str(inserted_id) for inserted_id in inserted_ids])
+
+    async def test_aggregate(self):
+        """
+        Test aggregate collects the whole cursor.
+        """
+        document_id = ObjectId('507f1f77bcf86cd799439011')
+        self.collection.aggregate.return_value.to_list = AsyncMock(return_value=[{'_id': document_id}])
+
+        result = await self.handler.aggregate('test_collection', [{'$match': {}}], allowDiskUse=True)
+
+        self.collection.aggregate.assert_called_once_with([{'$match': {}}], allowDiskUse=True)
+        self.assertEqual(result, [{'_id': str(document_id)}])
+
+    async def test_iterate_aggregate_closes_cursor(self):
+        """
+        Test iterate_aggregate yields the documents one at a time and closes the cursor.
+        """
+        cursor = AsyncCursor([{'_id': 1}, {'_id': 2}])
+        self.collection.aggregate.return_value = cursor
+
+        result = [document async for document in self.handler.iterate_aggregate('test_collection', [], batch_size=10)]
+
+        self.collection.aggregate.assert_called_once_with([], batchSize=10)
+        self.assertEqual(result, [{'_id': '1'}, {'_id': '2'}])
+        cursor.close.assert_awaited_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from unittest.mock import AsyncMock
+from werkzeug.security import check_password_hash, generate_password_hash
+from pymongo.errors import DuplicateKeyError
+from classes.async_user import AsyncUser
+
+class TestAsyncUser(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.mock_db_handler = AsyncMock()
+
+    async def test_register(self):
+        """
+        Test register stores a PBKDF2 hash, never the password.
+        """
+        self.mock_db_handler.insert_document.return_value = 'user123'
+        user = AsyncUser(username='testuser', password='testpass', email='test@example.com', name='Test')
+
+        result = await user.register(self.mock_db_handler)
+
+        self.assertEqual(result, {'success': True, 'data': {'_id': 'user123', 'name': 'Test', 'username': 'testuser'}})
+        stored = self.mock_db_handler.insert_document.call_args.args[1]
+        self.assertTrue(check_password_hash(stored['password'], 'testpass'))
+
+    async def test_register_duplicate_email(self):
+        """
+        Test a duplicate key on the email index is reported as an existing email.
+        """
+        self.mock_db_handler.insert_document.side_effect = DuplicateKeyError('E11000 duplicate key error index: email_1', 11000, {'keyPattern': {'email': 1}})
+        user = AsyncUser(username='testuser', password='testpass', email='test@example.com', name='Test')
+
+        result = await user.register(self.mock_db_handler)
+
+        self.assertEqual(result, {'success': False, 'error': 'Email already exists'})
+
+    async def test_login(self):
+        """
+        Test login checks the password against the stored hash.
+        """
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123', 'username': 'testuser', 'name': 'Test', 'password': generate_password_hash('testpass')}
+
+        self.assertTrue((await AsyncUser(username='testuser', password='testpass').login(self.mock_db_handler))['success'])
+        self.assertEqual(await AsyncUser(username='testuser', password='wrong').login(self.mock_db_handler), {'success': False, 'error': 'Invalid credentials'})
+
+if __name__ == '__main__':
+    unittest.main()
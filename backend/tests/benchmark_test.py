@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import MagicMock
+import benchmark
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_scenario_days(self):
+        """
+        Test the history is long enough for the requested completions, weekly habits completing every 7th day.
+        """
+        templates = [{'type': 'daily'}, {'type': 'weekly'}]
+
+        self.assertEqual(benchmark.scenario_days(templates, 1, 1000), 1000)
+        self.assertEqual(benchmark.scenario_days(templates, 2, 800), 700)
+        self.assertEqual(benchmark.scenario_days(templates, 1000, 10), 1)
+
+    def test_latency_summary(self):
+        """
+        Test latencies are reported in milliseconds with nearest-rank percentiles.
+        """
+        summary = benchmark.latency_summary([i / 1000 for i in range(100, 0, -1)])
+
+        self.assertEqual(summary, {'min': 1.0, 'p50': 50.0, 'p95': 95.0, 'max': 100.0, 'mean': 50.5})
+
+    def test_measure_counts_round_trips_and_errors(self):
+        """
+        Test warm-up calls are not timed and the round trips of the timed calls are averaged.
+        """
+        # one warm-up call, four timed calls (two failing) and the traced one
+        results = iter([True, True, False, True, False, True])
+        def call():
+            benchmark.round_trips.started(MagicMock())
+            benchmark.round_trips.started(MagicMock())
+            return {'success': next(results)}
+
+        result = benchmark.measure(call, iterations=4, warmup=1)
+
+        self.assertEqual((result['iterations'], result['errors'], result['round_trips']), (4, 2, 2.0))
+        self.assertIn('peak_memory_kb', result)
+
+    def test_compare(self):
+        """
+        Test the p50 latencies are matched by scenario and operation with the baseline run.
+        """
+        def run(p50):
+            return {'scenarios': [{'habits': 10, 'completions': 1000, 'operations': [
+                {'layer': 'engine', 'operation': 'check_in', 'latency_ms': {'p50': p50}}
+            ]}]}
+
+        self.assertEqual(benchmark.compare(run(3.0), run(2.0)), [(10, 1000, 'engine', 'check_in', 2.0, 3.0, 1.5)])
+        self.assertEqual(benchmark.compare(run(3.0), {'scenarios': []}), [])
+
+if __name__ == '__main__':
+    unittest.main()
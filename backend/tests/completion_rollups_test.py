@@ -0,0 +1,102 @@
+import unittest
+import datetime
+from unittest.mock import MagicMock
+from classes.completion_rollups import CompletionRollups
+from classes.habit_tracker import HabitTracker
+
+class TestCompletionRollups(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup CompletionRollups with a mocked MongoDBHandler and the habit periods.
+        """
+        self.mock_db_handler = MagicMock()
+        self.rollups = CompletionRollups(self.mock_db_handler, HabitTracker.PERIODS)
+
+    def test_increments(self):
+        """
+        Test entries are counted by day, status, type and category, and a catch-up once per missed period.
+        """
+        habits = {'h1': {'_id': 'h1', 'type': 'daily', 'category': 'Health.Sport'}}
+        documents = [
+            {'user_id': 'u1', 'habit_id': 'h1', 'datetime': datetime.datetime(2024, 1, 1, 10, 0), 'status': 'completed'},
+            {'user_id': 'u1', 'habit_id': 'h1', 'datetime': datetime.datetime(2024, 1, 1, 20, 0), 'status': 'in progress'},
+            {'user_id': 'u1', 'habit_id': 'h1', 'datetime': '2024-01-05 09:00', 'status': 'failed', 'missed': 2, 'missed_since': '2024-01-02 00:00'}
+        ]
+
+        increments = self.rollups.increments(habits, documents)
+
+        category = 'Health．Sport'
+        self.assertEqual(increments[('u1', datetime.datetime(2024, 1, 1))], {
+            'completed': 1, 'types.daily.completed': 1, f'categories.{category}.completed': 1,
+            'in_progress': 1, 'types.daily.in_progress': 1, f'categories.{category}.in_progress': 1
+        })
+        self.assertEqual(sorted(day for _, day in increments), [datetime.datetime(2024, 1, day) for day in (1, 2, 3)])
+        self.assertEqual(increments[('u1', datetime.datetime(2024, 1, 3))]['failed'], 1)
+
+    def test_increment_requests(self):
+        """
+        Test the counters become one (query, counters) upsert per user and day.
+        """
+        day = datetime.datetime(2024, 1, 1)
+
+        requests = CompletionRollups.increment_requests({('u1', day): {'completed': 2}, ('u2', day): {'failed': 1}})
+
+        self.assertEqual(requests, [({'user_id': 'u1', 'day': day}, {'completed': 2}), ({'user_id': 'u2', 'day': day}, {'failed': 1})])
+
+    def test_habit_counts(self):
+        """
+        Test entries are counted by habit and status, a catch-up once per missed period, on top of the given counters.
+        """
+        documents = [
+            {'habit_id': 'h1', 'status': 'completed'},
+            {'habit_id': 'h1', 'status': 'failed', 'missed': 3},
+            {'habit_id': 'h2', 'status': 'in progress'}
+        ]
+
+        counts = CompletionRollups.habit_counts(documents, {'h1': {'completed': 2}})
+
+        self.assertEqual(counts, {'h1': {'completed': 3, 'failed': 3}, 'h2': {'in_progress': 1}})
+
+    def test_record_removed_history(self):
+        """
+        Test removed entries are subtracted with one $inc upsert per day, on behalf of the write removing them.
+        """
+        documents = [{'user_id': 'u1', 'habit_id': 'gone', 'datetime': '2024-01-01 10:00', 'status': 'failed'}]
+
+        self.rollups.record({}, documents, sign=-1, operation='u1:4:pull')
+
+        self.mock_db_handler.increment_documents.assert_called_once_with('daily_rollups', [({'user_id': 'u1', 'day': datetime.datetime(2024, 1, 1)}, {'failed': -1})], operation='u1:4:pull')
+
+    def test_series_weekly(self):
+        """
+        Test the series reads one range of days and sums them per week, with empty weeks and rates.
+        """
+        self.mock_db_handler.aggregate.return_value = [
+            {'day': datetime.datetime(2024, 1, 2), 'completed': 3, 'in_progress': 0, 'failed': 1},
+            {'day': datetime.datetime(2024, 1, 4), 'completed': 0, 'in_progress': 1, 'failed': 0}
+        ]
+
+        result = self.rollups.series('u1', start='2024-01-01', end='2024-01-14', interval='week', type='daily')
+
+        pipeline = self.mock_db_handler.aggregate.call_args.args[1]
+        self.assertEqual(pipeline[0], {'$match': {'day': {'$gte': datetime.datetime(2024, 1, 1), '$lt': datetime.datetime(2024, 1, 15)}, 'user_id': 'u1'}})
+        self.assertEqual(pipeline[1]['$group']['completed'], {'$sum': '$types.daily.completed'})
+        self.assertEqual((result['start'], result['end']), ('2024-01-01', '2024-01-14'))
+        self.assertEqual(result['series'], [
+            {'date': '2024-01-01', 'completed': 3, 'in_progress': 1, 'failed': 1, 'total': 5, 'completion_rate': 0.8},
+            {'date': '2024-01-08', 'completed': 0, 'in_progress': 0, 'failed': 0, 'total': 0, 'completion_rate': None}
+        ])
+
+    def test_series_invalid_range(self):
+        """
+        Test invalid intervals, dates and ranges are rejected without reading the rollups.
+        """
+        self.assertFalse(self.rollups.series(interval='month')['success'])
+        self.assertFalse(self.rollups.series(start='2024-13-01')['success'])
+        self.assertFalse(self.rollups.series(start='2024-02-01', end='2024-01-01')['success'])
+        self.assertFalse(self.rollups.series(start='2020-01-01', end='2024-01-01')['success'])
+        self.mock_db_handler.aggregate.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+import unittest
+import datetime
+import io
+import json
+import os
+import random
+import tempfile
+from unittest.mock import MagicMock, call, patch
+from bson import ObjectId
+from data_simulator import DataSimulator
+
+class TestDataSimulator(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup a DataSimulator on a temporary configuration file and a mocked MongoDBHandler.
+        """
+        config = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        config.write('{"test_user": {}}')
+        config.close()
+        self.addCleanup(os.remove, config.name)
+        self.config_file = config.name
+
+        patcher = patch('data_simulator.MongoDBHandler')
+        self.mock_db_handler = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+        self.simulator = DataSimulator('mongodb://localhost:27017', 'healthhub', config_file=self.config_file)
+        self.simulator.run_simulation = MagicMock(return_value=True)
+
+    def test_seed_records_fingerprint(self):
+        """
+        Test a first seed runs the simulation and saves the configuration fingerprint.
+        """
+        self.mock_db_handler.find_document.return_value = None
+
+        self.assertTrue(self.simulator.seed())
+
+        self.simulator.run_simulation.assert_called_once()
+        query, update = self.mock_db_handler.db['system'].update_one.call_args.args
+        self.assertEqual(query, {'_id': 'seed'})
+        self.assertEqual(update['$set']['fingerprint'], self.simulator.config_fingerprint(self.config_file))
+
+    def test_seed_skips_unchanged_config(self):
+        """
+        Test seeding again with the same configuration does not run the simulation.
+        """
+        fingerprint = self.simulator.config_fingerprint(self.config_file)
+        self.mock_db_handler.find_document.return_value = {'_id': 'seed', 'fingerprint': fingerprint}
+
+        self.assertTrue(self.simulator.seed())
+
+        self.simulator.run_simulation.assert_not_called()
+        self.mock_db_handler.db['system'].update_one.assert_not_called()
+
+    def test_seed_changed_config_or_force(self):
+        """
+        Test a changed configuration, or force, runs the simulation again.
+        """
+        self.mock_db_handler.find_document.return_value = {'_id': 'seed', 'fingerprint': 'old'}
+        self.assertTrue(self.simulator.seed())
+
+        fingerprint = self.simulator.config_fingerprint(self.config_file)
+        self.mock_db_handler.find_document.return_value = {'_id': 'seed', 'fingerprint': fingerprint}
+        self.assertTrue(self.simulator.seed(force=True))
+
+        self.assertEqual(self.simulator.run_simulation.call_count, 2)
+
+    def test_seed_failed_simulation(self):
+        """
+        Test the fingerprint is not saved when the simulation fails.
+        """
+        self.mock_db_handler.find_document.return_value = None
+        self.simulator.run_simulation.return_value = False
+
+        self.assertFalse(self.simulator.seed())
+
+        self.mock_db_handler.db['system'].update_one.assert_not_called()
+
+    def scale_config(self):
+        """
+        Build a configuration with one daily predefined habit and one weekly custom habit.
+        """
+        return {
+            'habits': [{'name': 'Breakfast', 'type': 'daily', 'category': 'Food', 'subcategory': 'Meal', 'description': 'Morning meal'}],
+            'simulation': {
+                'habit_time_ranges': {'Breakfast': {'start': '06:00', 'end': '09:00'}},
+                'custom_habits': [{'name': 'Brunch', 'type': 'weekly', 'category': 'Social', 'subcategory': 'Food', 'description': 'Brunch', 'start': '10:00', 'end': '12:00'}]
+            }
+        }
+
+    def test_simulate_scale_user(self):
+        """
+        Test a scale user gets the streaks and moved ranges of the regular completion logic, in memory.
+        """
+        first_day = datetime.datetime(2024, 1, 1)
+        templates = self.simulator.scale_habit_templates(self.scale_config())
+        user = self.simulator.build_scale_user(3, templates, 3, first_day, 'hash', {'Breakfast': 'habit1'}, random.Random(1))
+
+        rng = MagicMock()
+        rng.random.return_value = 0.0
+        documents = [document for _, document in self.simulator.simulate_scale_user(user, 14, rng, 0.8)]
+
+        self.assertEqual(user['username'], 'simuser0000003')
+        self.assertTrue(user['simulated'])
+        self.assertEqual([habit['name'] for habit in user['habits']], ['Breakfast', 'Brunch', 'Breakfast 2'])
+        self.assertEqual(user['habits'][0]['habit_id'], 'habit1')
+        self.assertEqual(len(documents), 14 + 2 + 14)
+        breakfast = user['habits'][0]
+        self.assertEqual((breakfast['streak'], breakfast['longest_streak'], breakfast['completion_count']), (14, 14, 14))
+        self.assertEqual(breakfast['start_range'], datetime.datetime(2024, 1, 15, 6, 0))
+        self.assertEqual(user['habits'][1]['start_range'], datetime.datetime(2024, 1, 15, 10, 0))
+        self.assertTrue(all(document['user_id'] == str(user['_id']) for document in documents))
+
+    def test_simulate_scale_users_chunks(self):
+        """
+        Test users and completions are written in chunks and the log is one JSON object per line.
+        """
+        db_handler = MagicMock()
+        db_handler.list_documents.return_value = []
+        log_file = io.StringIO()
+
+        with patch('data_simulator.generate_password_hash', return_value='hash'):
+            completions = self.simulator.simulate_scale_users(db_handler, self.scale_config(), 0, 5, 2, 7, datetime.datetime(2024, 1, 1),
+                                                              log_file, random.Random(1), chunk_size=4)
+
+        self.assertEqual(completions, 5 * (7 + 1))
+        inserted = {'users': [], 'completions': []}
+        for call in db_handler.insert_documents.call_args_list:
+            collection, documents = call.args
+            self.assertLessEqual(len(documents), 4)
+            inserted[collection].extend(documents)
+        self.assertEqual(len(inserted['users']), 5)
+        self.assertEqual(sum(sum(habit['status_counts'].values()) for user in inserted['users'] for habit in user['habits']), completions)
+        self.assertEqual(len(inserted['completions']), completions)
+        lines = log_file.getvalue().splitlines()
+        self.assertEqual(len(lines), completions)
+        self.assertEqual(json.loads(lines[0])['user'], 'simuser0000000')
+
+    def test_reset_scale_users(self):
+        """
+        Test only the users marked 'simulated' are deleted, with their history and rollups in chunks.
+        """
+        db_handler = MagicMock()
+        user_ids = [ObjectId() for _ in range(3)]
+        db_handler.iterate_documents.return_value = iter([{'_id': user_id} for user_id in user_ids])
+
+        self.simulator.reset_scale_users(db_handler, chunk_size=2)
+
+        db_handler.iterate_documents.assert_called_once_with('users', {'simulated': True}, projection={'_id': 1}, batch_size=2)
+        self.assertEqual(db_handler.delete_documents.call_args_list, [
+            call('completions', {'user_id': {'$in': [str(user_ids[0]), str(user_ids[1])]}}),
+            call('daily_rollups', {'user_id': {'$in': [str(user_ids[0]), str(user_ids[1])]}}),
+            call('completions', {'user_id': {'$in': [str(user_ids[2])]}}),
+            call('daily_rollups', {'user_id': {'$in': [str(user_ids[2])]}}),
+            call('users', {'simulated': True})
+        ])
+
+    def test_run_scale_shard_deterministic(self):
+        """
+        Test a shard regenerates exactly the same documents from the same global seed, and different ones for another shard.
+        """
+        def run(shard):
+            self.mock_db_handler.reset_mock()
+            self.mock_db_handler.list_documents.return_value = []
+            with patch('data_simulator.generate_password_hash', return_value='hash'):
+                result = self.simulator.run_scale_shard(self.scale_config(), shard, 0, 3, 2, 10, datetime.datetime(2024, 1, 1), None, 42, 100)
+            documents = [call.args for call in self.mock_db_handler.insert_documents.call_args_list]
+            return result, documents
+
+        result, documents = run(0)
+        _, same_documents = run(0)
+        _, other_documents = run(1)
+
+        self.assertEqual((result['shard'], result['users'], result['completions']), (0, 3, 3 * (10 + 2)))
+        self.assertEqual(documents, same_documents)
+        self.assertNotEqual(documents, other_documents)
+        self.mock_db_handler.close.assert_called_once()
+
+    def test_merge_shard_logs(self):
+        """
+        Test the shard logs are concatenated in shard order and removed.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        log_path = os.path.join(directory, 'interactions.ndjson')
+        shard_paths = []
+        for shard in range(2):
+            shard_paths.append(f'{log_path}.shard{shard}')
+            with open(shard_paths[-1], 'w') as shard_file:
+                shard_file.write(f'{{"shard": {shard}}}\n')
+
+        self.simulator.merge_shard_logs(log_path, shard_paths)
+
+        with open(log_path) as log_file:
+            self.assertEqual(log_file.read(), '{"shard": 0}\n{"shard": 1}\n')
+        os.remove(log_path)
+        self.assertFalse(any(os.path.exists(path) for path in shard_paths))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from classes.habit_catalog import HabitCatalog
+
+class TestHabitCatalog(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup HabitCatalog with a mocked MongoDBHandler and catalog version 1.
+        """
+        self.mock_db_handler = MagicMock()
+        self.mock_db_handler.find_document.return_value = {'_id': 'habit_catalog', 'version': 1}
+        self.mock_db_handler.list_documents.return_value = [{'_id': 'habit123', 'name': 'Read', 'type': 'daily'}]
+        self.catalog = HabitCatalog(self.mock_db_handler, max_age=60, check_interval=30)
+
+    def test_get_cached(self):
+        """
+        Test the catalog is read and serialized once, then served from the cache with the same strong ETag.
+        """
+        entry, error = self.catalog.get()
+        cached_entry, _ = self.catalog.get()
+
+        self.assertIsNone(error)
+        self.assertIs(cached_entry, entry)
+        self.assertEqual(entry['body'], '{"success": true, "habits": [{"_id": "habit123", "name": "Read", "type": "daily"}]}')
+        self.assertEqual(len(entry['etag']), 32)
+        self.assertEqual(self.catalog.cache_control, 'public, max-age=60, must-revalidate')
+        self.mock_db_handler.list_documents.assert_called_once()
+        self.mock_db_handler.find_document.assert_called_once()
+
+    def test_get_per_type(self):
+        """
+        Test each 'type' filter has its own entry.
+        """
+        self.catalog.get()
+        self.catalog.get('daily')
+
+        self.assertEqual(self.mock_db_handler.list_documents.call_count, 2)
+        self.assertEqual(self.mock_db_handler.list_documents.call_args.args[1], {'type': 'daily'})
+
+    @patch('classes.habit_catalog.time.monotonic')
+    def test_get_version_changed_by_other_process(self, mock_monotonic):
+        """
+        Test a version incremented by another process is seen after 'check_interval' and the catalog is read again.
+        """
+        mock_monotonic.return_value = 100.0
+        entry, _ = self.catalog.get()
+
+        self.mock_db_handler.find_document.return_value = {'_id': 'habit_catalog', 'version': 2}
+        mock_monotonic.return_value = 110.0
+        self.assertIs(self.catalog.get()[0], entry)
+
+        mock_monotonic.return_value = 131.0
+        self.mock_db_handler.list_documents.return_value = []
+        new_entry, _ = self.catalog.get()
+
+        self.assertEqual(new_entry['version'], 2)
+        self.assertNotEqual(new_entry['etag'], entry['etag'])
+
+    def test_invalidate(self):
+        """
+        Test invalidate increments the version in the database and drops the cache of this process.
+        """
+        self.catalog.get()
+        self.mock_db_handler.find_and_modify_document.return_value = {'_id': 'habit_catalog', 'version': 2}
+
+        self.assertEqual(self.catalog.invalidate(), 2)
+        self.catalog.get()
+
+        self.mock_db_handler.find_and_modify_document.assert_called_once_with('system', {'_id': 'habit_catalog'}, {'$inc': {'version': 1}},
+                                                                               projection={'version': 1}, upsert=True)
+        self.assertEqual(self.mock_db_handler.list_documents.call_count, 2)
+
+    def test_get_error_not_cached(self):
+        """
+        Test a failed read is returned as the error and not cached.
+        """
+        self.mock_db_handler.list_documents.side_effect = Exception('Database error')
+
+        entry, error = self.catalog.get()
+
+        self.assertIsNone(entry)
+        self.assertFalse(error['success'])
+        self.assertEqual(self.catalog._entries, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -51,11 +51,22 @@ class TestHabit(unittest.TestCase):
 
         response = Habit.list_all(mock_db_handler_instance)
         
-        mock_db_handler_instance.list_documents.assert_called_once_with('habits')
+        mock_db_handler_instance.list_documents.assert_called_once_with('habits', None, projection=Habit._projection())
         self.assertTrue(response['success'])
         self.assertIn('habits', response)
         self.assertEqual(len(response['habits']), 1)
         self.assertEqual(response['habits'][0]['name'], 'Test Habit')
 
+    def test_add_habit_drops_credentials(self):
+        """
+        Test the admin credentials merged into the request data are not stored with the habit.
+        """
+        mock_db_handler_instance = MagicMock()
+        mock_db_handler_instance.add_document.return_value = {**self.habit_data, '_id': self.habit_id}
+
+        self.habit.add_habit(mock_db_handler_instance, {**self.habit_data, 'username': 'admin', 'password': 'admin1234'})
+
+        mock_db_handler_instance.add_document.assert_called_once_with('habits', self.habit_data)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
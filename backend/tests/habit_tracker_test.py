@@ -1,10 +1,12 @@
 import unittest
-from unittest.mock import MagicMock
+import datetime
+from unittest.mock import MagicMock, call
 from classes.habit_tracker import HabitTracker
 
 class TestHabitTracker(unittest.TestCase):
     def setUp(self):
         self.mock_db_handler = MagicMock()
+        self.mock_db_handler.insert_documents.side_effect = lambda collection, documents, **kwargs: [document['_id'] for document in documents]
         self.habit_tracker = HabitTracker(self.mock_db_handler)
 
     def test_init(self):
@@ -38,6 +40,10 @@ class TestHabitTracker(unittest.TestCase):
             print(f"Test failed with error: {result.get('error') or result.get('message')}")
         self.assertTrue(result['success'], msg=f"Test failed with error: {result.get('error') or result.get('message')}")
         self.assertEqual(result['message'], 'Habit assigned successfully')
+        habit = self.mock_db_handler.modify_document.call_args.args[2]['$push']['habits']['$each'][0]
+        self.assertEqual(self.mock_db_handler.modify_document.call_args.args[2]['$inc'], {'version': 1})
+        self.assertEqual(habit['start_range'], datetime.datetime(2023, 1, 1, 10, 0))
+        self.assertEqual(habit['end_range'], datetime.datetime(2023, 1, 2, 10, 0))
 
 
     def test_assign_habit_invalid_date_format(self):
@@ -141,7 +147,7 @@ class TestHabitTracker(unittest.TestCase):
 
     def test_assign_custom_habit_exception_during_assignment(self):
         self.mock_db_handler.find_document.return_value = {'_id': 'user_id', 'username': 'test_user'}
-        self.mock_db_handler.update_document.side_effect = Exception('Database update failed')
+        self.mock_db_handler.modify_document.side_effect = Exception('Database update failed')
         result = self.habit_tracker.assign_custom_habit(
             username='test_user',
             name='Custom Habit',
@@ -182,6 +188,129 @@ class TestHabitTracker(unittest.TestCase):
         self.assertEqual(updated_habit['longest_streak'], 1)
         self.assertEqual(updated_habit['status'], 'in progress')
 
+    def test_update_daily_habit_sends_only_changes(self):
+        habit_id = 'habit123'
+        user = {
+            '_id': 'user123',
+            'username': 'test_user',
+            'habits': [
+                {'_id': 'other', 'type': 'daily', 'completion_datetimes': [{'datetime': '2022-12-31 10:00'}]},
+                {'_id': habit_id, 'type': 'daily', 'start_range': '2023-01-01 10:00', 'end_range': '2023-01-02 10:00'}
+            ]
+        }
+        self.mock_db_handler.find_document.return_value = user
+        self.habit_tracker.update_daily_habit('test_user', habit_id, '2023-01-03 10:00', True)
+        update = self.mock_db_handler.modify_document.call_args_list[0].args[2]
+        self.assertEqual(update['$set']['habits.$[h0].start_range'], datetime.datetime(2023, 1, 2, 10, 0))
+        self.assertEqual(update['$set']['habits.$[h0].status'], 'failed')
+        self.assertEqual(update['$inc'], {'habits.$[h0].completion_count': 1, 'habits.$[h0].status_counts.failed': 1, 'version': 1})
+        self.assertNotIn('habits', update['$set'])
+        self.assertEqual(self.mock_db_handler.modify_document.call_args_list[0].kwargs['array_filters'], [{'h0._id': habit_id}])
+        self.mock_db_handler.insert_documents.assert_called_once_with('completions', [{
+            '_id': 'user123:1:0',
+            'user_id': 'user123',
+            'habit_id': habit_id,
+            'datetime': datetime.datetime(2023, 1, 3, 10, 0),
+            'status': 'failed',
+            'streak': 0,
+            'longest_streak': 0
+        }], ignore_duplicates=True)
+        # the history write is recorded by the user update and cleared once applied
+        self.assertEqual(update['$push']['pending_writes']['_id'], 'user123:1')
+        self.assertEqual(self.mock_db_handler.modify_document.call_args, call('users', 'user123', {'$pull': {'pending_writes': {'_id': {'$in': ['user123:1']}}}}))
+
+    def test_update_daily_habit_succeeds_when_history_write_fails(self):
+        """
+        Test a failure after the user update is not reported, and the history write is left pending.
+        """
+        self.mock_db_handler.find_document.return_value = self.versioned_user(4)
+        self.mock_db_handler.insert_documents.side_effect = Exception('network error')
+
+        result = self.habit_tracker.update_daily_habit('test_user', 'habit123', '2023-01-01 12:00', True)
+
+        self.assertEqual(result, {'success': True, 'message': 'Habit updated successfully'})
+        self.mock_db_handler.modify_document.assert_called_once()
+        self.mock_db_handler.increment_documents.assert_not_called()
+
+    def test_pending_writes_applied_by_next_write(self):
+        """
+        Test the history writes left pending by an earlier request are applied again before the new one, each counted once in the rollups.
+        """
+        user = self.versioned_user(5)
+        document = {'_id': 'user123:5:0', 'user_id': 'user123', 'habit_id': 'habit123', 'datetime': datetime.datetime(2022, 12, 31, 11, 0), 'status': 'completed'}
+        user['pending_writes'] = [{'_id': 'user123:5', 'documents': [document], 'habits': [{'_id': 'habit123', 'type': 'daily', 'category': None}], 'pull': []}]
+        self.mock_db_handler.find_document.return_value = user
+
+        result = self.habit_tracker.update_daily_habit('test_user', 'habit123', '2023-01-01 12:00', True)
+
+        self.assertTrue(result['success'])
+        self.assertEqual([call.args[1][0]['_id'] for call in self.mock_db_handler.insert_documents.call_args_list], ['user123:5:0', 'user123:6:0'])
+        # the rollup documents already counting a write skip it
+        recorded = [(recorded.args[1][0][0]['day'], recorded.kwargs['operation']) for recorded in self.mock_db_handler.increment_documents.call_args_list]
+        self.assertEqual(recorded, [(datetime.datetime(2022, 12, 31), 'user123:5'), (datetime.datetime(2023, 1, 1), 'user123:6')])
+        self.assertEqual(self.mock_db_handler.modify_document.call_args, call('users', 'user123', {'$pull': {'pending_writes': {'_id': {'$in': ['user123:5', 'user123:6']}}}}))
+
+    def versioned_user(self, version, habits=True):
+        habits = [{'_id': 'habit123', 'type': 'daily', 'start_range': '2023-01-01 10:00', 'end_range': '2023-01-02 10:00'}] if habits else []
+        return {'_id': 'user123', 'username': 'test_user', 'version': version, 'habits': habits}
+
+    def test_update_daily_habit_version_condition(self):
+        """
+        Test the update only matches the version of the user document it was computed from.
+        """
+        self.mock_db_handler.find_document.return_value = self.versioned_user(7)
+        self.habit_tracker.update_daily_habit('test_user', 'habit123', '2023-01-01 12:00', True)
+        conditions = self.mock_db_handler.modify_document.call_args_list[0].kwargs['conditions']
+        self.assertEqual(conditions, {'habits._id': {'$all': ['habit123']}, 'version': 7})
+
+    def test_update_daily_habit_retries_after_conflict(self):
+        """
+        Test a concurrent write is not overwritten: the user is reloaded and the completion applied on its new state.
+        """
+        first, current = self.versioned_user(1), self.versioned_user(2)
+        current['habits'][0].update({'streak': 4, 'longest_streak': 4})
+        self.mock_db_handler.find_document.side_effect = [first, current]
+        self.mock_db_handler.modify_document.side_effect = [False, True, True]
+
+        result = self.habit_tracker.update_daily_habit('test_user', 'habit123', '2023-01-01 12:00', True)
+
+        self.assertEqual(result, {'success': True, 'message': 'Habit updated successfully'})
+        last_call = self.mock_db_handler.modify_document.call_args_list[1]
+        self.assertEqual(last_call.kwargs['conditions']['version'], 2)
+        self.assertEqual(last_call.args[2]['$set']['habits.$[h0].streak'], 5)
+        self.mock_db_handler.insert_documents.assert_called_once()
+
+    def test_update_daily_habit_gives_up_after_attempts(self):
+        """
+        Test the retries are bounded and nothing is inserted when every attempt loses.
+        """
+        self.mock_db_handler.find_document.side_effect = lambda *args, **kwargs: self.versioned_user(1)
+        self.mock_db_handler.modify_document.return_value = False
+
+        result = self.habit_tracker.update_daily_habit('test_user', 'habit123', '2023-01-01 12:00', True)
+
+        self.assertEqual(result, HabitTracker.CONFLICT_ERROR)
+        self.assertEqual(self.mock_db_handler.modify_document.call_count, HabitTracker.WRITE_ATTEMPTS)
+        self.mock_db_handler.insert_documents.assert_not_called()
+
+    def test_update_daily_habit_removed_concurrently(self):
+        """
+        Test a habit removed by another request while completing it is reported as not found.
+        """
+        self.mock_db_handler.find_document.side_effect = [self.versioned_user(1), self.versioned_user(2, habits=False)]
+        self.mock_db_handler.modify_document.return_value = False
+
+        result = self.habit_tracker.update_daily_habit('test_user', 'habit123', '2023-01-01 12:00', True)
+
+        self.assertEqual(result, {'success': False, 'error': 'Habit not found'})
+
+    def test_update_daily_habit_wrong_type(self):
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123', 'habits': [{'_id': 'habit123', 'type': 'weekly'}]}
+        result = self.habit_tracker.update_daily_habit('test_user', 'habit123', '2023-01-01 10:00', True)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'Habit type is not daily')
+        self.mock_db_handler.modify_document.assert_not_called()
+
     def test_update_daily_habit_user_not_found(self):
         self.mock_db_handler.find_document.return_value = None
         result = self.habit_tracker.update_daily_habit(
@@ -192,6 +321,22 @@ class TestHabitTracker(unittest.TestCase):
         )
         self.assertFalse(result['success'])
         self.assertEqual(result['error'], 'User not found')
+    def test_update_daily_habit_with_loaded_user(self):
+        habit_id = 'habit123'
+        user = {
+            '_id': 'user123',
+            'username': 'test_user',
+            'habits': [{
+                '_id': habit_id,
+                'type': 'daily',
+                'start_range': '2023-01-01 10:00',
+                'end_range': '2023-01-02 10:00'
+            }]
+        }
+        result = self.habit_tracker.update_daily_habit('test_user', habit_id, '2023-01-01 10:00', True, user=user)
+        self.assertTrue(result['success'])
+        self.mock_db_handler.find_document.assert_not_called()
+        self.assertEqual(user['habits'][0]['streak'], 1)
     #
     # UPDATE WEEKLY HABIT
     #
@@ -234,35 +379,235 @@ class TestHabitTracker(unittest.TestCase):
         self.assertFalse(result['success'])
         self.assertEqual(result['error'], 'User not found')
 
+    def test_list_habit_history(self):
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123', 'habits': [{'_id': 'habit123'}]}
+        self.mock_db_handler.list_documents.return_value = [{'datetime': '2023-01-01 10:00', 'status': 'completed'}]
+        result = self.habit_tracker.list_habit_history('test_user', 'habit123')
+        self.assertTrue(result['success'])
+        self.assertEqual(len(result['history']), 1)
+        self.mock_db_handler.list_documents.assert_called_once_with('completions', {'user_id': 'user123', 'habit_id': 'habit123'})
+
+    #
+    # REMOVE HABIT
+    #
+    def test_remove_habit_success(self):
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123', 'version': 3, 'habits': [{'_id': 'habit123'}, {'_id': 'habit456', 'type': 'daily'}]}
+        result = self.habit_tracker.remove_habit('test_user', 'habit123')
+        self.assertTrue(result['success'])
+        summary = {'status': {'in progress': 1}, 'completions': 0, 'best': {'all': 'habit456', 'daily': 'habit456'}, 'worst': {'all': 'habit456', 'daily': 'habit456'}}
+        pending = {'_id': 'user123:4', 'documents': [], 'habits': [], 'pull': ['habit123']}
+        self.assertEqual(self.mock_db_handler.modify_document.call_args_list, [
+            call('users', 'user123', {'$set': {'summary': summary}, '$inc': {'version': 1}, '$pull': {'habits': {'_id': {'$in': ['habit123']}}},
+                                      '$push': {'pending_writes': pending}}, conditions={'habits._id': {'$all': ['habit123']}, 'version': 3}, array_filters=None),
+            call('users', 'user123', {'$pull': {'pending_writes': {'_id': {'$in': ['user123:4']}}}})
+        ])
+        self.mock_db_handler.delete_documents.assert_called_once_with('completions', {'user_id': 'user123', 'habit_id': {'$in': ['habit123']}})
+        # The rollups keep the removed history, without reading it
+        self.mock_db_handler.list_documents.assert_not_called()
+        self.assertEqual(self.mock_db_handler.increment_documents.call_args.args, ('daily_rollups', []))
+
+    def test_remove_habit_concurrent_removal(self):
+        """
+        Test a habit removed by another request in between is reported as not found after the retry.
+        """
+        self.mock_db_handler.find_document.side_effect = [{'_id': 'user123', 'version': 1, 'habits': [{'_id': 'habit123'}]},
+                                                          {'_id': 'user123', 'version': 2, 'habits': []}]
+        self.mock_db_handler.modify_document.return_value = False
+        result = self.habit_tracker.remove_habit('test_user', 'habit123')
+        self.assertEqual(result, {'success': False, 'error': 'Habit not found'})
+        self.mock_db_handler.delete_documents.assert_not_called()
+
+    def test_remove_habit_not_found(self):
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123', 'habits': []}
+        result = self.habit_tracker.remove_habit('test_user', 'habit123')
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'Habit not found')
+        self.mock_db_handler.modify_document.assert_not_called()
+
     #
     #LONGEST HABIT
     #
     def test_longest_streak_habit_with_type(self):
+        self.mock_db_handler.aggregate.return_value = [{'habit': {'name': 'Habit2', 'type': 'weekly', 'longest_streak': 4}}]
+        result = self.habit_tracker.longest_streak_habit('test_user', 'weekly')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['habit']['name'], 'Habit2')
+        pipeline = self.mock_db_handler.aggregate.call_args.args[1]
+        self.assertEqual(pipeline[0], {'$match': {'username': 'test_user'}})
+        self.assertEqual(pipeline[1]['$project']['habit']['$filter']['cond'], {'$eq': ['$$h.type', 'weekly']})
+        self.assertIn({'$sort': {'score': -1, 'position': 1}}, pipeline)
+        self.assertEqual(pipeline[-1], {'$project': {'habit.completion_datetimes': 0}})
+        self.mock_db_handler.find_document.assert_called_once_with('users', {'username': 'test_user'}, projection={'summary.best.weekly': 1})
+
+    def test_longest_streak_habit_from_summary(self):
+        """
+        Test the habit ID comes from the summary and only that habit is read, without aggregation.
+        """
+        self.mock_db_handler.find_document.side_effect = [
+            {'_id': 'user123', 'summary': {'best': {'weekly': 'habit2'}}},
+            {'habits': [{'_id': 'habit2', 'name': 'Habit2', 'completion_datetimes': []}]}
+        ]
+        result = self.habit_tracker.longest_streak_habit('test_user', 'weekly')
+        self.assertEqual(result, {'success': True, 'habit': {'_id': 'habit2', 'name': 'Habit2'}})
+        self.mock_db_handler.find_document.assert_called_with('users', {'username': 'test_user'}, projection={'_id': 0, 'habits': {'$elemMatch': {'_id': 'habit2'}}})
+        self.mock_db_handler.aggregate.assert_not_called()
+
+    def test_longest_streak_habit_removed_after_summary(self):
+        """
+        Test a habit removed between the summary read and the habit read falls back to the aggregation.
+        """
+        self.mock_db_handler.find_document.side_effect = [{'_id': 'user123', 'summary': {'best': {'all': 'habit2'}}}, {}]
+        self.mock_db_handler.aggregate.return_value = [{'habit': {'_id': 'habit3'}}]
+        result = self.habit_tracker.longest_streak_habit('test_user', None)
+        self.assertEqual(result, {'success': True, 'habit': {'_id': 'habit3'}})
+        self.mock_db_handler.aggregate.assert_called_once_with('users', HabitTracker._select_pipeline('test_user', None, 'longest_streak', -1))
+
+    def test_strugglest_habit_summary_without_type(self):
+        """
+        Test a summary without habits of the type answers 'No habits found for user'.
+        """
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123', 'summary': {'worst': {}}}
+        result = self.habit_tracker.strugglest_habit('test_user', 'daily')
+        self.assertEqual(result, {'success': False, 'error': 'No habits found for user'})
+        self.mock_db_handler.aggregate.assert_not_called()
+
+    def test_summary(self):
+        """
+        Test the summary ranks habits like the aggregation: missing values count as 0, the first habit wins ties.
+        """
+        habits = [
+            {'_id': 'd1', 'type': 'daily', 'status': 'in progress', 'streak': 2, 'longest_streak': 5, 'completion_count': 7},
+            {'_id': 'd2', 'type': 'daily', 'status': 'failed', 'streak': 0, 'longest_streak': 5, 'completion_count': 6},
+            {'_id': 'w1', 'type': 'weekly', 'status': 'completed', 'longest_streak': 6, 'completion_count': 1},
+            {'_id': 'w2', 'type': 'weekly', 'status': 'in progress'}
+        ]
+        self.assertEqual(HabitTracker._summary(habits), {
+            'status': {'in progress': 2, 'failed': 1, 'completed': 1},
+            'completions': 14,
+            'best': {'all': 'w1', 'daily': 'd1', 'weekly': 'w1'},
+            'worst': {'all': 'd2', 'daily': 'd2', 'weekly': 'w1'}
+        })
+
+    def test_longest_streak_habit_user_not_found(self):
+        self.mock_db_handler.aggregate.return_value = []
+        result = self.habit_tracker.longest_streak_habit('unknown_user', None)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'User not found')
+
+    def test_longest_streak_habit_no_habits(self):
+        self.mock_db_handler.aggregate.return_value = [{}]
+        result = self.habit_tracker.longest_streak_habit('test_user', 'daily')
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'No habits found for user')
+
+    def test_strugglest_habit_with_type(self):
+        self.mock_db_handler.aggregate.return_value = [{'habit': {'name': 'Habit1', 'type': 'daily', 'streak': 1}}]
+        result = self.habit_tracker.strugglest_habit('test_user', 'daily')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['habit']['name'], 'Habit1')
+        pipeline = self.mock_db_handler.aggregate.call_args.args[1]
+        self.assertIn({'$addFields': {'score': {'$ifNull': ['$habit.streak', 0]}}}, pipeline)
+        self.assertIn({'$sort': {'score': 1, 'position': 1}}, pipeline)
+
+    def test_complete_batch_chains_completions(self):
+        """
+        Test complete_batch applies items in order and persists them with one update and one insert.
+        """
         user = {
+            '_id': 'user123',
             'username': 'test_user',
             'habits': [
-                {'name': 'Habit1', 'type': 'daily', 'longest_streak': 5},
-                {'name': 'Habit2', 'type': 'weekly', 'longest_streak': 4},  # This should be selected
-                {'name': 'Habit3', 'type': 'daily', 'longest_streak': 3}
+                {'_id': 'daily1', 'type': 'daily', 'start_range': '2023-01-01 00:00', 'end_range': '2023-01-02 00:00'},
+                {'_id': 'weekly1', 'type': 'weekly', 'start_range': '2023-01-01 00:00', 'end_range': '2023-01-08 00:00'}
             ]
         }
         self.mock_db_handler.find_document.return_value = user
-        result = self.habit_tracker.longest_streak_habit('test_user', 'weekly')
+        self.mock_db_handler.modify_document.return_value = True
+        items = [
+            {'habit_id': 'daily1', 'completion_date': '2023-01-01 10:00'},
+            {'habit_id': 'daily1', 'completion_date': '2023-01-02 10:00'},
+            {'habit_id': 'weekly1', 'completion_date': '2023-01-03 10:00'},
+            {'habit_id': 'missing', 'completion_date': '2023-01-03 10:00'},
+            {'habit_id': 'daily1', 'completion_date': '03/01/2023'}
+        ]
+
+        result = self.habit_tracker.complete_batch('test_user', items)
+
         self.assertTrue(result['success'])
-        self.assertEqual(result['habit']['name'], 'Habit2')
+        self.assertEqual([item['success'] for item in result['results']], [True, True, True, False, False])
+        self.assertEqual(result['results'][3]['error'], 'Habit not found')
+        self.assertEqual(user['habits'][0]['streak'], 2)
+        # weekly habits do not continue unless asked
+        self.assertEqual(user['habits'][1]['status'], 'completed')
 
-    def test_strugglest_habit_with_type(self):
-        self.mock_db_handler.find_document.return_value = {
-            'username': 'test_user',
+        self.assertEqual(self.mock_db_handler.modify_document.call_count, 2)
+        update = self.mock_db_handler.modify_document.call_args_list[0].args[2]
+        self.assertEqual(update['$inc'], {'habits.$[h0].completion_count': 2, 'habits.$[h0].status_counts.completed': 2, 'habits.$[h1].completion_count': 1, 'habits.$[h1].status_counts.in_progress': 1, 'version': 1})
+        self.assertEqual(update['$set']['habits.$[h0].streak'], 2)
+        self.assertEqual(self.mock_db_handler.modify_document.call_args_list[0].kwargs['array_filters'], [{'h0._id': 'daily1'}, {'h1._id': 'weekly1'}])
+        self.mock_db_handler.insert_documents.assert_called_once()
+        self.assertEqual(len(self.mock_db_handler.insert_documents.call_args.args[1]), 3)
+        # one $inc upsert per day of the daily rollups
+        collection, increments = self.mock_db_handler.increment_documents.call_args.args
+        self.assertEqual(collection, 'daily_rollups')
+        self.assertEqual([query['day'] for query, _ in increments], [datetime.datetime(2023, 1, day) for day in (1, 2, 3)])
+
+    def test_complete_batch_without_valid_items(self):
+        """
+        Test complete_batch does not write when no item is valid.
+        """
+        self.mock_db_handler.find_document.return_value = {'_id': 'user123', 'habits': []}
+
+        result = self.habit_tracker.complete_batch('test_user', [{'habit_id': 'habit123'}])
+
+        self.assertTrue(result['success'])
+        self.assertFalse(result['results'][0]['success'])
+        self.mock_db_handler.modify_document.assert_not_called()
+        self.mock_db_handler.insert_documents.assert_not_called()
+
+    def test_catch_up_habits_moves_past_missed_periods(self):
+        """
+        Test catch_up_habits moves every late habit in one step and records the missed periods once.
+        """
+        user = {
+            '_id': 'user123',
             'habits': [
-                {'name': 'Habit1', 'type': 'daily', 'streak': 1},
-                {'name': 'Habit2', 'type': 'weekly', 'streak': 5},
-                {'name': 'Habit3', 'type': 'daily', 'streak': 2}
+                {'_id': 'daily1', 'type': 'daily', 'start_range': datetime.datetime(2023, 1, 1, 8, 0), 'end_range': datetime.datetime(2023, 1, 1, 10, 0), 'streak': 4, 'longest_streak': 2},
+                {'_id': 'weekly1', 'type': 'weekly', 'start_range': datetime.datetime(2023, 1, 1, 0, 0), 'end_range': datetime.datetime(2023, 1, 8, 0, 0), 'streak': 1},
+                {'_id': 'done', 'type': 'daily', 'start_range': datetime.datetime(2023, 1, 1, 8, 0), 'end_range': datetime.datetime(2023, 1, 1, 10, 0), 'status': 'completed'}
             ]
         }
-        result = self.habit_tracker.strugglest_habit('test_user', 'daily')
+        self.mock_db_handler.find_document.return_value = user
+        self.mock_db_handler.modify_document.return_value = True
+
+        result = self.habit_tracker.catch_up_habits('test_user', now='2023-01-21 09:00')
+
         self.assertTrue(result['success'])
-        self.assertEqual(result['habit']['name'], 'Habit1')
+        self.assertEqual(result['missed'], {'daily1': 20, 'weekly1': 2})
+        daily = user['habits'][0]
+        self.assertEqual(daily['start_range'], datetime.datetime(2023, 1, 21, 8, 0))
+        self.assertEqual(daily['end_range'], datetime.datetime(2023, 1, 21, 10, 0))
+        self.assertEqual((daily['streak'], daily['longest_streak'], daily['status']), (0, 4, 'failed'))
+        self.assertEqual(user['habits'][1]['end_range'], datetime.datetime(2023, 1, 22, 0, 0))
+        self.assertEqual(user['habits'][2]['end_range'], datetime.datetime(2023, 1, 1, 10, 0))
+
+        self.assertEqual(self.mock_db_handler.modify_document.call_count, 2)
+        documents = self.mock_db_handler.insert_documents.call_args.args[1]
+        self.assertEqual([document['missed'] for document in documents], [20, 2])
+
+    def test_catch_up_habits_up_to_date(self):
+        """
+        Test catch_up_habits does not write when the current period has not ended.
+        """
+        self.mock_db_handler.find_document.return_value = {
+            '_id': 'user123',
+            'habits': [{'_id': 'daily1', 'type': 'daily', 'start_range': datetime.datetime(2023, 1, 1, 8, 0), 'end_range': datetime.datetime(2023, 1, 1, 10, 0)}]
+        }
+
+        result = self.habit_tracker.catch_up_habits('test_user', habit_id='daily1', now=datetime.datetime(2023, 1, 1, 10, 0))
+
+        self.assertEqual(result['missed'], {})
+        self.mock_db_handler.modify_document.assert_not_called()
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
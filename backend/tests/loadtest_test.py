@@ -0,0 +1,85 @@
+import unittest
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock
+import loadtest
+
+class TestLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup a seeded user and a traffic mix configuration.
+        """
+        self.user = {'username': 'loaduser00001', 'password': 'secret', 'token': 'token1', 'habit_id': 'habit1'}
+        self.config = {'users': 2, 'username_prefix': 'loaduser', 'password': 'secret', 'habit': 'Breakfast', 'requests': [
+            {'name': 'check in', 'method': 'post', 'path': '/user/update_daily_habit', 'weight': 3,
+             'json': {'habit_id': '{habit_id}', 'completion_date': '{now}'}}
+        ]}
+
+    def test_load_mix_validates_requests(self):
+        """
+        Test a traffic mix without requests or with an invalid request is rejected.
+        """
+        for config in ({**self.config, 'requests': []}, {**self.config, 'requests': [{'method': 'GET', 'path': '/habits', 'weight': 0}]}):
+            with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as file:
+                json.dump(config, file)
+            self.addCleanup(os.remove, file.name)
+            self.assertRaises(ValueError, loadtest.load_mix, file.name)
+
+    def test_request_of(self):
+        """
+        Test the placeholders of a request are filled with the user and the request carries its session token.
+        """
+        entry = {'method': 'get', 'path': '/user/habit_history', 'query': {'habit_id': '{habit_id}'}}
+        self.assertEqual(loadtest.request_of(entry, self.user), ('GET', '/user/habit_history?habit_id=habit1', None, {'Authorization': 'Bearer token1'}))
+
+        method, path, body, headers = loadtest.request_of(self.config['requests'][0], self.user)
+        self.assertEqual((method, path, body['habit_id']), ('POST', '/user/update_daily_habit', 'habit1'))
+        self.assertRegex(body['completion_date'], r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}$')
+
+        entry = {'method': 'POST', 'path': '/login', 'auth': 'none', 'json': {'username': '{username}', 'password': '{password}'}}
+        self.assertEqual(loadtest.request_of(entry, self.user), ('POST', '/login', {'username': 'loaduser00001', 'password': 'secret'}, {}))
+
+    def test_seed_user_assigns_missing_habit(self):
+        """
+        Test a user is registered, logged in and assigned the habit of the mix through the API.
+        """
+        connection = MagicMock()
+        connection.request.side_effect = [
+            (200, {'success': False, 'error': 'Username already exists'}),
+            (200, {'success': True, 'data': {'username': 'loaduser00001', 'token': 'token1'}}),
+            (200, {'success': True, 'habits': []}),
+            (200, {'success': True, 'message': 'Habit assigned successfully'}),
+            (200, {'success': True, 'habits': [{'_id': 'user-habit1', 'habit_id': 'habit1'}]})
+        ]
+
+        user = loadtest.seed_user(connection, self.config, 1, 'habit1')
+
+        self.assertEqual(user, {'username': 'loaduser00001', 'password': 'secret', 'token': 'token1', 'habit_id': 'user-habit1'})
+        method, path, body, headers = connection.request.call_args_list[3].args
+        self.assertEqual((method, path, body['habit_id'], headers), ('POST', '/user/assign_habit', 'habit1', {'Authorization': 'Bearer token1'}))
+
+    def test_seed_user_fails_on_login_error(self):
+        """
+        Test seeding stops when a user can not log in.
+        """
+        connection = MagicMock()
+        connection.request.side_effect = [(200, {'success': True}), (200, {'success': False, 'error': 'Invalid credentials'})]
+
+        self.assertRaises(RuntimeError, loadtest.seed_user, connection, self.config, 1, 'habit1')
+
+    def test_report(self):
+        """
+        Test the percentiles, throughput and error rate are reported per request name and in total.
+        """
+        samples = [('list habits', index / 1000, True) for index in range(1, 101)] + [('check in', 0.5, False)]
+
+        result = loadtest.report(samples, seconds=10)
+
+        self.assertEqual(result['endpoints']['list habits'], {'requests': 100, 'errors': 0, 'error_rate': 0.0, 'throughput': 10.0,
+                                                              'latency_ms': {'p50': 50.0, 'p95': 95.0, 'p99': 99.0, 'mean': 50.5, 'max': 100.0}})
+        self.assertEqual((result['total']['requests'], result['total']['errors'], result['total']['error_rate']), (101, 1, 0.0099))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import datetime
+from unittest.mock import MagicMock
+from bson import ObjectId
+from classes.migrations import Migrations
+from classes.completion_rollups import CompletionRollups
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup Migrations with mocked collections for testing.
+        """
+        self.mock_db_handler = MagicMock()
+        self.mock_db_handler.find_document.return_value = None
+        self.collections = {name: MagicMock() for name in ('users', 'completions', 'system', 'daily_rollups')}
+        self.mock_db_handler.db.__getitem__.side_effect = lambda name: self.collections[name]
+        self.migrations = Migrations(self.mock_db_handler, batch_size=10)
+
+    def test_migrate_completions(self):
+        """
+        Test embedded history is inserted into 'completions' and removed from the user in one update.
+        """
+        user_id = ObjectId('507f1f77bcf86cd799439011')
+        user = {'_id': user_id, 'habits': [
+            {'_id': 'habit1', 'completion_datetimes': [{'datetime': '2023-01-01 10:00', 'status': 'completed', 'streak': 1, 'longest_streak': 1}]},
+            {'_id': 'habit2'}
+        ]}
+        self.collections['users'].find.return_value.sort.return_value.limit.side_effect = [[user], []]
+
+        result = self.migrations.migrate_completions()
+
+        self.assertEqual(result, {'success': True, 'users': 1, 'completions': 1})
+        self.collections['completions'].delete_many.assert_called_once_with({'user_id': str(user_id), 'migrated': True})
+        inserted = self.collections['completions'].insert_many.call_args.args[0]
+        self.assertEqual(inserted, [{'user_id': str(user_id), 'habit_id': 'habit1', 'datetime': datetime.datetime(2023, 1, 1, 10, 0), 'status': 'completed', 'streak': 1, 'longest_streak': 1, 'migrated': True}])
+        self.collections['users'].update_one.assert_called_once_with(
+            {'_id': user_id},
+            {'$unset': {'habits.$[].completion_datetimes': ''}, '$inc': {'habits.$[h0].completion_count': 1, 'version': 1}},
+            array_filters=[{'h0._id': 'habit1'}]
+        )
+        self.collections['system'].update_one.assert_called_with({'_id': 'migration:completions'}, {'$set': {'last_user_id': user_id, 'done': True}}, upsert=True)
+
+    def test_migrate_completions_resumes_from_checkpoint(self):
+        """
+        Test the migration continues after the last checkpointed user.
+        """
+        last_user_id = ObjectId('507f1f77bcf86cd799439011')
+        self.mock_db_handler.find_document.return_value = {'_id': 'migration:completions', 'last_user_id': last_user_id}
+        self.collections['users'].find.return_value.sort.return_value.limit.return_value = []
+
+        result = self.migrations.migrate_completions()
+
+        query = self.collections['users'].find.call_args.args[0]
+        self.assertEqual(query['_id'], {'$gt': last_user_id})
+        self.assertEqual(result['users'], 0)
+
+    def test_migrate_datetimes(self):
+        """
+        Test date strings are converted on the server, only in documents still holding strings.
+        """
+        self.collections['users'].update_many.return_value = MagicMock(modified_count=2)
+        self.collections['completions'].update_many.return_value = MagicMock(modified_count=5)
+
+        result = self.migrations.migrate_datetimes()
+
+        self.assertEqual(result, {'success': True, 'users': 2, 'completions': 5})
+        users_filter, users_pipeline = self.collections['users'].update_many.call_args.args
+        self.assertIn({'start_range': {'$type': 'string'}}, users_filter['habits']['$elemMatch']['$or'])
+        habit_fields = users_pipeline[0]['$set']['habits']['$map']['in']['$mergeObjects'][1]
+        self.assertEqual(set(habit_fields), set(Migrations.HABIT_DATETIME_FIELDS))
+        completions_filter, completions_pipeline = self.collections['completions'].update_many.call_args.args
+        self.assertEqual(completions_filter, {'datetime': {'$type': 'string'}})
+        self.assertEqual(completions_pipeline, [{'$set': {'datetime': Migrations._date_expression('$datetime')}}])
+
+    def test_rebuild_summaries(self):
+        """
+        Test every user gets its summary recomputed, only while it is still at the version it was read at.
+        """
+        users = [
+            {'_id': ObjectId('507f1f77bcf86cd799439011'), 'version': 4, 'habits': [{'_id': 'habit1', 'type': 'daily', 'longest_streak': 2}]},
+            {'_id': ObjectId('507f1f77bcf86cd799439012'), 'habits': []}
+        ]
+        self.collections['users'].find.return_value.sort.return_value.limit.side_effect = [users, []]
+        self.collections['users'].bulk_write.return_value = MagicMock(matched_count=1)
+
+        result = self.migrations.rebuild_summaries()
+
+        self.assertEqual(result, {'success': True, 'users': 1, 'skipped': 1})
+        requests = self.collections['users'].bulk_write.call_args.args[0]
+        self.assertEqual(requests[0]._filter, {'_id': users[0]['_id'], 'version': 4})
+        self.assertEqual(requests[0]._doc['$set']['summary']['best'], {'all': 'habit1', 'daily': 'habit1'})
+        self.assertEqual(requests[1]._filter, {'_id': users[1]['_id'], 'version': {'$exists': False}})
+
+    def test_backfill_rollups(self):
+        """
+        Test each batch of users is counted from the streamed history of each user and replaces its previous rollups.
+        """
+        user_id = ObjectId('507f1f77bcf86cd799439011')
+        user = {'_id': user_id, 'version': 2, 'habits': [{'_id': 'habit1', 'type': 'daily', 'category': 'Health'}, {'_id': 'habit2', 'type': 'weekly'}]}
+        self.collections['users'].find.return_value.sort.return_value.limit.side_effect = [[user], []]
+        self.mock_db_handler.iterate_documents.return_value = iter([
+            {'user_id': str(user_id), 'habit_id': 'habit1', 'datetime': datetime.datetime(2024, 1, 1, 10, 0), 'status': 'completed'}
+        ])
+        self.mock_db_handler.increment_documents.return_value = 1
+        self.collections['users'].bulk_write.return_value = MagicMock(matched_count=1)
+
+        result = self.migrations.backfill_rollups(restart=True)
+
+        self.assertEqual(result, {'success': True, 'users': 1, 'completions': 1, 'rollups': 1, 'skipped': 0})
+        self.mock_db_handler.iterate_documents.assert_called_once_with('completions', {'user_id': str(user_id)}, projection=CompletionRollups.PROJECTION)
+        self.collections['daily_rollups'].delete_many.assert_called_once_with({'user_id': {'$in': [str(user_id)]}})
+        self.mock_db_handler.increment_documents.assert_called_once_with('daily_rollups', [
+            ({'user_id': str(user_id), 'day': datetime.datetime(2024, 1, 1)}, {'completed': 1, 'types.daily.completed': 1, 'categories.Health.completed': 1})
+        ])
+        request = self.collections['users'].bulk_write.call_args.args[0][0]
+        self.assertEqual(request._filter, {'_id': user_id, 'version': 2})
+        self.assertEqual(request._doc, {'$set': {'habits.$[h0].status_counts': {'completed': 1}, 'habits.$[h1].status_counts': {}}, '$inc': {'version': 1}})
+        self.assertEqual(request._array_filters, [{'h0._id': 'habit1'}, {'h1._id': 'habit2'}])
+        self.collections['system'].update_one.assert_called_with({'_id': 'migration:rollups'}, {'$set': {'last_user_id': user_id, 'done': True}}, upsert=True)
+
+if __name__ == '__main__':
+    unittest.main()
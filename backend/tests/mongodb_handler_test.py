@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import patch, MagicMock
 from bson import ObjectId
-from classes.mongodb_handler import MongoDBHandler
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, OperationFailure, ServerSelectionTimeoutError
+from classes.mongodb_handler import MongoDBHandler, MissingIndexError
 
 class TestMongoDBHandler(unittest.TestCase):
 
@@ -15,6 +17,75 @@ class TestMongoDBHandler(unittest.TestCase):
         self.handler = MongoDBHandler(self.uri, self.db_name)
         self.mock_db = mock_mongo_client.return_value[self.db_name]
 
+    def test_ensure_indexes_on_first_use(self):
+        """
+        Test the declared indexes are created once, on the first collection access.
+        """
+        collection_name = 'test_collection'
+        self.mock_db[collection_name].find_one.return_value = None
+
+        self.handler.find_document(collection_name, {'name': 'test'})
+        self.handler.find_document(collection_name, {'name': 'test'})
+
+        self.assertEqual(self.mock_db[collection_name].create_index.call_count, len(MongoDBHandler.INDEXES))
+        self.mock_db[collection_name].create_index.assert_any_call([('username', 1)], unique=True)
+        self.assertTrue(self.handler.indexes_ready)
+
+    def test_ensure_indexes_reports_failure(self):
+        """
+        Test a failing index is reported and the other indexes are still created.
+        """
+        self.mock_db['users'].create_index.side_effect = [OperationFailure('duplicate key')] + [None] * (len(MongoDBHandler.INDEXES) - 1)
+
+        result = self.handler.ensure_indexes()
+
+        self.assertFalse(result)
+        self.assertFalse(self.handler.indexes_ready)
+        self.assertEqual(self.mock_db['users'].create_index.call_count, len(MongoDBHandler.INDEXES))
+
+    @patch('classes.mongodb_handler.time.monotonic')
+    def test_missing_unique_index_refuses_collection(self, mock_monotonic):
+        """
+        Test a collection is not used while one of its unique indexes is missing, and only the failed index is retried once its delay passed.
+        """
+        self.mock_db['users'].create_index.side_effect = [OperationFailure('duplicate key')] + [None] * len(MongoDBHandler.INDEXES)
+        mock_monotonic.side_effect = [0, 0, 1, 10, 10]
+
+        with self.assertRaises(MissingIndexError):
+            self.handler.insert_document('users', {'username': 'test'})
+        self.assertEqual(self.handler.pending_indexes, MongoDBHandler.INDEXES[:1])
+        with self.assertRaises(MissingIndexError):
+            self.handler.insert_document('users', {'username': 'test'})
+        self.assertEqual(self.mock_db['users'].create_index.call_count, len(MongoDBHandler.INDEXES))
+        self.mock_db['users'].insert_one.assert_not_called()
+
+        self.handler.insert_document('users', {'username': 'test'})
+
+        self.assertTrue(self.handler.indexes_ready)
+        self.assertEqual(self.mock_db['users'].create_index.call_count, len(MongoDBHandler.INDEXES) + 1)
+        self.mock_db['users'].create_index.assert_called_with([('username', 1)], unique=True)
+        self.mock_db['users'].insert_one.assert_called_once()
+
+    def test_index_retry_delay_doubles(self):
+        """
+        Test the delay before failed indexes are tried again doubles after each failure, up to INDEX_RETRY_MAX_DELAY.
+        """
+        self.assertEqual(MongoDBHandler._index_backoff(0), MongoDBHandler.INDEX_RETRY_DELAY)
+        self.assertEqual(MongoDBHandler._index_backoff(MongoDBHandler.INDEX_RETRY_DELAY), 2 * MongoDBHandler.INDEX_RETRY_DELAY)
+        self.assertEqual(MongoDBHandler._index_backoff(MongoDBHandler.INDEX_RETRY_MAX_DELAY), MongoDBHandler.INDEX_RETRY_MAX_DELAY)
+
+    def test_ensure_indexes_retried_after_connection_error(self):
+        """
+        Test an unreachable database does not mark the indexes as ready.
+        """
+        self.mock_db['users'].create_index.side_effect = [ServerSelectionTimeoutError('timeout')] + [None] * len(MongoDBHandler.INDEXES)
+
+        self.assertRaises(ServerSelectionTimeoutError, self.handler.ensure_indexes)
+        self.assertFalse(self.handler.indexes_ready)
+
+        self.assertTrue(self.handler.ensure_indexes())
+        self.assertEqual(self.mock_db['users'].create_index.call_count, 1 + len(MongoDBHandler.INDEXES))
+
     @patch('classes.mongodb_handler.Utils.serialize_document')
     @patch('classes.mongodb_handler.MongoClient')
     def test_add_document(self, mock_mongo_client, mock_serialize):
@@ -30,11 +101,90 @@ class TestMongoDBHandler(unittest.TestCase):
         result = self.handler.add_document(collection_name, document)
 
         self.mock_db[collection_name].insert_one.assert_called_once_with(document)
+        self.mock_db[collection_name].find_one.assert_not_called()  # No read after the write
         mock_serialize.assert_called()  # Ensure serialize_document was called
         self.assertEqual(result['_id'], str(inserted_id))
         self.assertEqual(result['name'], 'test')
 
 
+    @patch('classes.mongodb_handler.os.getpid')
+    @patch('classes.mongodb_handler.MongoClient')
+    def test_client_reopened_after_fork(self, mock_mongo_client, mock_getpid):
+        """
+        Test a forked process opens its own client instead of using the inherited one.
+        """
+        mock_getpid.return_value = 100
+        handler = MongoDBHandler(self.uri, self.db_name)
+        parent_client = handler.client
+
+        mock_getpid.return_value = 200
+        child_client = handler.client
+
+        self.assertEqual(mock_mongo_client.call_count, 2)
+        self.assertIs(handler.client, child_client)
+        parent_client.close.assert_not_called()
+
+    def test_insert_document(self):
+        """
+        Test insert_document method inserts a document and returns its ID in a single round trip.
+        """
+        collection_name = 'test_collection'
+        inserted_id = ObjectId('507f1f77bcf86cd799439011')
+        self.mock_db[collection_name].insert_one.return_value = MagicMock(inserted_id=inserted_id)
+
+        result = self.handler.insert_document(collection_name, {'name': 'test'})
+
+        self.mock_db[collection_name].insert_one.assert_called_once_with({'name': 'test'})
+        self.mock_db[collection_name].find_one.assert_not_called()
+        self.assertEqual(result, str(inserted_id))
+
+    def test_insert_documents(self):
+        """
+        Test insert_documents inserts all documents with one insert_many call.
+        """
+        collection_name = 'test_collection'
+        inserted_ids = [ObjectId('507f1f77bcf86cd799439011'), ObjectId('507f1f77bcf86cd799439012')]
+        self.mock_db[collection_name].insert_many.return_value = MagicMock(inserted_ids=inserted_ids)
+
+        result = self.handler.insert_documents(collection_name, [{'name': 'a'}, {'name': 'b'}])
+
+        self.mock_db[collection_name].insert_many.assert_called_once_with([{'name': 'a'}, {'name': 'b'}], ordered=True)
+        self.assertEqual(result, [str(inserted_id) for inserted_id in inserted_ids])
+
+    def test_insert_documents_ignores_duplicates(self):
+        """
+        Test insert_documents skips the documents that already exist when asked to, and fails on other errors.
+        """
+        collection_name = 'test_collection'
+        documents = [{'_id': 'w1:0'}, {'_id': 'w1:1'}, {'_id': 'w1:2'}]
+        duplicate = BulkWriteError({'writeErrors': [{'index': 1, 'code': 11000}], 'writeConcernErrors': []})
+        self.mock_db[collection_name].insert_many.side_effect = duplicate
+
+        result = self.handler.insert_documents(collection_name, documents, ignore_duplicates=True)
+
+        self.mock_db[collection_name].insert_many.assert_called_once_with(documents, ordered=False)
+        self.assertEqual(result, ['w1:0', 'w1:2'])
+        self.assertRaises(BulkWriteError, self.handler.insert_documents, collection_name, documents)
+
+        self.mock_db[collection_name].insert_many.side_effect = BulkWriteError({'writeErrors': [{'index': 0, 'code': 121}]})
+        self.assertRaises(BulkWriteError, self.handler.insert_documents, collection_name, documents, ignore_duplicates=True)
+
+    def test_find_and_modify_document(self):
+        """
+        Test find_and_modify_document method returns the post-image of a single find_one_and_update.
+        """
+        collection_name = 'test_collection'
+        document_id = ObjectId('507f1f77bcf86cd799439011')
+        self.mock_db[collection_name].find_one_and_update.return_value = {'_id': document_id, 'version': 2}
+
+        result = self.handler.find_and_modify_document(collection_name, {'_id': document_id}, {'$inc': {'version': 1}}, projection={'version': 1})
+
+        self.mock_db[collection_name].find_one_and_update.assert_called_once_with(
+            {'_id': document_id}, {'$inc': {'version': 1}}, projection={'version': 1}, array_filters=None,
+            upsert=False, return_document=ReturnDocument.AFTER)
+        self.mock_db[collection_name].find_one.assert_not_called()
+        self.assertEqual(result, {'_id': str(document_id), 'version': 2})
+
     def test_delete_document(self):
         """
         Test delete_document method deletes a document and returns True if successful.
@@ -61,7 +211,7 @@ class TestMongoDBHandler(unittest.TestCase):
         with patch('classes.mongodb_handler.Utils.serialize_document', side_effect=lambda x: x):
             result = self.handler.find_document(collection_name, query)
 
-        self.mock_db[collection_name].find_one.assert_called_once_with(query)
+        self.mock_db[collection_name].find_one.assert_called_once_with(query, projection=None, sort=None)
         self.assertEqual(result, document)
 
     def test_update_document(self):
@@ -79,6 +229,53 @@ class TestMongoDBHandler(unittest.TestCase):
         self.mock_db[collection_name].update_one.assert_called_once_with({'_id': ObjectId(document_id)}, {'$set': update_values})
         self.assertEqual(result['name'], 'updated')
 
+    def test_modify_document(self):
+        """
+        Test modify_document method applies update operators without reading the document back.
+        """
+        collection_name = 'test_collection'
+        document_id = '507f1f77bcf86cd799439011'
+        update = {'$set': {'habits.$[h].streak': 1}}
+        self.mock_db[collection_name].update_one.return_value = MagicMock(matched_count=1)
+
+        result = self.handler.modify_document(collection_name, document_id, update, conditions={'habits._id': 'h1'}, array_filters=[{'h._id': 'h1'}])
+
+        self.mock_db[collection_name].update_one.assert_called_once_with({'_id': ObjectId(document_id), 'habits._id': 'h1'}, update, array_filters=[{'h._id': 'h1'}])
+        self.mock_db[collection_name].find_one.assert_not_called()
+        self.assertTrue(result)
+
+    def test_increment_documents(self):
+        """
+        Test increment_documents sends every $inc upsert in one unordered bulk_write.
+        """
+        collection_name = 'test_collection'
+        self.mock_db[collection_name].bulk_write.return_value = MagicMock(matched_count=1, upserted_count=1)
+
+        result = self.handler.increment_documents(collection_name, [({'day': 1}, {'completed': 1}), ({'day': 2}, {'failed': -1})])
+
+        requests = self.mock_db[collection_name].bulk_write.call_args.args[0]
+        self.assertEqual([(request._filter, request._doc, request._upsert) for request in requests],
+                         [({'day': 1}, {'$inc': {'completed': 1}}, True), ({'day': 2}, {'$inc': {'failed': -1}}, True)])
+        self.assertEqual(self.mock_db[collection_name].bulk_write.call_args.kwargs, {'ordered': False})
+        self.assertEqual(result, 2)
+        self.assertEqual(self.handler.increment_documents(collection_name, []), 0)
+
+    def test_increment_documents_applied_once_per_operation(self):
+        """
+        Test the increments of an operation skip the documents that already applied it.
+        """
+        collection_name = 'test_collection'
+        # the upsert of a document that has the operation collides with it on its unique key
+        self.mock_db[collection_name].bulk_write.side_effect = BulkWriteError({'writeErrors': [{'index': 1, 'code': 11000}], 'nMatched': 1, 'nUpserted': 0})
+
+        result = self.handler.increment_documents(collection_name, [({'day': 1}, {'completed': 1}), ({'day': 2}, {'failed': 1})], operation='u1:3')
+
+        request = self.mock_db[collection_name].bulk_write.call_args.args[0][0]
+        self.assertEqual(request._filter, {'day': 1, 'operations': {'$ne': 'u1:3'}})
+        self.assertEqual(request._doc, {'$inc': {'completed': 1}, '$push': {'operations': {'$each': ['u1:3'], '$slice': -MongoDBHandler.APPLIED_OPERATIONS}}})
+        self.assertEqual(result, 1)
+        self.assertRaises(BulkWriteError, self.handler.increment_documents, collection_name, [({'day': 1}, {'completed': 1})])
+
     def test_list_documents(self):
         """
         Test list_documents method lists all documents in a collection.
@@ -93,10 +290,62 @@ class TestMongoDBHandler(unittest.TestCase):
         with patch('classes.mongodb_handler.Utils.serialize_document', side_effect=lambda x: x):
             result = self.handler.list_documents(collection_name)
 
-        self.mock_db[collection_name].find.assert_called_once_with({})
+        self.mock_db[collection_name].find.assert_called_once_with({}, projection=None, sort=None)
         self.assertEqual(len(result), 2)
         self.assertEqual(result[0]['name'], 'test1')
         self.assertEqual(result[1]['name'], 'test2')
 
+    def test_list_documents_with_projection_and_sort(self):
+        """
+        Test list_documents method forwards the projection and sort to the query.
+        """
+        collection_name = 'test_collection'
+        self.mock_db[collection_name].find.return_value = []
+
+        self.handler.list_documents(collection_name, {'type': 'daily'}, projection={'name': 1}, sort=[('name', 1)])
+
+        self.mock_db[collection_name].find.assert_called_once_with({'type': 'daily'}, projection={'name': 1}, sort=[('name', 1)])
+
+    def test_aggregate(self):
+        """
+        Test aggregate method runs the pipeline and serializes the results.
+        """
+        collection_name = 'test_collection'
+        pipeline = [{'$match': {'name': 'test'}}]
+        self.mock_db[collection_name].aggregate.return_value = [{'_id': ObjectId('507f1f77bcf86cd799439011'), 'count': 1}]
+
+        result = self.handler.aggregate(collection_name, pipeline, allowDiskUse=True)
+
+        self.mock_db[collection_name].aggregate.assert_called_once_with(pipeline, allowDiskUse=True)
+        self.assertEqual(result, [{'_id': '507f1f77bcf86cd799439011', 'count': 1}])
+
+    def test_iterate_documents(self):
+        """
+        Test iterate_documents method yields serialized documents from a batched cursor.
+        """
+        collection_name = 'test_collection'
+        cursor = self.mock_db[collection_name].find.return_value.__enter__.return_value
+        cursor.__iter__.return_value = iter([{'_id': ObjectId('507f1f77bcf86cd799439011'), 'name': 'test1'}])
+
+        result = self.handler.iterate_documents(collection_name, sort=[('_id', 1)], batch_size=50)
+
+        self.mock_db[collection_name].find.assert_not_called()  # Lazy until iterated
+        self.assertEqual(list(result), [{'_id': '507f1f77bcf86cd799439011', 'name': 'test1'}])
+        self.mock_db[collection_name].find.assert_called_once_with({}, projection=None, sort=[('_id', 1)], limit=0, batch_size=50)
+
+    def test_iterate_aggregate(self):
+        """
+        Test iterate_aggregate method yields the pipeline results with the given batch size.
+        """
+        collection_name = 'test_collection'
+        pipeline = [{'$sort': {'_id': 1}}]
+        cursor = self.mock_db[collection_name].aggregate.return_value.__enter__.return_value
+        cursor.__iter__.return_value = iter([{'_id': ObjectId('507f1f77bcf86cd799439011')}])
+
+        result = list(self.handler.iterate_aggregate(collection_name, pipeline, batch_size=50))
+
+        self.mock_db[collection_name].aggregate.assert_called_once_with(pipeline, batchSize=50)
+        self.assertEqual(result, [{'_id': '507f1f77bcf86cd799439011'}])
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
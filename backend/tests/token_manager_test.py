@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch
+from classes.token_manager import TokenManager
+
+class TestTokenManager(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup TokenManager with a fixed secret for testing.
+        """
+        self.token_manager = TokenManager('test_secret', expires_in=60)
+
+    def test_issue_and_verify_token(self):
+        """
+        Test an issued token verifies to its username.
+        """
+        result = self.token_manager.issue_token('testuser')
+
+        self.assertEqual(result['expires_in'], 60)
+        self.assertEqual(self.token_manager.verify_token(result['token']), 'testuser')
+
+    def test_verify_token_with_other_role(self):
+        """
+        Test a user token is not accepted as an admin token.
+        """
+        token = self.token_manager.issue_token('testuser')['token']
+
+        self.assertIsNone(self.token_manager.verify_token(token, role='admin'))
+
+    def test_verify_token_with_other_secret(self):
+        """
+        Test a token signed with another secret is rejected.
+        """
+        token = TokenManager('other_secret').issue_token('testuser')['token']
+
+        self.assertIsNone(self.token_manager.verify_token(token))
+
+    def test_verify_tampered_token(self):
+        """
+        Test a modified token is rejected.
+        """
+        token = self.token_manager.issue_token('testuser')['token']
+
+        self.assertIsNone(self.token_manager.verify_token(token[:-2] + 'xx'))
+
+    def test_verify_expired_token(self):
+        """
+        Test a token older than its lifetime is rejected.
+        """
+        with patch('time.time', return_value=1000000000):
+            token = self.token_manager.issue_token('testuser')['token']
+
+        self.assertIsNone(self.token_manager.verify_token(token))
+
+if __name__ == '__main__':
+    unittest.main()
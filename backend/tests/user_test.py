@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import patch
 from werkzeug.security import generate_password_hash
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
 from classes.user import User
 
 class TestUser(unittest.TestCase):
@@ -27,15 +29,31 @@ class TestUser(unittest.TestCase):
         Test register method with valid data results in successful user registration.
         """
         mock_db = mock_db_handler.return_value
-        mock_db.find_document.side_effect = [None, None]  # No existing user or email
-        mock_db.add_document.return_value = {'_id': 'user_id', **self.user_data}
+        mock_db.insert_document.return_value = 'user_id'
 
         user = User(username=self.username, password=self.password, email=self.email, name=self.name)
         response = user.register(mock_db)
 
-        mock_db.add_document.assert_called_once()
+        mock_db.insert_document.assert_called_once()
+        mock_db.find_document.assert_not_called()
         self.assertTrue(response['success'])
         self.assertIn('data', response)
+        self.assertEqual(response['data'], {'_id': 'user_id', 'name': self.name, 'username': self.username})
+
+    @patch('classes.user.MongoDBHandler')
+    def test_register_existing_email(self, mock_db_handler):
+        """
+        Test register method reports the field rejected by the unique index, without pre-check queries.
+        """
+        mock_db = mock_db_handler.return_value
+        mock_db.insert_document.side_effect = DuplicateKeyError('E11000 duplicate key error', 11000, {'keyPattern': {'email': 1}})
+
+        user = User(username=self.username, password=self.password, email=self.email, name=self.name)
+        response = user.register(mock_db)
+
+        mock_db.find_document.assert_not_called()
+        self.assertFalse(response['success'])
+        self.assertEqual(response['error'], 'Email already exists')
 
     @patch('classes.user.MongoDBHandler')
     def test_login_successful(self, mock_db_handler):
@@ -76,10 +94,52 @@ class TestUser(unittest.TestCase):
 
         response = User.list_all(mock_db)
 
-        mock_db.list_documents.assert_called_once_with('users')
+        mock_db.list_documents.assert_called_once_with('users', projection={'username': 1, 'email': 1, 'name': 1}, sort=[('username', 1)])
         self.assertTrue(response['success'])
         self.assertIn('users', response)
         self.assertEqual(len(response['users']), 1)
 
+    @patch('classes.user.MongoDBHandler')
+    def test_list_all_users_with_counts(self, mock_db_handler):
+        """
+        Test list_all method computes the counts in an aggregation.
+        """
+        mock_db = mock_db_handler.return_value
+        mock_db.aggregate.return_value = [{'_id': 'user_id', 'username': self.username, 'habit_count': 2, 'completion_count': 10}]
+
+        response = User.list_all(mock_db, with_counts=True)
+
+        pipeline = mock_db.aggregate.call_args.args[1]
+        self.assertEqual(pipeline[-1]['$project']['habit_count'], {'$size': {'$ifNull': ['$habits', []]}})
+        self.assertNotIn('password', pipeline[-1]['$project'])
+        mock_db.list_documents.assert_not_called()
+        self.assertEqual(response['users'][0]['habit_count'], 2)
+
+    @patch('classes.user.MongoDBHandler')
+    def test_list_page(self, mock_db_handler):
+        """
+        Test list_page method starts after the given '_id' and returns the next cursor on a full page.
+        """
+        mock_db = mock_db_handler.return_value
+        mock_db.aggregate.return_value = [{'_id': '507f1f77bcf86cd799439012'}, {'_id': '507f1f77bcf86cd799439013'}]
+
+        response = User.list_page(mock_db, after='507f1f77bcf86cd799439011', limit=2)
+
+        pipeline = mock_db.aggregate.call_args.args[1]
+        self.assertEqual(pipeline[0], {'$match': {'_id': {'$gt': ObjectId('507f1f77bcf86cd799439011')}}})
+        self.assertIn({'$limit': 2}, pipeline)
+        self.assertTrue(response['success'])
+        self.assertEqual(response['next_after'], '507f1f77bcf86cd799439013')
+
+    @patch('classes.user.MongoDBHandler')
+    def test_list_page_invalid_after(self, mock_db_handler):
+        """
+        Test list_page method rejects a malformed cursor.
+        """
+        response = User.list_page(mock_db_handler.return_value, after='not_an_id')
+
+        self.assertFalse(response['success'])
+        self.assertEqual(response['error'], 'Invalid value for after')
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import unittest
+import datetime
 from unittest.mock import patch, MagicMock
 from classes.utils import Utils
 
@@ -21,6 +22,32 @@ class TestUtils(unittest.TestCase):
         result = Utils.serialize_document(doc)
         self.assertEqual(result, expected)
 
+    def test_parse_datetime(self):
+        """
+        Test parse_datetime accepts API strings and datetimes and rejects invalid dates
+        """
+        expected = datetime.datetime(2023, 1, 5, 9, 7)
+        self.assertEqual(Utils.parse_datetime('2023-01-05 09:07'), expected)
+        self.assertEqual(Utils.parse_datetime('2023-1-5 9:07'), expected)
+        self.assertIs(Utils.parse_datetime(expected), expected)
+        self.assertRaises(ValueError, Utils.parse_datetime, '2023-02-30 10:00')
+        self.assertRaises(ValueError, Utils.parse_datetime, '05/01/2023')
+        self.assertRaises(TypeError, Utils.parse_datetime, None)
+
+    def test_percentile(self):
+        """
+        Test percentile returns the nearest-rank measurement
+        """
+        ordered = list(range(1, 101))
+        self.assertEqual([Utils.percentile(ordered, rank) for rank in (0, 50, 95, 99, 100)], [1, 50, 95, 99, 100])
+        self.assertEqual(Utils.percentile([7], 99), 7)
+
+    def test_format_datetime(self):
+        """
+        Test format_datetime returns the API format
+        """
+        self.assertEqual(Utils.format_datetime(datetime.datetime(2023, 1, 5, 9, 7, 30)), '2023-01-05 09:07')
+
     @patch('base64.b64decode')
     def test_normalize_auth_credentials_with_basic_auth(self, mock_b64decode):
         """
@@ -35,6 +62,29 @@ class TestUtils(unittest.TestCase):
         result = Utils.normalize_auth_credentials(mock_request)
         self.assertEqual(result, expected)
 
+    def test_normalize_auth_credentials_get_query_string(self):
+        """
+        Test normalize_auth_credentials reads the parameters of a GET request from the query string
+        """
+        mock_request = MagicMock()
+        mock_request.method = 'GET'
+        mock_request.args.to_dict.return_value = {'type': 'daily'}
+        mock_request.headers = {}
+
+        self.assertEqual(Utils.normalize_auth_credentials(mock_request), {'type': 'daily'})
+
+    def test_user_etag(self):
+        """
+        Test user_etag depends on the user, its version and the request, not on the order of the parameters
+        """
+        etag = Utils.user_etag('user123', 1, '/user/habits', {'type': 'daily', 'status': 'failed'})
+
+        self.assertEqual(etag, Utils.user_etag('user123', 1, '/user/habits', {'status': 'failed', 'type': 'daily'}))
+        self.assertNotEqual(etag, Utils.user_etag('user123', 2, '/user/habits', {'type': 'daily', 'status': 'failed'}))
+        self.assertNotEqual(etag, Utils.user_etag('user456', 1, '/user/habits', {'type': 'daily', 'status': 'failed'}))
+        self.assertNotEqual(etag, Utils.user_etag('user123', 1, '/user/habits', {'type': 'weekly', 'status': 'failed'}))
+        self.assertNotEqual(etag, Utils.user_etag('user123', 1, '/user/habits', {'type': 'daily', 'status': 'failed'}, pending=True))
+
     def test_normalize_auth_credentials_without_auth_header(self):
         """
         Test normalize_auth_credentials without an Authorization header
@@ -55,7 +105,7 @@ class TestUtils(unittest.TestCase):
         """
         mock_request = MagicMock()
         mock_normalize.return_value = {'username': 'valid_user', 'password': 'valid_pass'}
-        mock_login.return_value = True  # Simulating successful login
+        mock_login.return_value = {'success': True, 'data': {'username': 'valid_user'}}  # Simulating successful login
 
         expected = ('valid_user', None)
         result = Utils.authenticate_user(mock_request, MagicMock())
@@ -69,11 +119,38 @@ class TestUtils(unittest.TestCase):
         """
         mock_request = MagicMock()
         mock_normalize.return_value = {'username': 'invalid_user', 'password': 'invalid_pass'}
-        mock_login.return_value = False  # Simulating failed login
+        mock_login.return_value = {'success': False, 'error': 'Invalid credentials'}  # Simulating failed login
 
         expected = (None, 'Invalid credentials')
         result = Utils.authenticate_user(mock_request, MagicMock())
         self.assertEqual(result, expected)
 
+    @patch('classes.user.User.login')
+    def test_authenticate_user_with_valid_token(self, mock_login):
+        """
+        Test authenticate_user with a valid bearer token skips the login
+        """
+        mock_request = MagicMock()
+        mock_request.headers = {'Authorization': 'Bearer signed_token'}
+        mock_token_manager = MagicMock()
+        mock_token_manager.verify_token.return_value = 'valid_user'
+
+        result = Utils.authenticate_user(mock_request, MagicMock(), mock_token_manager)
+        mock_token_manager.verify_token.assert_called_once_with('signed_token')
+        mock_login.assert_not_called()
+        self.assertEqual(result, ('valid_user', None))
+
+    def test_authenticate_user_with_invalid_token(self):
+        """
+        Test authenticate_user with an invalid or expired bearer token
+        """
+        mock_request = MagicMock()
+        mock_request.headers = {'Authorization': 'Bearer expired_token'}
+        mock_token_manager = MagicMock()
+        mock_token_manager.verify_token.return_value = None
+
+        result = Utils.authenticate_user(mock_request, MagicMock(), mock_token_manager)
+        self.assertEqual(result, (None, 'Invalid or expired token'))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
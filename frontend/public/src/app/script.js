@@ -193,7 +193,7 @@ async function updateHabitsTable(type) {
     return new Promise((resolve, reject) => {
         let data = { username:username, password: password, type:type }
         if (type) data.type = type;
-        backendService.sendRequest('/user/habits', 'POST', data)
+        backendService.sendRequest('/user/habits', 'GET', data)
             .then(response => {
                 let rows = [];
                 if (response.habits.length) {
@@ -205,7 +205,7 @@ async function updateHabitsTable(type) {
                             { type: 'text', value: habit.status },
                             { type: 'text', value: habit.streak },
                             { type: 'text', value: habit.longest_streak },
-                            { type: 'text', value: habit.completion_datetimes?.length || 0 },
+                            { type: 'text', value: habit.completion_count ?? habit.completion_datetimes?.length ?? 0 },
                             { type: 'action', value: habit, label: "Manage", btnStyle: 'btn btn-outline-warning', action: onHabitClick }
                         ];
                         return row;
@@ -252,7 +252,7 @@ function onAssignCustomNewHabitClick(type) {
 }
 function onLongestStreakClick(type) {
     let data = { username:username, password: password, type:type }
-    backendService.sendRequest('/user/longest_streak', 'POST', data)
+    backendService.sendRequest('/user/longest_streak', 'GET', data)
     .then(response => {
         if (response.success)
         {
@@ -274,7 +274,7 @@ function onLongestStreakClick(type) {
 }
 function onStrugglestClick(type) {
     let data = { username:username, password: password, type:type }
-    backendService.sendRequest('/user/strugglest_habit', 'POST', data)
+    backendService.sendRequest('/user/strugglest_habit', 'GET', data)
     .then(response => {
         if (response.success)
         {
@@ -503,7 +503,7 @@ function getHabitTable(habit) {
     if (habit.streak) rows.push([{type:'text',value:"Actual Streak",align:"right"},{type:'text',value:habit.streak,align:"left"}]);
     if (habit.longest_streak) rows.push([{type:'text',value:"Longest Streak",align:"right"},{type:'text',value:habit.longest_streak,align:"left"}]);
 
-    if (habit.completion_datetimes) rows.push([{type:'text',value:"Total Times Completed",align:"right"},{type:'text',value:habit.completion_datetimes.length,align:"left"}]);
+    if (habit.completion_count) rows.push([{type:'text',value:"Total Times Completed",align:"right"},{type:'text',value:habit.completion_count,align:"left"}]);
 
     return rows;
 }
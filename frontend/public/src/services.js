@@ -1,11 +1,12 @@
 class BackendService {
     constructor(baseUrl) {
         this.baseUrl = baseUrl;
+        this.token = null; // session token returned by login/validate
     }
 
     async sendRequest(endpoint, method, data) {
         if (data) console.log("sendRequest data",data)
-        const url = `${this.baseUrl}${endpoint}`;
+        let url = `${this.baseUrl}${endpoint}`;
         const headers = {
             'Content-Type': 'application/json'
         };
@@ -21,15 +22,26 @@ class BackendService {
             password = data.password;
         }
 
+        let basicAuthorization = null;
+
         // Check if 'username' and 'password' are present in the data
         if (data && data.username && data.password) {
-            // Add the Authorization header for Basic Authentication
-            headers['Authorization'] = 'Basic ' + btoa(data.username + ':' + data.password);
+            const credentials = 'Basic ' + btoa(data.username + ':' + data.password);
+            const isLogin = endpoint == 'admin/validate' || endpoint == '/login' || endpoint == '/register';
+            // Use the session token when available, Basic Authentication otherwise
+            headers['Authorization'] = (this.token && !isLogin) ? 'Bearer ' + this.token : credentials;
+            basicAuthorization = credentials;
             // Remove 'username' and 'password' from the data object
             delete data.username;
             delete data.password;
         }
 
+        // GET parameters travel in the query string, so the browser can revalidate the response with its ETag
+        if (method === 'GET' && data) {
+            const params = Object.entries(data).filter(([key, value]) => value !== undefined && value !== null);
+            if (params.length) url += '?' + new URLSearchParams(params).toString();
+        }
+
         // Configuring the request options
         const requestOptions = {
             method: method,
@@ -39,8 +51,15 @@ class BackendService {
         };
 
         try {
-            const response = await fetch(url, requestOptions);
+            let response = await fetch(url, requestOptions);
+            // Expired session token, fall back to Basic Authentication once
+            if (response.status == 401 && basicAuthorization && headers['Authorization'].startsWith('Bearer ')) {
+                this.token = null;
+                headers['Authorization'] = basicAuthorization;
+                response = await fetch(url, requestOptions);
+            }
             const result = await response.json();
+            if (result && result.success && result.data && result.data.token) this.token = result.data.token;
             return result;
         } catch (error) {
             console.error('Error in sending request:', error);